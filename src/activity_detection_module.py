@@ -1,121 +1,268 @@
-import mediapipe as mp
+import threading
+
 import cv2
 import numpy as np
+from activity_rules_module import anomaly_activities, classify_poses
+from render_module import draw_pose
+from model_registry_module import registry
+from frame_context_module import FrameContext
+
+NUM_LANDMARKS = 33
+HEAD_LANDMARKS = list(range(11))          # Nariz, olhos, orelhas e boca
+SHOULDER_LANDMARKS = [11, 12]
+VISIBILITY_THRESHOLD = 0.5
+HEAD_REGION_MARGIN = 1.0                  # Margem da região cabeça/ombros (em larguras de rosto)
+BODY_REGION_SIDE = 1.5                    # Região do corpo: larguras de rosto para cada lado do rosto
+BODY_REGION_ABOVE = 0.5                   # Região do corpo: alturas de rosto acima do rosto
+BODY_REGION_BELOW = 6.0                   # Região do corpo: alturas de rosto abaixo do rosto
+
+
+def empty_landmarks():
+    return np.empty((0, NUM_LANDMARKS, 4), dtype=np.float32)
+
+
+class SinglePoseDetector:
+    """
+    Pose do MediaPipe em modo de rastreamento (uma pessoa por frame). O rastreamento guarda estado entre os
+    frames, então cada sequência de frames (um vídeo ou uma fonte ao vivo) precisa da sua própria instância;
+    a instância é criada no primeiro uso e as chamadas são serializadas (o Pose não é seguro entre threads).
+    """
+
+    needs_faces = False
+
+    def __init__(self, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        self.min_detection_confidence = min_detection_confidence
+        self.min_tracking_confidence = min_tracking_confidence
+        self._pose = None
+        self._lock = threading.Lock()
+
+    def detect(self, image_rgb, face_locations=None, timestamp=None):
+        """
+        :param image_rgb: Frame em RGB (já na escala de análise).
+        :return: Array float32 (pessoas, 33, 4) normalizado.
+        """
+        with self._lock:
+            if self._pose is None:
+                self._pose = registry.get("mediapipe").solutions.pose.Pose(
+                    static_image_mode=False, min_detection_confidence=self.min_detection_confidence,
+                    min_tracking_confidence=self.min_tracking_confidence)
+            return pose_landmarks_to_array(self._pose.process(image_rgb))
+
+    def close(self):
+        with self._lock:
+            if self._pose is not None:
+                self._pose.close()
+                self._pose = None
+
+
+# Pose usado por detect_activities quando nenhum detector é informado (chamadas avulsas)
+_default_pose = SinglePoseDetector()
+
+
+class MultiPoseDetector:
+    """
+    Pose de várias pessoas no mesmo frame. Com um modelo do PoseLandmarker (MediaPipe Tasks), todas as pessoas
+    saem de uma única passada sobre o frame (num_poses > 1). Sem o modelo, a pose é executada em recortes do corpo
+    derivados das caixas dos rostos, com uma instância de Pose em modo de imagem estática.
+    """
+
+    def __init__(self, model_path=None, num_poses=4, min_detection_confidence=0.5, crop_size=256):
+        """
+        :param model_path: Arquivo .task do PoseLandmarker; None usa os recortes por rosto.
+        :param num_poses: Número máximo de pessoas por frame.
+        :param crop_size: Lado maior (pixels) de cada recorte no modo por rosto.
+        """
+        self.model_path = model_path
+        self.num_poses = num_poses
+        self.crop_size = crop_size
+        self._last_timestamp_ms = -1
+        mp = registry.get("mediapipe")
+        if model_path:
+            from mediapipe.tasks import python as mp_tasks
+            from mediapipe.tasks.python import vision
+
+            options = vision.PoseLandmarkerOptions(
+                base_options=mp_tasks.BaseOptions(model_asset_path=model_path),
+                running_mode=vision.RunningMode.VIDEO,
+                num_poses=num_poses,
+                min_pose_detection_confidence=min_detection_confidence,
+                min_tracking_confidence=min_detection_confidence,
+            )
+            self._landmarker = vision.PoseLandmarker.create_from_options(options)
+            self._crop_pose = None
+        else:
+            self._landmarker = None
+            self._crop_pose = mp.solutions.pose.Pose(static_image_mode=True,
+                                                     min_detection_confidence=min_detection_confidence)
+
+    @property
+    def needs_faces(self):
+        """Indica se a pose depende das caixas dos rostos do frame (modo por recortes)."""
+        return self._landmarker is None
+
+    def detect(self, image_rgb, face_locations=None, timestamp=None):
+        """
+        :param image_rgb: Frame em RGB (já na escala de análise).
+        :param face_locations: Caixas (top, right, bottom, left) na escala de image_rgb, usadas no modo por recortes.
+        :param timestamp: Instante do frame (segundos); o PoseLandmarker exige instantes crescentes.
+        :return: Array float32 (pessoas, 33, 4) normalizado em relação ao frame inteiro.
+        """
+        if self._landmarker is not None:
+            timestamp_ms = int(timestamp * 1000) if timestamp is not None else self._last_timestamp_ms + 1
+            timestamp_ms = max(timestamp_ms, self._last_timestamp_ms + 1)
+            self._last_timestamp_ms = timestamp_ms
+            mp = registry.get("mediapipe")
+            result = self._landmarker.detect_for_video(mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb),
+                                                       timestamp_ms)
+            if not result.pose_landmarks:
+                return empty_landmarks()
+            return np.array([[(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks]
+                             for landmarks in result.pose_landmarks], dtype=np.float32)
 
-mp_drawing = mp.solutions.drawing_utils
-mp_pose = mp.solutions.pose
-pose = mp_pose.Pose(static_image_mode=False, min_detection_confidence=0.5, min_tracking_confidence=0.5)
-
-# Índices dos keypoints relevantes
-LEFT_SHOULDER = 11
-RIGHT_SHOULDER = 12
-LEFT_WRIST = 15
-RIGHT_WRIST = 16
-LEFT_HIP = 23
-RIGHT_HIP = 24
-LEFT_KNEE = 25
-RIGHT_KNEE = 26
-LEFT_ANKLE = 27
-RIGHT_ANKLE = 28
-
-
-def calculate_angle(point1, point2, point3):
-    if point1 is None or point2 is None or point3 is None:
-        return 0
-    radians = np.arctan2(point3.y - point2.y, point3.x - point2.x) - \
-              np.arctan2(point1.y - point2.y, point1.x - point2.x)
-    angle = np.abs(radians * 180.0 / np.pi)
-    if angle > 180.0:
-        angle = 360 - angle
-    return angle
-
-
-def detect_activities(frame):
+        height, width = image_rgb.shape[:2]
+        people = []
+        for top, right, bottom, left in (face_locations or [])[:self.num_poses]:
+            x0, y0, x1, y1 = body_region((top, right, bottom, left), (height, width))
+            crop = image_rgb[y0:y1, x0:x1]
+            if crop.size == 0:
+                continue
+            scale = min(1.0, self.crop_size / max(crop.shape[:2]))
+            if scale < 1.0:
+                crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            landmarks = pose_landmarks_to_array(self._crop_pose.process(crop))
+            if not len(landmarks):
+                continue
+            # Converte as coordenadas do recorte para coordenadas normalizadas do frame inteiro
+            landmarks = landmarks[0]
+            landmarks[:, 0] = (x0 + landmarks[:, 0] * (x1 - x0)) / width
+            landmarks[:, 1] = (y0 + landmarks[:, 1] * (y1 - y0)) / height
+            people.append(landmarks)
+        return np.stack(people) if people else empty_landmarks()
+
+    def close(self):
+        if self._landmarker is not None:
+            self._landmarker.close()
+        if self._crop_pose is not None:
+            self._crop_pose.close()
+
+
+def body_region(face_location, frame_shape):
+    """
+    Região provável do corpo a partir da caixa do rosto: BODY_REGION_SIDE larguras de rosto para cada lado,
+    BODY_REGION_ABOVE alturas acima e BODY_REGION_BELOW alturas abaixo do rosto.
+    :return: Tupla (x0, y0, x1, y1) limitada ao frame.
+    """
+    top, right, bottom, left = face_location
+    face_width = right - left
+    face_height = bottom - top
+    height, width = frame_shape[:2]
+    x0 = max(0, int(left - BODY_REGION_SIDE * face_width))
+    x1 = min(width, int(right + BODY_REGION_SIDE * face_width))
+    y0 = max(0, int(top - BODY_REGION_ABOVE * face_height))
+    y1 = min(height, int(bottom + BODY_REGION_BELOW * face_height))
+    return x0, y0, x1, y1
+
+
+def detect_activities(frame, analysis_scale=1.0, history=None, timestamp=None, detector=None, face_locations=None,
+                      context=None):
     """
     Detecta atividades para todas as pessoas na cena.
+    :param analysis_scale: Fator de redução aplicado antes da pose. Os landmarks do MediaPipe são
+                           normalizados (0-1), então valem sem conversão para o frame em resolução original.
+    :param history: PoseHistory opcional com os frames anteriores (habilita regras temporais, ex.: andando, queda).
+    :param timestamp: Instante do frame (segundos), usado no cálculo das velocidades.
+    :param detector: SinglePoseDetector ou MultiPoseDetector do processador; sem ele, usa um Pose padrão do
+                     módulo (uma pessoa por frame), que não deve ser compartilhado entre vídeos simultâneos.
+    :param face_locations: Caixas dos rostos em resolução original (modo de recortes do MultiPoseDetector).
+    :param context: FrameContext opcional do frame; a versão RGB reduzida é compartilhada com a detecção de rostos.
     Retorna:
        - activities_list: lista (um item por pessoa) com as atividades detectadas (ex.: ["Braco Levantado", "Pessoa Sentada"])
-       - anomaly_detected: True se pelo menos uma pessoa tiver Braco levantado
-       - results: objeto do MediaPipe para desenho
+       - anomaly_detected: True se pelo menos uma pessoa tiver uma atividade de anomalia (Braco levantado, queda)
+       - pose_landmarks: array float32 (pessoas, 33, 4) com os landmarks normalizados
     """
-    image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    context = context or FrameContext(frame)
+    image_rgb = context.rgb(analysis_scale)
+    detector = detector or _default_pose
+    if face_locations and analysis_scale != 1.0:
+        face_locations = [tuple(int(v * analysis_scale) for v in location) for location in face_locations]
+    # A imagem pode ser um buffer do FramePool: ela precisa voltar a ser gravável mesmo se a pose falhar
     image_rgb.flags.writeable = False
-    results = pose.process(image_rgb)
-    image_rgb.flags.writeable = True
+    try:
+        pose_landmarks = detector.detect(image_rgb, face_locations, timestamp)
+    finally:
+        image_rgb.flags.writeable = True
 
-    activities_list = []
-    anomaly_detected = False
+    # Os landmarks são convertidos uma única vez num array (P, 33, 4) e as regras são avaliadas sobre todas as pessoas
+    activities_list = classify_poses(pose_landmarks, history, timestamp)
+    anomalies = set(anomaly_activities())
+    anomaly_detected = any(anomalies.intersection(person_activities) for person_activities in activities_list)
+    return activities_list, anomaly_detected, pose_landmarks
 
-    if results.pose_landmarks:
-        # Suporte para múltiplas detecções (se results.pose_landmarks for uma lista)
-        if isinstance(results.pose_landmarks, list):
-            all_landmarks = results.pose_landmarks
-        else:
-            all_landmarks = [results.pose_landmarks]
-
-        for landmarks in all_landmarks:
-            person_activities = []
-            # Detecção de Braco levantado: verifica se qualquer pulso está acima do respectivo ombro
-            try:
-                left_shoulder = landmarks.landmark[LEFT_SHOULDER]
-                right_shoulder = landmarks.landmark[RIGHT_SHOULDER]
-                left_wrist = landmarks.landmark[LEFT_WRIST]
-                right_wrist = landmarks.landmark[RIGHT_WRIST]
-                if left_wrist.y < left_shoulder.y or right_wrist.y < right_shoulder.y:
-                    person_activities.append("Braco Levantado")
-                    anomaly_detected = True
-            except Exception as e:
-                print(f"Erro ao detectar Braco levantado: {e}")
-
-            # Detecção de sentado ou em Pe
-            try:
-                left_hip = landmarks.landmark[LEFT_HIP]
-                right_hip = landmarks.landmark[RIGHT_HIP]
-                left_knee = landmarks.landmark[LEFT_KNEE]
-                right_knee = landmarks.landmark[RIGHT_KNEE]
-                left_ankle = landmarks.landmark[LEFT_ANKLE]
-                right_ankle = landmarks.landmark[RIGHT_ANKLE]
-
-                left_knee_angle = calculate_angle(left_hip, left_knee, left_ankle)
-                right_knee_angle = calculate_angle(right_hip, right_knee, right_ankle)
-
-                sitting_threshold = 130
-                standing_threshold = 160
-
-                if left_knee_angle < sitting_threshold and right_knee_angle < sitting_threshold:
-                    person_activities.append("Pessoa Sentada")
-                elif left_knee_angle > standing_threshold and right_knee_angle > standing_threshold:
-                    person_activities.append("Pessoa Em Pe")
-            except Exception as e:
-                print(f"Erro na detecção de sentado/em Pe: {e}")
-
-            activities_list.append(person_activities)
-    else:
-        activities_list = []
-
-    return activities_list, anomaly_detected, results
-
-
-def draw_landmarks(frame, results):
+
+def pose_landmarks_to_array(results):
+    """
+    Converte o resultado do MediaPipe num array único, uma vez por frame.
+    :return: Array float32 (pessoas, 33, 4) com landmarks [x, y, z, visibility] normalizados.
+    """
+    if not results or not results.pose_landmarks:
+        return empty_landmarks()
+    all_landmarks = results.pose_landmarks if isinstance(results.pose_landmarks, list) else [results.pose_landmarks]
+    return np.array([
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks.landmark]
+        for landmarks in all_landmarks
+    ], dtype=np.float32)
+
+
+def associate_faces_to_poses(face_locations, pose_landmarks, frame_shape):
+    """
+    Associa cada rosto ao esqueleto cuja região de cabeça/ombros contém o centro do rosto, com atribuição
+    húngara pelo custo (distância do centro do rosto à cabeça do esqueleto, em larguras de rosto).
+    :param face_locations: Caixas (top, right, bottom, left) em pixels.
+    :param pose_landmarks: Array (pessoas, 33, 4) normalizado.
+    :return: Lista (um item por rosto) com o índice da pose associada ou None.
+    """
+    assignment = [None] * len(face_locations)
+    if not len(face_locations) or not len(pose_landmarks):
+        return assignment
+    # O SciPy só é importado quando há rostos e poses a associar
+    from scipy.optimize import linear_sum_assignment
+
+    height, width = frame_shape[:2]
+    boxes = np.asarray(face_locations, dtype=np.float32).reshape(-1, 4)
+    face_widths = np.maximum(boxes[:, 1] - boxes[:, 3], 1.0)
+    centers = np.stack([(boxes[:, 1] + boxes[:, 3]) / 2.0, (boxes[:, 0] + boxes[:, 2]) / 2.0], axis=1)
+
+    # Pontos da cabeça e dos ombros em pixels; pontos pouco visíveis ficam fora da região
+    points = pose_landmarks[:, HEAD_LANDMARKS + SHOULDER_LANDMARKS, :2] * np.array([width, height], np.float32)
+    visible = pose_landmarks[:, HEAD_LANDMARKS + SHOULDER_LANDMARKS, 3] >= VISIBILITY_THRESHOLD
+    has_points = visible.any(axis=1)
+    region_min = np.where(visible[..., np.newaxis], points, np.inf).min(axis=1)
+    region_max = np.where(visible[..., np.newaxis], points, -np.inf).max(axis=1)
+
+    # Centro da cabeça: média dos pontos visíveis da cabeça (ou de cabeça e ombros, se a cabeça não estiver visível)
+    weights = visible.astype(np.float32)
+    head_weights = weights.copy()
+    head_weights[:, len(HEAD_LANDMARKS):] = 0.0
+    head_weights = np.where(head_weights.any(axis=1, keepdims=True), head_weights, weights)
+    head_centers = (points * head_weights[..., np.newaxis]).sum(axis=1) / \
+        np.maximum(head_weights.sum(axis=1), 1.0)[:, np.newaxis]
+
+    # Custos (rostos x poses) e restrição espacial: o centro do rosto deve cair na região cabeça/ombros
+    margin = HEAD_REGION_MARGIN * face_widths[:, np.newaxis, np.newaxis]
+    inside = ((centers[:, np.newaxis] >= region_min[np.newaxis] - margin) &
+              (centers[:, np.newaxis] <= region_max[np.newaxis] + margin)).all(axis=2) & has_points[np.newaxis]
+    cost = np.linalg.norm(centers[:, np.newaxis] - head_centers[np.newaxis], axis=2) / face_widths[:, np.newaxis]
+    cost = np.where(inside, cost, 1e6)
+
+    for face_index, pose_index in zip(*linear_sum_assignment(cost)):
+        if inside[face_index, pose_index]:
+            assignment[face_index] = int(pose_index)
+    return assignment
+
+
+def draw_landmarks(frame, pose_landmarks):
     """Desenha os landmarks e conexões do esqueleto no frame."""
-    if results and results.pose_landmarks:
-        if isinstance(results.pose_landmarks, list):
-            for landmarks in results.pose_landmarks:
-                mp_drawing.draw_landmarks(
-                    frame,
-                    landmarks,
-                    mp_pose.POSE_CONNECTIONS,
-                    landmark_drawing_spec=mp_drawing.DrawingSpec(color=(245,117,66), thickness=2, circle_radius=4),
-                    connection_drawing_spec=mp_drawing.DrawingSpec(color=(245,66,230), thickness=2, circle_radius=2)
-                )
-        else:
-            mp_drawing.draw_landmarks(
-                frame,
-                results.pose_landmarks,
-                mp_pose.POSE_CONNECTIONS,
-                landmark_drawing_spec=mp_drawing.DrawingSpec(color=(245,117,66), thickness=2, circle_radius=4),
-                connection_drawing_spec=mp_drawing.DrawingSpec(color=(245,66,230), thickness=2, circle_radius=2)
-            )
+    draw_pose(frame, pose_landmarks)
 
 
 if __name__ == "__main__":
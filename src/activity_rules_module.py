@@ -0,0 +1,287 @@
+import numpy as np
+
+# Índices dos keypoints relevantes (MediaPipe Pose)
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+
+SITTING_THRESHOLD = 130        # Ângulo do joelho (graus) abaixo do qual a pessoa está sentada
+STANDING_THRESHOLD = 160       # Ângulo do joelho (graus) acima do qual a pessoa está em pé
+VISIBILITY_THRESHOLD = 0.5     # Visibilidade mínima dos pontos usados nas regras temporais
+WALKING_SPEED = 0.6            # Velocidade horizontal do quadril (comprimentos de tronco por segundo)
+FALLING_SPEED = 1.5            # Velocidade de queda do quadril (comprimentos de tronco por segundo)
+FALLING_TILT = 45              # Inclinação mínima do tronco (graus em relação à vertical) numa queda
+POSE_MATCH_DISTANCE = 2.0      # Deslocamento máximo do tronco entre frames da mesma pessoa (comprimentos de tronco)
+
+
+class ActivityRule:
+    """Regra de atividade avaliada de uma vez sobre todas as pessoas do frame."""
+
+    def __init__(self, name, predicate, anomaly=False, temporal=False):
+        """
+        :param predicate: Função (landmarks (P, 33, 4), histórico) -> array bool (P,).
+        :param anomaly: Se True, a atividade conta como anomalia no relatório.
+        :param temporal: Se True, a regra precisa do histórico de landmarks (velocidades).
+        """
+        self.name = name
+        self.predicate = predicate
+        self.anomaly = anomaly
+        self.temporal = temporal
+
+
+# Registro de regras, avaliadas na ordem de registro (que também é a ordem das atividades no relatório)
+ACTIVITY_RULES = []
+
+
+def register_activity(name, anomaly=False, temporal=False):
+    """Decorador que adiciona uma regra ao registro: novas atividades não exigem mudar o laço de detecção."""
+    def decorator(predicate):
+        ACTIVITY_RULES.append(ActivityRule(name, predicate, anomaly, temporal))
+        return predicate
+    return decorator
+
+
+def anomaly_activities(rules=None):
+    """Nomes das atividades que caracterizam uma anomalia."""
+    return [rule.name for rule in (ACTIVITY_RULES if rules is None else rules) if rule.anomaly]
+
+
+def joint_angles(landmarks, first, middle, last):
+    """Ângulo (graus, 0-180) em `middle` para todas as pessoas: array (P,)."""
+    a = landmarks[:, first, :2] - landmarks[:, middle, :2]
+    b = landmarks[:, last, :2] - landmarks[:, middle, :2]
+    radians = np.arctan2(b[:, 1], b[:, 0]) - np.arctan2(a[:, 1], a[:, 0])
+    angles = np.abs(np.degrees(radians))
+    return np.where(angles > 180.0, 360.0 - angles, angles)
+
+
+def torso_length(landmarks):
+    """Distância entre o centro dos ombros e o centro do quadril (escala de cada pessoa): array (P,)."""
+    shoulders = landmarks[:, [LEFT_SHOULDER, RIGHT_SHOULDER], :2].mean(axis=1)
+    hips = landmarks[:, [LEFT_HIP, RIGHT_HIP], :2].mean(axis=1)
+    return np.maximum(np.linalg.norm(shoulders - hips, axis=1), 1e-6)
+
+
+def torso_center(landmarks):
+    """Centro do tronco (média dos ombros e do quadril) de cada pessoa: array (P, 2)."""
+    return landmarks[:, [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP], :2].mean(axis=1)
+
+
+def torso_tilt(landmarks):
+    """Inclinação do tronco em relação à vertical (graus): array (P,)."""
+    shoulders = landmarks[:, [LEFT_SHOULDER, RIGHT_SHOULDER], :2].mean(axis=1)
+    hips = landmarks[:, [LEFT_HIP, RIGHT_HIP], :2].mean(axis=1)
+    dx, dy = (shoulders - hips).T
+    return np.degrees(np.arctan2(np.abs(dx), np.abs(dy)))
+
+
+def _visible(landmarks, indices):
+    return (landmarks[:, indices, 3] >= VISIBILITY_THRESHOLD).all(axis=1)
+
+
+class PoseHistory:
+    """
+    Buffer circular pré-alocado com os landmarks dos últimos `window` frames analisados, usado pelas regras
+    temporais (velocidades). Cada pessoa ocupa uma vaga no buffer e é associada à pessoa mais próxima do frame
+    anterior pelo centro do tronco (ombros e quadril), de modo que a ordem das poses no array pode mudar entre
+    frames; a vaga de quem não encontra correspondente é reiniciada.
+    """
+
+    def __init__(self, window=8, default_fps=30.0, max_match_distance=POSE_MATCH_DISTANCE):
+        """
+        :param window: Número de frames analisados mantidos no buffer.
+        :param default_fps: Usado para estimar o intervalo entre frames quando não há timestamp.
+        :param max_match_distance: Deslocamento máximo do centro do tronco entre frames (comprimentos de tronco)
+                                   para considerar que é a mesma pessoa.
+        """
+        self.window = max(2, window)
+        self.default_fps = default_fps
+        self.max_match_distance = max_match_distance
+        self.reset()
+
+    def reset(self):
+        self._buffer = np.zeros((self.window, 0, 33, 4), dtype=np.float32)
+        self._times = np.zeros(self.window, dtype=np.float64)
+        self._frames = np.zeros(0, dtype=np.int64)      # Frames consecutivos de cada vaga até o mais recente
+        self._slots = np.zeros(0, dtype=np.int64)       # Vaga de cada pessoa do frame mais recente
+        self._centers = np.zeros((0, 2), dtype=np.float32)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._count = 0
+        self._next = 0
+
+    def _match(self, centers, scales):
+        """Associação gulosa, pelos pares mais próximos, das pessoas atuais às do frame anterior."""
+        matches = {}
+        if not len(centers) or not len(self._centers):
+            return matches
+        distances = np.linalg.norm(centers[:, None] - self._centers[None], axis=2)
+        distances /= np.maximum(scales[:, None], self._scales[None])
+        matched_previous = set()
+        for flat in np.argsort(distances, axis=None):
+            current, previous = (int(index) for index in np.unravel_index(flat, distances.shape))
+            if distances[current, previous] > self.max_match_distance:
+                break
+            if current in matches or previous in matched_previous:
+                continue
+            matches[current] = previous
+            matched_previous.add(previous)
+        return matches
+
+    def push(self, landmarks, timestamp=None):
+        """Adiciona os landmarks (P, 33, 4) de um frame; timestamp em segundos."""
+        if timestamp is None:
+            timestamp = self._times[self._next - 1] + 1.0 / self.default_fps if self._count else 0.0
+        centers = torso_center(landmarks)
+        scales = torso_length(landmarks)
+        matches = self._match(centers, scales)
+
+        slots = np.full(len(landmarks), -1, dtype=np.int64)
+        for current, previous in matches.items():
+            slots[current] = self._slots[previous]
+        frames = np.zeros_like(self._frames)
+        frames[slots[slots >= 0]] = self._frames[slots[slots >= 0]]
+        # Pessoas novas ocupam as vagas livres (as de quem saiu de cena são reiniciadas)
+        used = set(slots.tolist())
+        free = [slot for slot in range(len(frames)) if slot not in used]
+        for current in np.flatnonzero(slots < 0):
+            if not free:
+                self._buffer = np.concatenate([self._buffer, np.zeros((self.window, 1, 33, 4), np.float32)], axis=1)
+                frames = np.append(frames, 0)
+                free.append(len(frames) - 1)
+            slots[current] = free.pop(0)
+
+        self._buffer[self._next, slots] = landmarks
+        self._times[self._next] = timestamp
+        frames[slots] = np.minimum(frames[slots] + 1, self.window)
+        self._frames = frames
+        self._slots = slots
+        self._centers = centers
+        self._scales = scales
+        self._next = (self._next + 1) % self.window
+        self._count = min(self._count + 1, self.window)
+
+    def velocities(self):
+        """
+        Velocidade média (x, y por segundo) de cada landmark das pessoas do frame mais recente, entre o frame mais
+        antigo em que cada uma aparece no buffer e o mais recente (zero para quem acabou de surgir).
+        :return: Array (P, 33, 2) ou None se nenhuma pessoa tiver ainda dois frames.
+        """
+        frames = self._frames[self._slots]
+        if self._count < 2 or not (frames >= 2).any():
+            return None
+        newest = (self._next - 1) % self.window
+        oldest = (self._next - frames) % self.window
+        elapsed = self._times[newest] - self._times[oldest]
+        valid = (frames >= 2) & (elapsed > 0)
+        displacement = self._buffer[newest, self._slots, :, :2] - self._buffer[oldest, self._slots, :, :2]
+        return np.where(valid[:, None, None], displacement / np.where(valid, elapsed, 1.0)[:, None, None], 0.0)
+
+
+@register_activity("Braco Levantado", anomaly=True)
+def raised_arm(landmarks, history):
+    # Qualquer pulso acima do respectivo ombro
+    return (landmarks[:, LEFT_WRIST, 1] < landmarks[:, LEFT_SHOULDER, 1]) | \
+           (landmarks[:, RIGHT_WRIST, 1] < landmarks[:, RIGHT_SHOULDER, 1])
+
+
+@register_activity("Pessoa Sentada")
+def sitting(landmarks, history):
+    left = joint_angles(landmarks, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+    right = joint_angles(landmarks, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
+    return (left < SITTING_THRESHOLD) & (right < SITTING_THRESHOLD)
+
+
+@register_activity("Pessoa Em Pe")
+def standing(landmarks, history):
+    left = joint_angles(landmarks, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+    right = joint_angles(landmarks, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
+    return (left > STANDING_THRESHOLD) & (right > STANDING_THRESHOLD)
+
+
+@register_activity("Pessoa Andando", temporal=True)
+def walking(landmarks, history):
+    velocities = history.velocities()
+    hip_speed = np.abs(velocities[:, [LEFT_HIP, RIGHT_HIP], 0].mean(axis=1)) / torso_length(landmarks)
+    return (hip_speed > WALKING_SPEED) & (torso_tilt(landmarks) < FALLING_TILT) & \
+        _visible(landmarks, [LEFT_HIP, RIGHT_HIP, LEFT_ANKLE, RIGHT_ANKLE])
+
+
+@register_activity("Queda", anomaly=True, temporal=True)
+def falling(landmarks, history):
+    velocities = history.velocities()
+    # y cresce para baixo na imagem: velocidade positiva do quadril é descida
+    drop_speed = velocities[:, [LEFT_HIP, RIGHT_HIP], 1].mean(axis=1) / torso_length(landmarks)
+    return (drop_speed > FALLING_SPEED) & (torso_tilt(landmarks) >= FALLING_TILT) & \
+        _visible(landmarks, [LEFT_SHOULDER, RIGHT_SHOULDER, LEFT_HIP, RIGHT_HIP])
+
+
+def evaluate_rules(landmarks, history=None, rules=None):
+    """
+    Avalia todas as regras sobre todas as pessoas de uma vez.
+    :param landmarks: Array (P, 33, 4) com landmarks [x, y, z, visibility] normalizados.
+    :param history: PoseHistory já atualizado com este frame; sem ele, as regras temporais são ignoradas.
+    :return: Matriz bool (P, número de regras).
+    """
+    rules = ACTIVITY_RULES if rules is None else rules
+    matches = np.zeros((len(landmarks), len(rules)), dtype=bool)
+    if not len(landmarks):
+        return matches
+    has_velocities = history is not None and history.velocities() is not None
+    for j, rule in enumerate(rules):
+        if rule.temporal and not has_velocities:
+            continue
+        matches[:, j] = rule.predicate(landmarks, history)
+    return matches
+
+
+def classify_poses(landmarks, history=None, timestamp=None, rules=None):
+    """
+    Aplica as regras registradas aos landmarks de todas as pessoas de um frame.
+    :param history: PoseHistory opcional; é atualizado com este frame antes das regras temporais.
+    :param timestamp: Instante do frame (segundos), usado nas velocidades.
+    :return: Lista (um item por pessoa) com as atividades detectadas.
+    """
+    rules = ACTIVITY_RULES if rules is None else rules
+    landmarks = np.asarray(landmarks, dtype=np.float32).reshape(-1, 33, 4)
+    if history is not None:
+        history.push(landmarks, timestamp)
+    matches = evaluate_rules(landmarks, history, rules)
+    return [[rules[j].name for j in np.flatnonzero(row)] for row in matches]
+
+
+class PoseSequenceClassifier:
+    """
+    Reaplica as regras a landmarks gravados (ResultStore), frame a frame e em ordem, mantendo o histórico
+    para as regras temporais entre chamadas (chunks).
+    """
+
+    def __init__(self, fps=None, window=8, rules=None):
+        self.fps = fps
+        self.rules = rules
+        self.history = PoseHistory(window, fps or 30.0)
+
+    def __call__(self, landmarks, pose_counts, frame_numbers):
+        """
+        :param landmarks: Array (total de poses, 33, 4), frames concatenados em ordem.
+        :param pose_counts: Número de poses de cada frame.
+        :param frame_numbers: Número de cada frame (para o intervalo de tempo).
+        :return: Lista (uma por pose) com as atividades detectadas.
+        """
+        activities = []
+        offset = 0
+        for count, frame_number in zip(pose_counts, frame_numbers):
+            timestamp = frame_number / self.fps if self.fps else None
+            activities.extend(classify_poses(landmarks[offset:offset + count], self.history, timestamp, self.rules))
+            offset += count
+        return activities
+
+
+if __name__ == "__main__":
+    print("Este é o módulo activity_rules_module. Execute 'main.py' para iniciar a aplicação.")
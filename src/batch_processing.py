@@ -0,0 +1,267 @@
+import glob
+import hashlib
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+from video_processing import VideoProcessor, load_resume_state
+from report_module import ReportAggregator, write_report
+from render_module import MODE_ANNOTATE, MODE_PREVIEW
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".mpg", ".mpeg", ".wmv", ".webm")
+DEFAULT_WORKER_MEMORY_GB = 2.0      # Pico aproximado de um processo com TensorFlow, MediaPipe e dlib carregados
+DEFAULT_CHECKPOINT_INTERVAL = 300   # Frames entre gravações do estado retomável de cada vídeo
+
+# Estado de cada processo worker (carregado uma única vez pelo initializer do pool)
+_worker_state = {}
+
+
+def find_videos(inputs):
+    """
+    Lista os vídeos de entrada do lote, sem repetições e em ordem estável entre execuções.
+    :param inputs: Pastas (apenas o primeiro nível), padrões glob (ex.: "gravacoes/**/*.mp4") ou arquivos.
+    :return: Lista de caminhos.
+    """
+    videos = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in sorted(os.listdir(pattern))]
+        elif any(char in pattern for char in "*?["):
+            candidates = sorted(glob.glob(pattern, recursive=True))
+        elif os.path.isfile(pattern):
+            videos.append(pattern)
+            continue
+        else:
+            print(f"Aviso: entrada do lote não encontrada: {pattern}")
+            continue
+        videos.extend(path for path in candidates
+                      if os.path.isfile(path) and path.lower().endswith(VIDEO_EXTENSIONS))
+
+    unique = {}
+    for path in videos:
+        unique.setdefault(os.path.abspath(path), path)
+    return list(unique.values())
+
+
+def available_memory():
+    """Memória disponível em bytes (MemAvailable no Linux, sysconf nos demais Unix); None se desconhecida."""
+    try:
+        with open("/proc/meminfo", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def plan_workers(num_videos, max_workers=None, memory_per_worker_gb=DEFAULT_WORKER_MEMORY_GB):
+    """
+    Número de processos do lote: um por CPU (ou max_workers), limitado pela memória disponível e pelo número
+    de vídeos.
+    """
+    workers = max_workers or os.cpu_count() or 1
+    memory = available_memory()
+    if memory is not None and memory_per_worker_gb > 0:
+        workers = min(workers, max(1, int(memory // (memory_per_worker_gb * 1024 ** 3))))
+    return max(1, min(workers, num_videos))
+
+
+def job_name(video_path):
+    """Nome da pasta do vídeo no lote: nome do arquivo mais um hash do caminho (vídeos homônimos não colidem)."""
+    stem = os.path.splitext(os.path.basename(video_path))[0]
+    digest = hashlib.sha1(os.path.abspath(video_path).encode("utf-8")).hexdigest()[:8]
+    return f"{stem}_{digest}"
+
+
+def summarize_by_person(video_results):
+    """
+    Junta os agregadores dos vídeos (em ordem) num resumo do lote por pessoa: contadores somados, com os
+    track_ids deslocados por vídeo, e a lista de vídeos em que cada pessoa aparece.
+    :param video_results: Resultados de _process_video_job (apenas vídeos concluídos).
+    :return: Relatório no formato de report.json, com "total_videos", "videos" e, por pessoa, "videos" e
+             "video_count".
+    """
+    aggregator = ReportAggregator()
+    videos_by_person = {}
+    track_offset = 0
+    for result in video_results:
+        aggregator.merge(result["aggregator"], track_offset)
+        track_offset += result["track_count"]
+        for name in result["aggregator"].person_stats:
+            videos_by_person.setdefault(name, []).append(result["video_path"])
+
+    summary = aggregator.snapshot()
+    summary["total_videos"] = len(video_results)
+    summary["videos"] = [
+        {"video_path": result["video_path"], "report_path": result["report_path"],
+         "total_frames": result["aggregator"].total_frames, "anomaly_count": result["aggregator"].anomaly_count}
+        for result in video_results
+    ]
+    for name, stats in summary["person_statistics"].items():
+        stats["videos"] = videos_by_person[name]
+        stats["video_count"] = len(videos_by_person[name])
+    return summary
+
+
+def _init_worker(known_face_encodings, known_face_names, processor_kwargs):
+    _worker_state["known_face_encodings"] = known_face_encodings
+    _worker_state["known_face_names"] = known_face_names
+    _worker_state["processor_kwargs"] = processor_kwargs
+
+
+def _process_video_job(video_path, job_dir):
+    """
+    Processa um vídeo num processo worker, retomando do estado salvo se o vídeo foi interrompido, e grava o
+    relatório do vídeo. Erros são devolvidos no resultado (com a pasta do vídeo, onde fica o estado parcial)
+    para não interromper o restante do lote.
+    """
+    os.makedirs(job_dir, exist_ok=True)
+    kwargs = dict(_worker_state["processor_kwargs"])
+    # Os workers nunca abrem janela: no modo preview, cada vídeo apenas grava o seu vídeo anotado
+    if kwargs.get("mode", MODE_PREVIEW) == MODE_PREVIEW:
+        kwargs["mode"] = MODE_ANNOTATE
+    resume_path = os.path.join(job_dir, "state.json")
+    report_path = os.path.join(job_dir, "report.json")
+
+    # Um vídeo anotado interrompido fica ilegível: a parte retomada é gravada num arquivo próprio
+    state = load_resume_state(resume_path)
+    suffix = f"_from_{state['next_frame']}" if state is not None else ""
+    output_path = os.path.join(job_dir, f"annotated{suffix}.mp4")
+
+    try:
+        processor = VideoProcessor(video_path, output_path, _worker_state["known_face_encodings"],
+                                   _worker_state["known_face_names"], resume_path=resume_path, **kwargs)
+        processor.process_video()
+        processor.write_resume_state(completed=True)
+        write_report(processor.aggregator.snapshot(), report_path, plot=False)
+    except Exception as e:
+        return {"video_path": video_path, "job_dir": job_dir, "error": str(e)}
+    return {
+        "video_path": video_path,
+        "report_path": report_path,
+        "aggregator": processor.aggregator,
+        "track_count": processor.tracker.next_track_id if processor.tracker is not None else 0,
+    }
+
+
+class BatchProcessor:
+    """
+    Processa em lote os vídeos de pastas ou padrões glob num pool de processos dimensionado pelas CPUs e pela
+    memória disponível. Os rostos conhecidos são carregados uma vez e enviados a cada processo na sua criação.
+    Cada vídeo grava periodicamente um estado retomável (próximo frame e agregados parciais): ao executar o
+    mesmo lote de novo, vídeos concluídos são pulados e vídeos interrompidos continuam do frame salvo.
+    """
+
+    def __init__(self, inputs, output_dir, known_face_encodings, known_face_names, num_workers=None,
+                 memory_per_worker_gb=DEFAULT_WORKER_MEMORY_GB, checkpoint_interval=None, **processor_kwargs):
+        """
+        :param inputs: Pastas, padrões glob ou arquivos de vídeo.
+        :param output_dir: Pasta do lote: uma subpasta por vídeo (report.json, state.json e vídeo anotado) e o
+                           resumo combinado summary.json.
+        :param num_workers: Número máximo de processos (padrão: número de CPUs).
+        :param memory_per_worker_gb: Memória estimada por processo, usada para limitar o número de processos.
+        :param checkpoint_interval: Grava o estado retomável de cada vídeo a cada N frames.
+        :param processor_kwargs: Parâmetros repassados a cada VideoProcessor (frame_skip, resize_factor, ...).
+        """
+        self.inputs = inputs
+        self.output_dir = output_dir
+        self.known_face_encodings = known_face_encodings
+        self.known_face_names = known_face_names
+        self.num_workers = num_workers
+        self.memory_per_worker_gb = memory_per_worker_gb
+        processor_kwargs["checkpoint_interval"] = checkpoint_interval or DEFAULT_CHECKPOINT_INTERVAL
+        processor_kwargs["keep_records"] = False
+        self.processor_kwargs = processor_kwargs
+        self.summary_path = os.path.join(output_dir, "summary.json")
+
+    def run(self):
+        """
+        Processa os vídeos pendentes e grava os relatórios por vídeo e o resumo combinado por pessoa.
+        :return: Resumo do lote (o mesmo de summary.json).
+        """
+        videos = find_videos(self.inputs)
+        if not videos:
+            print("Nenhum vídeo encontrado para o lote.")
+            return None
+
+        results = {}
+        pending = []
+        for video_path in videos:
+            job_dir = os.path.join(self.output_dir, job_name(video_path))
+            state = load_resume_state(os.path.join(job_dir, "state.json"))
+            if state is not None and state.get("completed"):
+                results[video_path] = self._completed_result(video_path, job_dir, state)
+            else:
+                pending.append((video_path, job_dir))
+        print(f"Lote: {len(videos)} vídeos ({len(results)} já concluídos, {len(pending)} pendentes).")
+
+        failed = []
+        try:
+            if pending:
+                self._process_pending(pending, results, failed)
+        finally:
+            # O resumo é gravado mesmo se o pool quebrar ou o lote for interrompido
+            summary = summarize_by_person([results[video_path] for video_path in videos if video_path in results])
+            summary["failed_videos"] = [
+                {"video_path": r["video_path"], "job_dir": r["job_dir"], "error": r["error"]} for r in failed
+            ]
+            write_report(summary, self.summary_path)
+        if failed:
+            print(f"{len(failed)} vídeo(s) com erro; execute o lote novamente para tentar de novo.")
+        return summary
+
+    def _process_pending(self, pending, results, failed):
+        """Processa os vídeos pendentes no pool, guardando os concluídos em results e os com erro em failed."""
+        num_workers = plan_workers(len(pending), self.num_workers, self.memory_per_worker_gb)
+        print(f"Processando {len(pending)} vídeos em {num_workers} processos...")
+        # "spawn" evita herdar estado do TensorFlow/MediaPipe do processo principal
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.known_face_encodings, self.known_face_names, self.processor_kwargs),
+        ) as executor:
+            jobs = {executor.submit(_process_video_job, video_path, job_dir): (video_path, job_dir)
+                    for video_path, job_dir in pending}
+            for done, future in enumerate(as_completed(jobs), 1):
+                video_path, job_dir = jobs[future]
+                try:
+                    result = future.result()
+                except BrokenProcessPool as e:
+                    # Um worker morreu (ex.: falta de memória): este e os demais vídeos em andamento falham
+                    result = {"video_path": video_path, "job_dir": job_dir,
+                              "error": f"processo do lote encerrado inesperadamente ({e})"}
+                except Exception as e:
+                    result = {"video_path": video_path, "job_dir": job_dir, "error": str(e)}
+                if "error" in result:
+                    failed.append(result)
+                    print(f"[{done}/{len(pending)}] Erro ao processar o vídeo {result['video_path']}: "
+                          f"{result['error']}")
+                    continue
+                results[result["video_path"]] = result
+                print(f"[{done}/{len(pending)}] {result['video_path']}: "
+                      f"{result['aggregator'].total_frames} frames")
+
+    @staticmethod
+    def _completed_result(video_path, job_dir, state):
+        """Resultado de um vídeo concluído numa execução anterior, a partir do seu estado salvo."""
+        aggregator = ReportAggregator.from_state(state["aggregator"])
+        report_path = os.path.join(job_dir, "report.json")
+        if not os.path.exists(report_path):
+            write_report(aggregator.snapshot(), report_path, plot=False)
+        return {
+            "video_path": video_path,
+            "report_path": report_path,
+            "aggregator": aggregator,
+            "track_count": state.get("track_count", 0),
+        }
+
+
+if __name__ == "__main__":
+    print("Este é o módulo batch_processing. Execute 'main.py' para iniciar a aplicação.")
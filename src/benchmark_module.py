@@ -0,0 +1,433 @@
+import json
+import os
+import platform
+import statistics
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+from face_recognition_module import load_known_faces, recognize_faces, detect_faces
+from face_detection_module import create_face_detector
+from emotion_analysis_module import analyze_emotions
+from activity_detection_module import detect_activities
+from activity_rules_module import PoseHistory
+from face_gallery_module import FaceGallery, IMAGE_EXTENSIONS
+from report_module import generate_report
+from render_module import MODE_ANALYSIS
+from model_registry_module import registry
+
+# Cargas de trabalho da suíte (modo rápido usa apenas o primeiro item de cada uma)
+RESOLUTIONS = ((640, 360), (1280, 720))
+GALLERY_SIZES = (100, 1000, 10000)      # Identidades sintéticas somadas às imagens reais
+FACE_COUNTS = (1, 2, 4, 8)
+REPORT_DETECTIONS = (1000, 10000, 100000)
+CLIP_FRAMES = 60
+CLIP_FACES = (1, 3)
+DETECTOR_BACKENDS = ("hog", "mediapipe", "cascade")   # yunet entra com o modelo .onnx
+DEFAULT_REPEATS = 5
+DEFAULT_THRESHOLD = 0.2                 # Regressão: 20% mais lento que o baseline
+SEED = 1234
+
+
+def load_face_crops(images_folder, padding=0.3):
+    """
+    Recorta os rostos das imagens de referência (com margem), usados para compor os frames sintéticos.
+    :return: Lista de recortes BGR.
+    """
+    face_recognition = registry.get("face_recognition")
+    crops = []
+    for filename in sorted(os.listdir(images_folder)):
+        if not filename.lower().endswith(IMAGE_EXTENSIONS):
+            continue
+        image = cv2.imread(os.path.join(images_folder, filename))
+        if image is None:
+            continue
+        locations = face_recognition.face_locations(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        if not locations:
+            continue
+        top, right, bottom, left = locations[0]
+        pad_y = int((bottom - top) * padding)
+        pad_x = int((right - left) * padding)
+        crops.append(image[max(0, top - pad_y):bottom + pad_y, max(0, left - pad_x):right + pad_x].copy())
+    if not crops:
+        raise ValueError(f"Nenhum rosto encontrado nas imagens de {images_folder}")
+    return crops
+
+
+def synthetic_frame(crops, num_faces, frame_size, frame_index=0, seed=SEED):
+    """
+    Compõe um frame com `num_faces` rostos sobre um fundo com ruído, em posições de grade que se deslocam
+    levemente a cada frame. O mesmo (seed, frame_index) gera sempre o mesmo frame.
+    :param frame_size: Tupla (largura, altura).
+    :return: Tupla (frame BGR, lista de caixas (top, right, bottom, left)).
+    """
+    width, height = frame_size
+    rng = np.random.default_rng(seed + frame_index)
+    gradient = np.linspace(60, 160, width, dtype=np.float32)[np.newaxis, :, np.newaxis]
+    frame = np.clip(gradient + rng.normal(0, 8, (height, width, 3)), 0, 255).astype(np.uint8)
+
+    columns = int(np.ceil(np.sqrt(num_faces)))
+    rows = int(np.ceil(num_faces / columns))
+    cell_width = width // columns
+    cell_height = height // rows
+    face_size = int(min(cell_width, cell_height) * 0.6)
+    shift = int(4 * np.sin(frame_index / 5.0))
+    locations = []
+    for i in range(num_faces):
+        crop = crops[i % len(crops)]
+        scale = face_size / max(crop.shape[:2])
+        face = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        face_height, face_width = face.shape[:2]
+        row, column = divmod(i, columns)
+        top = row * cell_height + (cell_height - face_height) // 2 + shift
+        left = column * cell_width + (cell_width - face_width) // 2 + shift
+        top = min(max(0, top), height - face_height)
+        left = min(max(0, left), width - face_width)
+        frame[top:top + face_height, left:left + face_width] = face
+        locations.append((top, left + face_width, top + face_height, left))
+    return frame, locations
+
+
+def write_synthetic_clip(clip_path, crops, num_faces, frame_size, num_frames=CLIP_FRAMES, fps=25.0):
+    """Grava um clipe sintético (MJPG) reprodutível com frames de synthetic_frame."""
+    out = cv2.VideoWriter(clip_path, cv2.VideoWriter_fourcc(*'MJPG'), fps, frame_size)
+    try:
+        for frame_index in range(num_frames):
+            out.write(synthetic_frame(crops, num_faces, frame_size, frame_index)[0])
+    finally:
+        out.release()
+    return clip_path
+
+
+def current_rss():
+    """Memória residente (RSS) atual do processo em bytes, lida de /proc/self/statm; None fora do Linux."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def max_rss():
+    """Pico de RSS do processo desde o início (getrusage), em bytes; None se indisponível."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def measure_peak_rss(func, interval=0.002):
+    """
+    Executa func uma vez amostrando o RSS do processo numa thread à parte. Ao contrário do tracemalloc, o RSS
+    inclui os buffers nativos (numpy, OpenCV, dlib, TensorFlow), que é onde está a memória deste pipeline.
+    :return: Tupla (pico de RSS durante a execução, aumento do pico em relação ao RSS antes dela), em MB;
+             (None, None) se o RSS não puder ser medido.
+    """
+    before = current_rss()
+    if before is None:
+        # Sem amostragem: só o pico do processo, que não desce (mede apenas execuções que o superam)
+        before_max = max_rss()
+        func()
+        after_max = max_rss()
+        if before_max is None or after_max is None:
+            return None, None
+        return after_max / (1024 * 1024), max(0, after_max - before_max) / (1024 * 1024)
+
+    peak = [before]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            rss = current_rss()
+            if rss is not None and rss > peak[0]:
+                peak[0] = rss
+
+    sampler = threading.Thread(target=sample, name="rss-sampler", daemon=True)
+    sampler.start()
+    try:
+        func()
+    finally:
+        done.set()
+        sampler.join()
+    peak[0] = max(peak[0], current_rss() or 0)
+    return peak[0] / (1024 * 1024), (peak[0] - before) / (1024 * 1024)
+
+
+def measure(func, items=1, repeats=DEFAULT_REPEATS, warmup=1, unit="items"):
+    """
+    Mede uma função: `warmup` execuções descartadas, `repeats` execuções cronometradas e uma execução
+    separada, com amostragem do RSS, para o pico de memória (a amostragem não entra nos tempos).
+    :param items: Itens processados por execução (frames, rostos, detecções), usado na vazão.
+    :return: Dicionário com seconds_median, seconds_min, throughput, unit, peak_memory_mb (aumento do RSS
+             durante a execução), peak_rss_mb e repeats.
+    """
+    for _ in range(warmup):
+        func()
+    times = []
+    for _ in range(max(1, repeats)):
+        start_time = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start_time)
+
+    peak_rss, peak_memory = measure_peak_rss(func)
+
+    median = statistics.median(times)
+    return {
+        "seconds_median": median,
+        "seconds_min": min(times),
+        "throughput": items / median if median > 0 else None,
+        "unit": f"{unit}/s",
+        "peak_memory_mb": peak_memory,
+        "peak_rss_mb": peak_rss,
+        "repeats": len(times),
+    }
+
+
+def _synthetic_gallery(known_face_encodings, known_face_names, size, seed=SEED):
+    """Galeria com as imagens reais mais `size` identidades sintéticas (encodings aleatórios normalizados)."""
+    rng = np.random.default_rng(seed)
+    encodings = rng.normal(0, 1, (size, 128)).astype(np.float32)
+    encodings *= 0.6 / np.linalg.norm(encodings, axis=1, keepdims=True)
+    names = [f"sintetico_{i}" for i in range(size)]
+    all_encodings = list(known_face_encodings) + list(encodings)
+    all_names = list(known_face_names) + names
+    return all_encodings, all_names, FaceGallery(all_encodings, all_names)
+
+
+def bench_load_known_faces(images_folder, work_dir, repeats):
+    results = {}
+    image_count = sum(1 for f in os.listdir(images_folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+    # Sem cache: todas as imagens são codificadas (cada execução usa um arquivo de cache novo)
+    counter = iter(range(1 << 30))
+
+    def cold():
+        FaceGallery.from_folder(images_folder, os.path.join(work_dir, f"cold_{next(counter)}.npz"))
+
+    results["load_known_faces[cache=cold]"] = measure(cold, image_count, repeats, unit="images")
+    cache_path = os.path.join(work_dir, "warm.npz")
+    FaceGallery.from_folder(images_folder, cache_path)
+    results["load_known_faces[cache=warm]"] = measure(
+        lambda: load_known_faces(images_folder, cache_path), image_count, repeats, unit="images")
+    return results
+
+
+def bench_recognize_faces(crops, known_face_encodings, known_face_names, gallery_sizes, frame_size, repeats):
+    results = {}
+    frame, _ = synthetic_frame(crops, 2, frame_size)
+    for size in gallery_sizes:
+        encodings, names, gallery = _synthetic_gallery(known_face_encodings, known_face_names, size)
+        results[f"recognize_faces[gallery={len(names)}]"] = measure(
+            lambda: recognize_faces(frame, encodings, names, gallery), 1, repeats, unit="frames")
+        # Apenas a comparação com a galeria, isolada da detecção e dos encodings
+        queries = np.random.default_rng(SEED).normal(0, 0.05, (8, 128)).astype(np.float32)
+        results[f"gallery_match[gallery={len(names)},faces=8]"] = measure(
+            lambda: gallery.match(queries), 8, repeats, unit="faces")
+    return results
+
+
+def bench_detect_faces(crops, backends, face_counts, frame_size, repeats):
+    """Detecção de rostos por backend, no frame inteiro (a cascata mantém o estado entre as repetições)."""
+    results = {}
+    frames = [synthetic_frame(crops, num_faces, frame_size)[0] for num_faces in face_counts]
+    for name, options in backends.items():
+        detector = None
+        try:
+            detector = create_face_detector(name, **options)
+            for num_faces, frame in zip(face_counts, frames):
+                results[f"detect_faces[backend={name},faces={num_faces}]"] = measure(
+                    lambda: detect_faces(frame, detector=detector), 1, repeats, unit="frames")
+        except Exception as e:
+            print(f"Aviso: detector {name} indisponível: {e}")
+        finally:
+            if detector is not None:
+                detector.close()
+    return results
+
+
+def bench_analyze_emotions(crops, face_counts, frame_size, repeats):
+    results = {}
+    for num_faces in face_counts:
+        frame, locations = synthetic_frame(crops, num_faces, frame_size)
+        results[f"analyze_emotions[faces={num_faces}]"] = measure(
+            lambda: analyze_emotions(frame, locations), num_faces, repeats, unit="faces")
+    return results
+
+
+def bench_detect_activities(crops, resolutions, repeats):
+    results = {}
+    for frame_size in resolutions:
+        frame, _ = synthetic_frame(crops, 1, frame_size)
+        history = PoseHistory()
+        results[f"detect_activities[{frame_size[0]}x{frame_size[1]}]"] = measure(
+            lambda: detect_activities(frame, history=history), 1, repeats, unit="frames")
+    return results
+
+
+def _synthetic_records(num_detections, num_people=10, seed=SEED):
+    rng = np.random.default_rng(seed)
+    emotions = ["angry", "happy", "neutral", "sad", "surprise"]
+    activities = ["Pessoa Sentada", "Pessoa Em Pe", "Braco Levantado", "Indefinido"]
+    people = rng.integers(0, num_people, num_detections)
+    face_data = [{"face_id": i, "name": f"pessoa_{p}", "location": (0, 10, 10, 0)} for i, p in enumerate(people)]
+    emotion_data = [{"face_id": i, "label": emotions[e]}
+                    for i, e in enumerate(rng.integers(0, len(emotions), num_detections))]
+    activity_data = [{"face_id": i, "activities": [activities[a]]}
+                     for i, a in enumerate(rng.integers(0, len(activities), num_detections))]
+    return face_data, emotion_data, activity_data
+
+
+def bench_generate_report(detection_counts, work_dir, repeats):
+    results = {}
+    report_path = os.path.join(work_dir, "reports", "report.json")
+    for count in detection_counts:
+        face_data, emotion_data, activity_data = _synthetic_records(count)
+        results[f"generate_report[detections={count}]"] = measure(
+            lambda: generate_report(face_data, emotion_data, activity_data, count, 0, report_path, plot=False),
+            count, repeats, unit="detections")
+    return results
+
+
+def bench_video_processor(clips, known_face_encodings, known_face_names, repeats, frame_skip=2):
+    """Ponta a ponta: VideoProcessor no modo de análise (sem vídeo de saída) sobre cada clipe."""
+    from video_processing import VideoProcessor
+
+    results = {}
+    for name, clip_path in clips.items():
+        cap = cv2.VideoCapture(clip_path)
+        num_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        processor = VideoProcessor(clip_path, None, known_face_encodings, known_face_names, frame_skip=frame_skip,
+                                   mode=MODE_ANALYSIS, keep_records=False)
+        results[f"video_processor[{name},frame_skip={frame_skip}]"] = measure(
+            processor.process_video, num_frames, repeats, warmup=0, unit="frames")
+    return results
+
+
+def environment_info():
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+    }
+
+
+def run_benchmarks(images_folder, output_path=None, quick=False, videos=(), repeats=None, work_dir=None,
+                   yunet_model=None):
+    """
+    Executa a suíte completa, offline: imagens de images_folder e clipes sintéticos gerados na hora
+    (mesma semente, mesmos frames). Vídeos gravados podem ser incluídos no teste ponta a ponta.
+    :param quick: Se True, usa apenas a menor carga de cada benchmark e menos repetições.
+    :param videos: Caminhos de vídeos gravados, medidos também com o VideoProcessor.
+    :param yunet_model: Modelo .onnx do YuNet; com ele, o detector yunet também é medido.
+    :return: Dicionário com "created", "environment", "quick" e "benchmarks" {nome: medidas}.
+    """
+    repeats = repeats or (2 if quick else DEFAULT_REPEATS)
+    resolutions = RESOLUTIONS[:1] if quick else RESOLUTIONS
+    gallery_sizes = GALLERY_SIZES[:1] if quick else GALLERY_SIZES
+    face_counts = FACE_COUNTS[:2] if quick else FACE_COUNTS
+    detection_counts = REPORT_DETECTIONS[:1] if quick else REPORT_DETECTIONS
+    clip_faces = CLIP_FACES[:1] if quick else CLIP_FACES
+    detector_backends = {name: {} for name in DETECTOR_BACKENDS}
+    if yunet_model:
+        detector_backends["yunet"] = {"model_path": yunet_model}
+
+    with tempfile.TemporaryDirectory(prefix="benchmark_", dir=work_dir) as temp_dir:
+        crops = load_face_crops(images_folder)
+        known_face_encodings, known_face_names = load_known_faces(images_folder, os.path.join(temp_dir, "cache.npz"))
+
+        clips = {}
+        for frame_size in resolutions:
+            for num_faces in clip_faces:
+                name = f"synthetic_{frame_size[0]}x{frame_size[1]}_faces={num_faces}"
+                clips[name] = write_synthetic_clip(os.path.join(temp_dir, f"{name}.avi"), crops, num_faces,
+                                                   frame_size)
+        for video_path in videos:
+            clips[os.path.basename(video_path)] = video_path
+
+        benchmarks = {}
+        stages = [
+            ("load_known_faces", lambda: bench_load_known_faces(images_folder, temp_dir, repeats)),
+            ("detect_faces", lambda: bench_detect_faces(crops, detector_backends, face_counts, resolutions[0],
+                                                        repeats)),
+            ("recognize_faces", lambda: bench_recognize_faces(crops, known_face_encodings, known_face_names,
+                                                              gallery_sizes, resolutions[0], repeats)),
+            ("analyze_emotions", lambda: bench_analyze_emotions(crops, face_counts, resolutions[0], repeats)),
+            ("detect_activities", lambda: bench_detect_activities(crops, resolutions, repeats)),
+            ("generate_report", lambda: bench_generate_report(detection_counts, temp_dir, repeats)),
+            ("video_processor", lambda: bench_video_processor(clips, known_face_encodings, known_face_names,
+                                                              max(1, repeats // 2))),
+        ]
+        for stage, run in stages:
+            print(f"Benchmark: {stage}...")
+            benchmarks.update(run())
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment_info(),
+        "quick": quick,
+        "benchmarks": benchmarks,
+    }
+    if output_path:
+        write_benchmark_results(results, output_path)
+    return results
+
+
+def write_benchmark_results(results, output_path):
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4, ensure_ascii=False)
+    print(f"Resultados do benchmark salvos em: {output_path}")
+
+
+def load_benchmark_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_with_baseline(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compara o tempo mediano de cada benchmark com o baseline (apenas os presentes nos dois).
+    :param threshold: Aumento relativo tolerado (0.2 = até 20% mais lento).
+    :return: Lista de regressões (nome, segundos no baseline, segundos atuais, variação relativa).
+    """
+    regressions = []
+    print(f"Comparação com o baseline (limite de regressão: {threshold:.0%}):")
+    for name, current in results["benchmarks"].items():
+        previous = baseline.get("benchmarks", {}).get(name)
+        if previous is None or not previous["seconds_median"]:
+            continue
+        change = current["seconds_median"] / previous["seconds_median"] - 1.0
+        regressed = change > threshold
+        status = "REGRESSÃO" if regressed else "ok"
+        memory = ""
+        if previous["peak_rss_mb"] is not None and current["peak_rss_mb"] is not None:
+            memory = f" RSS {previous['peak_rss_mb']:.0f}MB -> {current['peak_rss_mb']:.0f}MB"
+        print(f"  {name:<55} {previous['seconds_median'] * 1000:10.2f}ms -> "
+              f"{current['seconds_median'] * 1000:10.2f}ms ({change:+.1%}) {status}{memory}")
+        if regressed:
+            regressions.append((name, previous["seconds_median"], current["seconds_median"], change))
+    return regressions
+
+
+def print_benchmark_results(results):
+    for name, stats in results["benchmarks"].items():
+        memory = "-"
+        if stats["peak_rss_mb"] is not None:
+            memory = f"+{stats['peak_memory_mb']:.1f}MB (RSS {stats['peak_rss_mb']:.0f}MB)"
+        throughput = f"{stats['throughput']:.1f} {stats['unit']}" if stats["throughput"] else "-"
+        print(f"  {name:<55} {stats['seconds_median'] * 1000:10.2f}ms  {throughput:>22}  pico {memory}")
+
+
+if __name__ == "__main__":
+    print("Este é o módulo benchmark_module. Execute 'main.py' para iniciar a aplicação.")
@@ -1,15 +1,38 @@
-from deepface import DeepFace
+import cv2
+import numpy as np
+from model_registry_module import registry
+from profiling_module import report_error
 
+# Ordem das saídas do modelo de emoções do DeepFace
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+EMOTION_INPUT_SIZE = (48, 48)
 
-def analyze_emotions(frame, face_locations):
+
+def _build_emotion_model():
+    # Importar o DeepFace carrega o TensorFlow: só acontece quando a análise de emoções é usada
+    from deepface import DeepFace
+    return DeepFace.build_model(model_name="Emotion", task="facial_attribute").model
+
+
+registry.register("emotion", _build_emotion_model)
+
+
+def get_emotion_model():
+    """Carrega uma única vez o modelo Keras de emoções do DeepFace e o reutiliza nas chamadas seguintes."""
+    return registry.get("emotion")
+
+
+def preprocess_face_crops(frame, face_locations):
     """
-    Analisa as expressões emocionais dos rostos detectados no frame.
-    :param frame: Imagem (frame) do vídeo.
+    Recorta, converte para tons de cinza, redimensiona e normaliza os rostos de um frame.
+    :param frame: Imagem (frame) do vídeo, em BGR.
     :param face_locations: Lista de tuplas (top, right, bottom, left) para cada rosto.
-    :return: Lista de strings com a emoção dominante para cada rosto.
+    :return: Tuple (tensor float32 de shape (n, 48, 48, 1), lista de índices válidos em face_locations).
     """
-    emotions = []
-    for (top, right, bottom, left) in face_locations:
+    # Os recortes são views do frame; cada um é reduzido direto na sua linha do lote (sem np.stack)
+    resized = np.empty((len(face_locations), *EMOTION_INPUT_SIZE), dtype=np.uint8)
+    valid_indices = []
+    for i, (top, right, bottom, left) in enumerate(face_locations):
         top = max(0, top)
         right = min(frame.shape[1], right)
         bottom = min(frame.shape[0], bottom)
@@ -17,21 +40,59 @@ def analyze_emotions(frame, face_locations):
 
         face_frame = frame[top:bottom, left:right]
         if face_frame.size == 0:
-            emotions.append("Desconhecido")
             continue
+        gray = cv2.cvtColor(face_frame, cv2.COLOR_BGR2GRAY)
+        cv2.resize(gray, EMOTION_INPUT_SIZE, dst=resized[len(valid_indices)], interpolation=cv2.INTER_AREA)
+        valid_indices.append(i)
+
+    batch = resized[:len(valid_indices), ..., np.newaxis].astype(np.float32)
+    batch *= 1.0 / 255.0
+    return batch, valid_indices
+
 
+def analyze_emotions_batch(frames_and_locations, return_probabilities=False):
+    """
+    Analisa as emoções de todos os rostos de um ou mais frames com uma única passada do modelo.
+    :param frames_and_locations: Lista de tuplas (frame, face_locations).
+    :param return_probabilities: Se True, retorna também o vetor de probabilidades de cada rosto.
+    :return: Lista (um item por frame) com as emoções dominantes; com return_probabilities, cada item é
+             uma tupla (emoções, array float32 de shape (n_rostos, 7) na ordem de EMOTION_LABELS).
+    """
+    batches = []
+    slots = []  # (índice do frame, índice do rosto) de cada linha do tensor
+    emotions = []
+    probabilities = []
+    for frame_index, (frame, face_locations) in enumerate(frames_and_locations):
+        batch, valid_indices = preprocess_face_crops(frame, face_locations)
+        batches.append(batch)
+        slots.extend((frame_index, face_index) for face_index in valid_indices)
+        emotions.append(["Desconhecido"] * len(face_locations))
+        probabilities.append(np.zeros((len(face_locations), len(EMOTION_LABELS)), dtype=np.float32))
+
+    if slots:
         try:
-            analysis = DeepFace.analyze(face_frame, actions=['emotion'], enforce_detection=False)
-            if isinstance(analysis, list) and len(analysis) > 0:
-                emotion = analysis[0].get('dominant_emotion', 'Desconhecido')
-            else:
-                emotion = analysis.get('dominant_emotion', 'Desconhecido')
-            emotions.append(emotion)
+            predictions = np.asarray(get_emotion_model().predict_on_batch(np.concatenate(batches)))
+            for (frame_index, face_index), scores in zip(slots, predictions):
+                emotions[frame_index][face_index] = EMOTION_LABELS[int(scores.argmax())]
+                probabilities[frame_index][face_index] = scores
         except Exception as e:
-            print(f"Erro ao analisar emoções: {e}")
-            emotions.append("Desconhecido")
+            report_error("emotion", e)
+
+    if return_probabilities:
+        return list(zip(emotions, probabilities))
     return emotions
 
 
+def analyze_emotions(frame, face_locations, return_probabilities=False):
+    """
+    Analisa as expressões emocionais dos rostos detectados no frame.
+    :param frame: Imagem (frame) do vídeo.
+    :param face_locations: Lista de tuplas (top, right, bottom, left) para cada rosto.
+    :param return_probabilities: Se True, retorna uma tupla (emoções, probabilidades).
+    :return: Lista de strings com a emoção dominante para cada rosto.
+    """
+    return analyze_emotions_batch([(frame, face_locations)], return_probabilities)[0]
+
+
 if __name__ == "__main__":
     print("Este é o módulo emotion_analysis_module. Execute 'main.py' para iniciar a aplicação.")
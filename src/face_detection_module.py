@@ -0,0 +1,271 @@
+import threading
+
+import cv2
+import numpy as np
+from model_registry_module import registry
+
+# Backends disponíveis: nome -> classe (ver register_detector)
+DETECTOR_BACKENDS = {}
+
+
+def register_detector(name):
+    """Decorador que adiciona um backend de detecção ao registro, selecionável pelo nome."""
+    def decorator(cls):
+        cls.name = name
+        DETECTOR_BACKENDS[name] = cls
+        return cls
+    return decorator
+
+
+def create_face_detector(name="hog", **options):
+    """
+    Cria um detector de rostos pelo nome do backend.
+    :param name: "hog" (dlib), "mediapipe", "yunet" (OpenCV DNN) ou "cascade".
+    :param options: Parâmetros repassados ao construtor do backend.
+    """
+    if name not in DETECTOR_BACKENDS:
+        raise ValueError(f"Detector de rostos desconhecido: {name} (opções: {', '.join(DETECTOR_BACKENDS)})")
+    return DETECTOR_BACKENDS[name](**options)
+
+
+def clip_location(top, right, bottom, left, frame_shape):
+    height, width = frame_shape[:2]
+    return max(0, int(top)), min(width, int(right)), min(height, int(bottom)), max(0, int(left))
+
+
+def iou_matrix(locations_a, locations_b):
+    """
+    Interseção sobre união entre duas listas de caixas (top, right, bottom, left).
+    :return: Matriz (len(a), len(b)).
+    """
+    a = np.asarray(locations_a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(locations_b, dtype=np.float32).reshape(-1, 4)
+    top = np.maximum(a[:, np.newaxis, 0], b[np.newaxis, :, 0])
+    right = np.minimum(a[:, np.newaxis, 1], b[np.newaxis, :, 1])
+    bottom = np.minimum(a[:, np.newaxis, 2], b[np.newaxis, :, 2])
+    left = np.maximum(a[:, np.newaxis, 3], b[np.newaxis, :, 3])
+    intersection = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 1] - a[:, 3]) * (a[:, 2] - a[:, 0])
+    area_b = (b[:, 1] - b[:, 3]) * (b[:, 2] - b[:, 0])
+    union = area_a[:, np.newaxis] + area_b[np.newaxis, :] - intersection
+    return np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+
+
+class FaceDetector:
+    """
+    Interface dos backends de detecção. Todos recebem o frame em BGR e devolvem caixas (top, right, bottom, left)
+    em pixels do frame recebido, o mesmo formato usado pelos encodings, pela análise de emoções e pelo desenho.
+    """
+
+    name = None
+    uses_rgb = True   # Se True, aproveita a versão RGB já calculada do frame (FrameContext)
+
+    def detect(self, frame, image_rgb=None):
+        """
+        :param frame: Imagem BGR.
+        :param image_rgb: Mesma imagem em RGB, se já disponível (evita uma conversão).
+        :return: Tupla (lista de caixas (top, right, bottom, left), array float32 com a confiança de cada caixa).
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+@register_detector("hog")
+class HogFaceDetector(FaceDetector):
+    """HOG do dlib (face_recognition.face_locations): o detector original, mais lento, sem confiança por caixa."""
+
+    def __init__(self, upsample=1):
+        """
+        :param upsample: Vezes que a imagem é ampliada antes da detecção (acha rostos menores, custo maior).
+        """
+        self.upsample = upsample
+
+    def detect(self, frame, image_rgb=None):
+        if image_rgb is None:
+            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        locations = registry.get("face_recognition").face_locations(image_rgb,
+                                                                     number_of_times_to_upsample=self.upsample)
+        return locations, np.ones(len(locations), dtype=np.float32)
+
+
+@register_detector("mediapipe")
+class MediaPipeFaceDetector(FaceDetector):
+    """Detector de rostos do MediaPipe (BlazeFace): rápido em CPU, com confiança por caixa."""
+
+    def __init__(self, min_confidence=0.5, model_selection=1):
+        """
+        :param model_selection: 0 para rostos a até ~2 m da câmera, 1 para rostos a até ~5 m.
+        """
+        self.min_confidence = min_confidence
+        self.model_selection = model_selection
+        self._detector = None
+        self._lock = threading.Lock()
+
+    def detect(self, frame, image_rgb=None):
+        if image_rgb is None:
+            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        height, width = frame.shape[:2]
+        # A instância do MediaPipe não pode ser usada por duas threads ao mesmo tempo
+        with self._lock:
+            if self._detector is None:
+                self._detector = registry.get("mediapipe").solutions.face_detection.FaceDetection(
+                    model_selection=self.model_selection, min_detection_confidence=self.min_confidence)
+            results = self._detector.process(image_rgb)
+        locations = []
+        scores = []
+        for detection in results.detections or []:
+            box = detection.location_data.relative_bounding_box
+            location = clip_location(box.ymin * height, (box.xmin + box.width) * width,
+                                     (box.ymin + box.height) * height, box.xmin * width, frame.shape)
+            if location[1] > location[3] and location[2] > location[0]:
+                locations.append(location)
+                scores.append(detection.score[0])
+        return locations, np.asarray(scores, dtype=np.float32)
+
+    def close(self):
+        if self._detector is not None:
+            self._detector.close()
+            self._detector = None
+
+
+@register_detector("yunet")
+class YuNetFaceDetector(FaceDetector):
+    """Detector YuNet do OpenCV (cv2.FaceDetectorYN, DNN): rápido e preciso, exige o modelo .onnx."""
+
+    uses_rgb = False
+
+    def __init__(self, model_path=None, score_threshold=0.6, nms_threshold=0.3, top_k=50):
+        """
+        :param model_path: Arquivo .onnx do YuNet (ex.: face_detection_yunet_2023mar.onnx, do opencv_zoo).
+        """
+        if not model_path:
+            raise ValueError("O detector YuNet exige o caminho do modelo .onnx.")
+        self.model_path = model_path
+        self._detector = cv2.FaceDetectorYN.create(model_path, "", (320, 320), score_threshold, nms_threshold, top_k)
+        self._lock = threading.Lock()
+
+    def detect(self, frame, image_rgb=None):
+        height, width = frame.shape[:2]
+        with self._lock:
+            self._detector.setInputSize((width, height))
+            _, faces = self._detector.detect(frame)
+        if faces is None:
+            return [], np.empty(0, dtype=np.float32)
+        # Cada linha: x, y, largura, altura, 5 pontos (x, y) e a confiança
+        locations = [clip_location(y, x + w, y + h, x, frame.shape) for x, y, w, h in faces[:, :4]]
+        return locations, faces[:, -1].astype(np.float32)
+
+
+@register_detector("cascade")
+class CascadeFaceDetector(FaceDetector):
+    """
+    Cascata: o detector rápido roda em todos os frames e o preciso só confirma, num recorte em volta da caixa,
+    os rostos com baixa confiança ou que acabaram de aparecer (sem correspondência no frame anterior).
+    A cada `full_interval` chamadas o detector preciso também roda no frame inteiro, para achar rostos que o
+    rápido perdeu (sem essa passada, rostos que o rápido nunca propõe não são recuperados).
+    """
+
+    def __init__(self, fast="mediapipe", accurate="hog", fast_options=None, accurate_options=None,
+                 confirm_score=0.85, iou_threshold=0.3, crop_margin=0.5, min_crop_size=160, full_interval=10):
+        """
+        :param fast: Backend executado em todos os frames.
+        :param accurate: Backend usado nas confirmações.
+        :param confirm_score: Confiança mínima para aceitar um rosto já conhecido sem confirmação.
+        :param iou_threshold: IoU mínima com uma caixa do frame anterior para o rosto não ser considerado novo.
+        :param crop_margin: Margem do recorte de confirmação, em tamanhos de caixa.
+        :param min_crop_size: Lado menor mínimo do recorte (recortes menores são ampliados para o detector preciso).
+        :param full_interval: Executa o detector preciso no frame inteiro a cada N chamadas (0 desativa, com risco
+                              de perder rostos que o detector rápido não encontra).
+        """
+        self.fast = create_face_detector(fast, **(fast_options or {}))
+        self.accurate = create_face_detector(accurate, **(accurate_options or {}))
+        self.uses_rgb = self.fast.uses_rgb or self.accurate.uses_rgb
+        self.confirm_score = confirm_score
+        self.iou_threshold = iou_threshold
+        self.crop_margin = crop_margin
+        self.min_crop_size = min_crop_size
+        self.full_interval = full_interval
+        self.calls = 0
+        self.confirmations = 0
+        self._previous = []
+        self._lock = threading.Lock()
+
+    def detect(self, frame, image_rgb=None):
+        if image_rgb is None and self.uses_rgb:
+            image_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        locations, scores = self.fast.detect(frame, image_rgb)
+        with self._lock:
+            self.calls += 1
+            full_pass = self.full_interval and (self.calls - 1) % self.full_interval == 0
+            previous = self._previous
+
+        if full_pass:
+            accepted, accepted_scores = self._merge_full_pass(frame, image_rgb, locations, scores)
+        else:
+            known = np.zeros(len(locations), dtype=bool)
+            if len(locations) and len(previous):
+                known = iou_matrix(locations, previous).max(axis=1) >= self.iou_threshold
+            accepted = []
+            accepted_scores = []
+            for location, score, is_known in zip(locations, scores, known):
+                if is_known and score >= self.confirm_score:
+                    accepted.append(location)
+                    accepted_scores.append(score)
+                    continue
+                confirmed = self._confirm(frame, image_rgb, location)
+                if confirmed is not None:
+                    accepted.append(confirmed)
+                    accepted_scores.append(1.0)
+
+        with self._lock:
+            self._previous = accepted
+        return accepted, np.asarray(accepted_scores, dtype=np.float32)
+
+    def _confirm(self, frame, image_rgb, location):
+        """Executa o detector preciso num recorte em volta da caixa; retorna a caixa confirmada ou None."""
+        with self._lock:
+            self.confirmations += 1
+        top, right, bottom, left = location
+        margin_y = int((bottom - top) * self.crop_margin)
+        margin_x = int((right - left) * self.crop_margin)
+        y0, x1, y1, x0 = clip_location(top - margin_y, right + margin_x, bottom + margin_y, left - margin_x,
+                                       frame.shape)
+        crop = frame[y0:y1, x0:x1]
+        if crop.size == 0:
+            return None
+        crop_rgb = image_rgb[y0:y1, x0:x1] if image_rgb is not None else None
+        scale = max(1.0, self.min_crop_size / min(crop.shape[:2]))
+        if scale > 1.0:
+            crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+            if crop_rgb is not None:
+                crop_rgb = cv2.resize(crop_rgb, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR)
+        candidates, _ = self.accurate.detect(crop, crop_rgb)
+        if not candidates:
+            return None
+        # Mantém a candidata que mais se sobrepõe à caixa original, convertida para o frame inteiro
+        candidates = [(int(t / scale) + y0, int(r / scale) + x0, int(b / scale) + y0, int(l / scale) + x0)
+                      for t, r, b, l in candidates]
+        best = int(iou_matrix([location], candidates)[0].argmax())
+        return candidates[best]
+
+    def _merge_full_pass(self, frame, image_rgb, locations, scores):
+        """Detector preciso no frame inteiro, mais as caixas confiantes do rápido que ele não encontrou."""
+        accepted, _ = self.accurate.detect(frame, image_rgb)
+        accepted = list(accepted)
+        accepted_scores = [1.0] * len(accepted)
+        overlaps = iou_matrix(locations, accepted) if len(accepted) else np.zeros((len(locations), 0))
+        for i, (location, score) in enumerate(zip(locations, scores)):
+            if score >= self.confirm_score and not (overlaps.shape[1] and overlaps[i].max() >= self.iou_threshold):
+                accepted.append(location)
+                accepted_scores.append(score)
+        return accepted, accepted_scores
+
+    def close(self):
+        self.fast.close()
+        self.accurate.close()
+
+
+if __name__ == "__main__":
+    print("Este é o módulo face_detection_module. Execute 'main.py' para iniciar a aplicação.")
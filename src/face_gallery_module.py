@@ -0,0 +1,218 @@
+import hashlib
+import os
+
+import numpy as np
+from model_registry_module import registry
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".gif")
+CACHE_FILENAME = ".face_encodings_cache.npz"
+DEFAULT_TOLERANCE = 0.6  # Mesmo limite padrão de face_recognition.compare_faces
+
+
+def file_sha1(path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+def name_from_filename(filename):
+    """Extrai o nome da pessoa do arquivo (ex.: "Nick0.jpeg" -> "Nick")."""
+    return os.path.splitext(filename)[0][:-1]
+
+
+class FaceGallery:
+    """
+    Galeria de rostos conhecidos em uma matriz float32 contígua (uma linha por imagem de referência),
+    com um array de índices de identidade. Todas as faces de um frame são comparadas de uma vez,
+    e as distâncias são agregadas por identidade (várias imagens por pessoa).
+    """
+
+    def __init__(self, encodings=None, names=None, tolerance=DEFAULT_TOLERANCE):
+        """
+        :param encodings: Sequência de encodings de 128 dimensões.
+        :param names: Nome correspondente a cada encoding.
+        :param tolerance: Distância máxima para considerar um rosto como conhecido.
+        """
+        self.tolerance = tolerance
+        encodings = [] if encodings is None else encodings
+        names = [] if names is None else list(names)
+        if len(encodings) != len(names):
+            raise ValueError("encodings e names devem ter o mesmo tamanho.")
+
+        self.identities = sorted(set(names))
+        identity_index = {name: i for i, name in enumerate(self.identities)}
+        name_index = np.array([identity_index[name] for name in names], dtype=np.int32)
+
+        # Ordena as linhas por identidade para agregar com reduceat
+        order = np.argsort(name_index, kind="stable")
+        matrix = np.asarray(encodings, dtype=np.float32).reshape(len(names), 128)
+        self.encodings = np.ascontiguousarray(matrix[order])
+        self.name_index = name_index[order]
+        self._squared_norms = np.einsum("ij,ij->i", self.encodings, self.encodings)
+        boundaries = np.diff(self.name_index) != 0
+        self._group_starts = np.flatnonzero(np.r_[True, boundaries]) if len(names) else np.empty(0, dtype=np.int64)
+        self._group_sizes = np.diff(np.r_[self._group_starts, len(self.name_index)])
+
+    @classmethod
+    def from_folder(cls, images_folder, cache_path=None, tolerance=DEFAULT_TOLERANCE):
+        """
+        Monta a galeria a partir das imagens de uma pasta, reaproveitando os encodings salvos em cache.
+        Apenas imagens novas ou alteradas (tamanho/mtime e, se necessário, hash) são codificadas novamente.
+        :param cache_path: Arquivo .npz do cache (padrão: CACHE_FILENAME dentro da pasta de imagens).
+        """
+        cache_path = cache_path or os.path.join(images_folder, CACHE_FILENAME)
+        cache = load_encodings_cache(cache_path)
+        entries = {}
+        encoded = 0
+
+        for filename in sorted(os.listdir(images_folder)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            image_path = os.path.join(images_folder, filename)
+            stat = os.stat(image_path)
+            cached = cache.get(filename)
+
+            if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime:
+                entries[filename] = cached
+                continue
+            sha1 = file_sha1(image_path)
+            if cached and cached["sha1"] == sha1:
+                entries[filename] = {**cached, "size": stat.st_size, "mtime": stat.st_mtime}
+                continue
+
+            face_recognition = registry.get("face_recognition")
+            image = face_recognition.load_image_file(image_path)
+            encodings = face_recognition.face_encodings(image)
+            encoded += 1
+            entries[filename] = {
+                "size": stat.st_size,
+                "mtime": stat.st_mtime,
+                "sha1": sha1,
+                "encoding": encodings[0].astype(np.float32) if encodings else None,
+            }
+
+        if encoded or set(entries) != set(cache):
+            save_encodings_cache(cache_path, entries)
+        print(f"Galeria de rostos: {len(entries)} imagens ({encoded} codificadas, {len(entries) - encoded} do cache).")
+
+        names = []
+        encodings = []
+        for filename, entry in entries.items():
+            if entry["encoding"] is None:
+                print(f"Aviso: Nenhum rosto detectado na imagem: {filename}")
+                continue
+            names.append(name_from_filename(filename))
+            encodings.append(entry["encoding"])
+        return cls(encodings, names, tolerance)
+
+    def __len__(self):
+        return len(self.name_index)
+
+    def distances(self, face_encodings):
+        """
+        Distâncias euclidianas entre as faces do frame e todas as imagens da galeria.
+        :return: Matriz float32 de shape (n_faces, n_imagens).
+        """
+        queries = np.asarray(face_encodings, dtype=np.float32).reshape(-1, self.encodings.shape[1])
+        squared = (np.einsum("ij,ij->i", queries, queries)[:, np.newaxis] + self._squared_norms[np.newaxis, :]
+                   - 2.0 * queries @ self.encodings.T)
+        np.maximum(squared, 0.0, out=squared)
+        return np.sqrt(squared, out=squared)
+
+    def identity_distances(self, face_encodings, aggregate="min"):
+        """
+        Distâncias agregadas por identidade.
+        :param aggregate: "min" (imagem de referência mais próxima) ou "mean" (média das imagens da pessoa).
+        :return: Matriz float32 de shape (n_faces, n_identidades), na ordem de self.identities.
+        """
+        distances = self.distances(face_encodings)
+        if not len(self):
+            return distances
+        if aggregate == "min":
+            return np.minimum.reduceat(distances, self._group_starts, axis=1)
+        if aggregate == "mean":
+            return np.add.reduceat(distances, self._group_starts, axis=1) / self._group_sizes
+        raise ValueError(f"Agregação desconhecida: {aggregate}")
+
+    def match(self, face_encodings, aggregate="min"):
+        """
+        Identifica cada face pela identidade mais próxima.
+        :return: Lista de tuplas (nome, distância); o nome é "Desconhecido" acima da tolerância.
+        """
+        face_encodings = np.asarray(face_encodings, dtype=np.float32)
+        if not len(self) or not len(face_encodings):
+            return [("Desconhecido", None) for _ in range(len(face_encodings))]
+
+        distances = self.identity_distances(face_encodings, aggregate)
+        best = distances.argmin(axis=1)
+        best_distances = distances[np.arange(len(best)), best]
+        return [
+            (self.identities[i] if distance <= self.tolerance else "Desconhecido", float(distance))
+            for i, distance in zip(best, best_distances)
+        ]
+
+    def top_k(self, face_encodings, k=3, aggregate="min"):
+        """
+        As k identidades mais próximas de cada face.
+        :return: Lista (uma por face) de listas de tuplas (nome, distância) em ordem crescente de distância.
+        """
+        face_encodings = np.asarray(face_encodings, dtype=np.float32)
+        if not len(self) or not len(face_encodings):
+            return [[] for _ in range(len(face_encodings))]
+
+        distances = self.identity_distances(face_encodings, aggregate)
+        k = min(k, distances.shape[1])
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        results = []
+        for row, indices in zip(distances, candidates):
+            indices = indices[np.argsort(row[indices])]
+            results.append([(self.identities[i], float(row[i])) for i in indices])
+        return results
+
+
+def load_encodings_cache(cache_path):
+    """Lê o cache de encodings; retorna um dicionário vazio se ele não existir ou estiver corrompido."""
+    if not os.path.exists(cache_path):
+        return {}
+    try:
+        with np.load(cache_path, allow_pickle=False) as data:
+            entries = {}
+            for i, filename in enumerate(data["filenames"]):
+                entries[str(filename)] = {
+                    "size": int(data["sizes"][i]),
+                    "mtime": float(data["mtimes"][i]),
+                    "sha1": str(data["sha1s"][i]),
+                    "encoding": data["encodings"][i].copy() if data["has_face"][i] else None,
+                }
+            return entries
+    except Exception as e:
+        print(f"Aviso: cache de encodings inválido, será recriado: {e}")
+        return {}
+
+
+def save_encodings_cache(cache_path, entries):
+    filenames = list(entries)
+    encodings = np.zeros((len(filenames), 128), dtype=np.float32)
+    has_face = np.zeros(len(filenames), dtype=bool)
+    for i, filename in enumerate(filenames):
+        if entries[filename]["encoding"] is not None:
+            encodings[i] = entries[filename]["encoding"]
+            has_face[i] = True
+    try:
+        np.savez(
+            cache_path,
+            filenames=np.array(filenames, dtype=str),
+            sizes=np.array([entries[f]["size"] for f in filenames], dtype=np.int64),
+            mtimes=np.array([entries[f]["mtime"] for f in filenames], dtype=np.float64),
+            sha1s=np.array([entries[f]["sha1"] for f in filenames], dtype=str),
+            encodings=encodings,
+            has_face=has_face,
+        )
+    except OSError as e:
+        print(f"Aviso: não foi possível salvar o cache de encodings: {e}")
+
+
+if __name__ == "__main__":
+    print("Este é o módulo face_gallery_module. Execute 'main.py' para iniciar a aplicação.")
@@ -1,59 +1,118 @@
 # src/face_recognition_module.py
-import face_recognition
-import os
+from face_gallery_module import FaceGallery
+from model_registry_module import registry
+from profiling_module import timed
+from frame_context_module import FrameContext
 
 
-def load_known_faces(images_folder):
+def load_known_faces(images_folder, cache_path=None):
     """
     Carrega imagens de rostos conhecidos e gera os encodings.
+    Os encodings ficam em cache em disco; apenas imagens novas ou alteradas são codificadas novamente.
     :param images_folder: Pasta contendo as imagens.
+    :param cache_path: Arquivo do cache de encodings (padrão: dentro da pasta de imagens).
     :return: Tuple (known_face_encodings, known_face_names).
     """
-    known_face_encodings = []
-    known_face_names = []
+    gallery = FaceGallery.from_folder(images_folder, cache_path)
+    known_face_names = [gallery.identities[i] for i in gallery.name_index]
+    return list(gallery.encodings), known_face_names
 
-    for filename in os.listdir(images_folder):
-        if filename.lower().endswith((".jpg", ".jpeg", ".png", ".gif")):
-            image_path = os.path.join(images_folder, filename)
-            image = face_recognition.load_image_file(image_path)
-            encodings = face_recognition.face_encodings(image)
-            if encodings:
-                known_face_encodings.append(encodings[0])
-                name = os.path.splitext(filename)[0][:-1]
-                known_face_names.append(name)
-            else:
-                print(f"Aviso: Nenhum rosto detectado na imagem: {filename}")
-    return known_face_encodings, known_face_names
+
+def scale_face_locations(face_locations, scale, frame_shape):
+    """
+    Converte caixas detectadas num frame reduzido para as coordenadas do frame em resolução original.
+    :param scale: Fator usado na redução (ex.: 0.5).
+    :param frame_shape: Shape do frame em resolução original.
+    :return: Lista de tuplas (top, right, bottom, left) em resolução original.
+    """
+    height, width = frame_shape[:2]
+    return [
+        (max(0, int(round(top / scale))), min(width, int(round(right / scale))),
+         min(height, int(round(bottom / scale))), max(0, int(round(left / scale))))
+        for top, right, bottom, left in face_locations
+    ]
 
 
-def recognize_faces(frame, known_face_encodings, known_face_names):
+def detect_faces(frame, analysis_scale=1.0, metrics=None, detector=None, context=None):
     """
-    Detecta e identifica rostos no frame.
+    Detecta rostos no frame.
+    :param frame: Imagem (frame) do vídeo, em BGR.
+    :param analysis_scale: Fator de redução aplicado antes da detecção; as caixas são devolvidas na
+                           resolução original (o custo do detector cai com o quadrado do fator).
+    :param metrics: StageMetrics opcional (estágio "face_detection").
+    :param detector: FaceDetector de face_detection_module (padrão: HOG do dlib via face_recognition).
+    :param context: FrameContext do frame, com as versões reduzida e RGB compartilhadas entre os estágios.
+    :return: Lista de tuplas (top, right, bottom, left).
+    """
+    context = context or FrameContext(frame)
+    with timed(metrics, "face_detection"):
+        if detector is None:
+            # O dlib espera RGB
+            face_locations = registry.get("face_recognition").face_locations(context.rgb(analysis_scale))
+        else:
+            image_rgb = context.rgb(analysis_scale) if detector.uses_rgb else None
+            face_locations = detector.detect(context.small(analysis_scale), image_rgb)[0]
+        if analysis_scale == 1.0:
+            return face_locations
+        return scale_face_locations(face_locations, analysis_scale, context.shape)
+
+
+def identify_faces(frame, face_locations, known_face_encodings, known_face_names, gallery=None, metrics=None,
+                   context=None):
+    """
+    Gera os encodings dos rostos informados e os compara com os rostos conhecidos.
     :param frame: Imagem (frame) do vídeo.
+    :param face_locations: Lista de tuplas (top, right, bottom, left).
     :param known_face_encodings: Lista de encodings de rostos conhecidos.
     :param known_face_names: Lista de nomes correspondentes.
-    :return: Lista de dicionários com chaves "name" e "location" (top, right, bottom, left).
+    :param gallery: FaceGallery já montada com os rostos conhecidos (evita remontá-la a cada frame).
+    :param metrics: StageMetrics opcional (estágios "face_encoding" e "matching").
+    :param context: FrameContext opcional do frame (reaproveita a versão RGB).
+    :return: Lista de dicionários com chaves "name", "location", "distance" e "encoding".
     """
-    face_locations = face_recognition.face_locations(frame)
-    face_encodings = face_recognition.face_encodings(frame, face_locations)
-    faces = []
-
-    for face_encoding, face_location in zip(face_encodings, face_locations):
-        matches = face_recognition.compare_faces(known_face_encodings, face_encoding)
-        name = "Desconhecido"
-
-        face_distances = face_recognition.face_distance(known_face_encodings, face_encoding)
-        if len(face_distances) > 0:
-            best_match_index = face_distances.argmin()
-            if matches[best_match_index]:
-                name = known_face_names[best_match_index]
+    if gallery is None:
+        gallery = FaceGallery(known_face_encodings, known_face_names)
+    context = context or FrameContext(frame)
+    face_recognition = registry.get("face_recognition")
+    with timed(metrics, "face_encoding"):
+        # Os encodings da galeria são gerados em RGB (load_image_file): os do frame também
+        face_encodings = face_recognition.face_encodings(context.rgb(), face_locations)
+    with timed(metrics, "matching"):
+        matches = gallery.match(face_encodings)
 
+    faces = []
+    for face_encoding, face_location, (name, distance) in zip(face_encodings, face_locations, matches):
         faces.append({
             "name": name,
-            "location": face_location  # (top, right, bottom, left)
+            "location": face_location,  # (top, right, bottom, left)
+            "distance": distance,
+            "encoding": face_encoding
         })
     return faces
 
 
+def recognize_faces(frame, known_face_encodings, known_face_names, gallery=None, analysis_scale=1.0,
+                    include_encodings=False, metrics=None, detector=None, context=None):
+    """
+    Detecta e identifica rostos no frame.
+    :param frame: Imagem (frame) do vídeo.
+    :param known_face_encodings: Lista de encodings de rostos conhecidos.
+    :param known_face_names: Lista de nomes correspondentes.
+    :param gallery: FaceGallery opcional com os rostos conhecidos.
+    :param analysis_scale: Fator de redução usado apenas na detecção (os encodings usam o frame original).
+    :param include_encodings: Se True, mantém também as chaves "distance" e "encoding" de identify_faces.
+    :param metrics: StageMetrics opcional com a latência de cada estágio.
+    :param detector: FaceDetector opcional usado na detecção (padrão: HOG do dlib).
+    :param context: FrameContext opcional do frame, compartilhado com os demais estágios.
+    :return: Lista de dicionários com chaves "name" e "location" (top, right, bottom, left).
+    """
+    context = context or FrameContext(frame)
+    face_locations = detect_faces(frame, analysis_scale, metrics, detector, context)
+    faces = identify_faces(frame, face_locations, known_face_encodings, known_face_names, gallery, metrics, context)
+    if include_encodings:
+        return faces
+    return [{"name": face["name"], "location": face["location"]} for face in faces]
+
+
 if __name__ == "__main__":
     print("Este é o módulo face_recognition_module. Execute 'main.py' para iniciar a aplicação.")
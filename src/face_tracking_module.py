@@ -0,0 +1,200 @@
+import cv2
+import numpy as np
+
+
+def box_iou(box_a, box_b):
+    """Calcula o IoU entre duas caixas (top, right, bottom, left)."""
+    top = max(box_a[0], box_b[0])
+    right = min(box_a[1], box_b[1])
+    bottom = min(box_a[2], box_b[2])
+    left = max(box_a[3], box_b[3])
+    intersection = max(0, right - left) * max(0, bottom - top)
+    area_a = (box_a[1] - box_a[3]) * (box_a[2] - box_a[0])
+    area_b = (box_b[1] - box_b[3]) * (box_b[2] - box_b[0])
+    union = area_a + area_b - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def box_centroid_distance(box_a, box_b):
+    """Distância entre os centros das caixas, normalizada pela largura da caixa box_a."""
+    center_a = ((box_a[1] + box_a[3]) / 2.0, (box_a[0] + box_a[2]) / 2.0)
+    center_b = ((box_b[1] + box_b[3]) / 2.0, (box_b[0] + box_b[2]) / 2.0)
+    width = max(1, box_a[1] - box_a[3])
+    return np.hypot(center_a[0] - center_b[0], center_a[1] - center_b[1]) / width
+
+
+class Track:
+    """Um rosto acompanhado ao longo dos frames, com a identidade e a emoção em cache."""
+
+    def __init__(self, track_id, location, frame_index):
+        self.track_id = track_id
+        self.location = location
+        self.name = None
+        self.distance = None
+        self.encoding = None
+        self.emotion = "Desconhecido"
+        self.emotion_probabilities = None
+        self.hits = 1
+        self.misses = 0
+        self.last_refresh = None
+        self.created_at = frame_index
+
+
+class FaceTracker:
+    """
+    Associa as detecções de cada frame a tracks estáveis (IoU com fallback por centroide) para que
+    identificação e emoção rodem apenas em tracks novos, com baixa confiança ou no intervalo de atualização.
+    Entre detecções, as caixas podem ser propagadas com fluxo óptico (Lucas-Kanade).
+    """
+
+    def __init__(self, iou_threshold=0.3, max_centroid_distance=0.5, max_missed=5, refresh_interval=15,
+                 confident_distance=0.5, low_confidence_interval=3, detection_interval=1):
+        """
+        :param iou_threshold: IoU mínimo para associar uma detecção a um track.
+        :param max_centroid_distance: Distância máxima entre centros (em larguras de caixa) quando não há IoU.
+        :param max_missed: Frames processados sem detecção antes de encerrar um track.
+        :param refresh_interval: A cada quantos frames processados a identidade e a emoção são recalculadas.
+        :param confident_distance: Distância de encoding abaixo da qual a identificação é considerada confiável.
+        :param low_confidence_interval: Intervalo de reidentificação para tracks com baixa confiança.
+        :param detection_interval: Executa o detector 1 a cada N frames processados; nos demais, propaga
+                                   as caixas com fluxo óptico.
+        """
+        self.iou_threshold = iou_threshold
+        self.max_centroid_distance = max_centroid_distance
+        self.max_missed = max_missed
+        self.refresh_interval = refresh_interval
+        self.confident_distance = confident_distance
+        self.low_confidence_interval = low_confidence_interval
+        self.detection_interval = max(1, detection_interval)
+        self.tracks = []
+        self.next_track_id = 0
+        self.frame_index = -1
+        self._prev_gray = None
+        self._gray_buffers = [None, None]
+
+    def should_detect(self):
+        """Indica se o próximo frame deve passar pelo detector (ou apenas pela propagação)."""
+        return not self.tracks or (self.frame_index + 1) % self.detection_interval == 0
+
+    def update(self, frame, face_locations):
+        """
+        Associa as detecções do frame aos tracks existentes e cria tracks para os rostos novos.
+        :return: Lista de tracks visíveis neste frame, na ordem de face_locations.
+        """
+        self.frame_index += 1
+        self._remember_frame(frame)
+
+        candidates = []
+        for t, track in enumerate(self.tracks):
+            for d, location in enumerate(face_locations):
+                iou = box_iou(track.location, location)
+                if iou >= self.iou_threshold:
+                    candidates.append((1.0 + iou, t, d))
+                else:
+                    distance = box_centroid_distance(track.location, location)
+                    if distance <= self.max_centroid_distance:
+                        candidates.append((1.0 - distance, t, d))
+
+        # Associação gulosa pelos pares de maior afinidade
+        matched_tracks = set()
+        assignments = {}
+        for _, t, d in sorted(candidates, reverse=True):
+            if t in matched_tracks or d in assignments:
+                continue
+            matched_tracks.add(t)
+            assignments[d] = self.tracks[t]
+
+        visible = []
+        for d, location in enumerate(face_locations):
+            track = assignments.get(d)
+            if track is None:
+                track = Track(self.next_track_id, location, self.frame_index)
+                self.next_track_id += 1
+                self.tracks.append(track)
+            else:
+                track.location = location
+                track.hits += 1
+                track.misses = 0
+            visible.append(track)
+
+        visible_ids = {track.track_id for track in visible}
+        for track in self.tracks:
+            if track.track_id not in visible_ids:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_missed]
+        return visible
+
+    def propagate(self, frame):
+        """
+        Move as caixas dos tracks ativos pelo deslocamento mediano do fluxo óptico desde o último frame.
+        :return: Lista de tracks visíveis (os que foram vistos no último frame).
+        """
+        self.frame_index += 1
+        gray = self._to_gray(frame)
+        active = [track for track in self.tracks if track.misses == 0]
+
+        if self._prev_gray is not None and active:
+            points = []
+            owners = []
+            for i, track in enumerate(active):
+                top, right, bottom, left = track.location
+                xs = np.linspace(left, right, 5, dtype=np.float32)[1:-1]
+                ys = np.linspace(top, bottom, 5, dtype=np.float32)[1:-1]
+                grid = np.stack(np.meshgrid(xs, ys), axis=-1).reshape(-1, 2)
+                points.append(grid)
+                owners.extend([i] * len(grid))
+            points = np.concatenate(points).reshape(-1, 1, 2)
+            owners = np.asarray(owners)
+
+            new_points, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, points, None)
+            status = status.reshape(-1).astype(bool)
+            shifts = (new_points - points).reshape(-1, 2)
+
+            height, width = gray.shape
+            for i, track in enumerate(active):
+                valid = (owners == i) & status
+                if not valid.any():
+                    continue
+                dx, dy = np.median(shifts[valid], axis=0)
+                top, right, bottom, left = track.location
+                dx = int(round(np.clip(dx, -left, width - right)))
+                dy = int(round(np.clip(dy, -top, height - bottom)))
+                track.location = (top + dy, right + dx, bottom + dy, left + dx)
+
+        self._prev_gray = gray
+        return active
+
+    def needs_refresh(self, track):
+        """Indica se a identidade e a emoção do track devem ser recalculadas neste frame."""
+        if track.last_refresh is None:
+            return True
+        elapsed = self.frame_index - track.last_refresh
+        if track.distance is None or track.distance > self.confident_distance:
+            return elapsed >= self.low_confidence_interval
+        return elapsed >= self.refresh_interval
+
+    def set_identity(self, track, name, distance, encoding, emotion, emotion_probabilities=None):
+        track.name = name
+        track.distance = distance
+        track.encoding = encoding
+        track.emotion = emotion
+        track.emotion_probabilities = emotion_probabilities
+        track.last_refresh = self.frame_index
+
+    def _remember_frame(self, frame):
+        # O frame em tons de cinza só é necessário quando há propagação por fluxo óptico
+        if self.detection_interval > 1:
+            self._prev_gray = self._to_gray(frame)
+
+    def _to_gray(self, frame):
+        """Converte para tons de cinza alternando entre dois buffers (o outro guarda o frame anterior)."""
+        shape = frame.shape[:2]
+        buffer = self._gray_buffers[0]
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=np.uint8)
+        self._gray_buffers = [self._gray_buffers[1], buffer]
+        return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=buffer)
+
+
+if __name__ == "__main__":
+    print("Este é o módulo face_tracking_module. Execute 'main.py' para iniciar a aplicação.")
@@ -0,0 +1,133 @@
+import threading
+from collections import deque
+
+import cv2
+import numpy as np
+
+
+class FramePool:
+    """
+    Pool circular de buffers pré-alocados, por shape: o decodificador lê direto nos buffers e as conversões
+    (RGB, cinza, versões reduzidas) escrevem neles com dst=, sem alocar um frame novo a cada frame.
+    Um buffer só volta ao pool quando todos os estágios o liberam (FrameContext.release); se o pool estiver
+    vazio, um buffer novo é alocado em vez de reaproveitar um que ainda está em uso.
+    """
+
+    def __init__(self, preallocate=8, max_free=64):
+        """
+        :param preallocate: Buffers criados de uma vez na primeira requisição de cada shape.
+        :param max_free: Máximo de buffers livres mantidos por shape (o excedente fica para o coletor).
+        """
+        self.preallocate = max(1, preallocate)
+        self.max_free = max_free
+        self.allocations = 0
+        self._free = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, shape, dtype=np.uint8):
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free is None:
+                free = self._free[key] = deque(np.empty(shape, dtype) for _ in range(self.preallocate))
+                self.allocations += self.preallocate
+            if free:
+                return free.popleft()
+            self.allocations += 1
+        return np.empty(shape, dtype)
+
+    def release(self, buffer):
+        key = (buffer.shape, buffer.dtype.str)
+        with self._lock:
+            free = self._free.setdefault(key, deque())
+            if len(free) < self.max_free:
+                free.append(buffer)
+
+
+def scaled_size(frame_shape, scale):
+    """Tamanho (largura, altura) do frame reduzido pelo fator scale."""
+    height, width = frame_shape[:2]
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+class FrameContext:
+    """
+    Frame decodificado (BGR) e as versões derivadas compartilhadas pelos estágios: RGB, tons de cinza e versões
+    reduzidas (escala de análise), cada uma calculada uma única vez, sob demanda, em buffers do FramePool.
+    Os estágios podem pedir a mesma versão de threads diferentes (ex.: rostos e pose em paralelo).
+    Depois que o frame é gravado (ou descartado), release() devolve os buffers ao pool; o frame e as versões
+    derivadas não podem mais ser usados.
+    """
+
+    def __init__(self, frame, pool=None, owned=False):
+        """
+        :param frame: Frame BGR em resolução de saída.
+        :param pool: FramePool dos buffers das versões derivadas (None aloca normalmente).
+        :param owned: Se True, o próprio frame veio do pool e também é devolvido em release().
+        """
+        self.frame = frame
+        self.pool = pool
+        self._buffers = [frame] if owned and pool is not None else []
+        self._views = {}
+        self._lock = threading.RLock()
+
+    @property
+    def shape(self):
+        return self.frame.shape
+
+    def _acquire(self, shape):
+        if self.pool is None:
+            return np.empty(shape, dtype=np.uint8)
+        buffer = self.pool.acquire(shape)
+        self._buffers.append(buffer)
+        return buffer
+
+    def _view(self, key, build):
+        with self._lock:
+            view = self._views.get(key)
+            if view is None:
+                view = self._views[key] = build()
+            return view
+
+    def small(self, scale=1.0):
+        """Frame BGR reduzido pelo fator scale (o próprio frame se scale == 1)."""
+        if scale == 1.0:
+            return self.frame
+
+        def build():
+            width, height = scaled_size(self.frame.shape, scale)
+            return cv2.resize(self.frame, (width, height), dst=self._acquire((height, width, 3)),
+                              interpolation=cv2.INTER_AREA)
+        return self._view(("bgr", scale), build)
+
+    def rgb(self, scale=1.0):
+        """Versão RGB (ordem esperada pelo dlib e pelo MediaPipe) do frame reduzido pelo fator scale."""
+        def build():
+            if scale != 1.0 and ("rgb", 1.0) in self._views:
+                # O RGB em resolução cheia já existe: basta reduzi-lo
+                width, height = scaled_size(self.frame.shape, scale)
+                return cv2.resize(self._views[("rgb", 1.0)], (width, height),
+                                  dst=self._acquire((height, width, 3)), interpolation=cv2.INTER_AREA)
+            source = self.small(scale)
+            return cv2.cvtColor(source, cv2.COLOR_BGR2RGB, dst=self._acquire(source.shape))
+        return self._view(("rgb", scale), build)
+
+    def gray(self, scale=1.0):
+        """Versão em tons de cinza do frame reduzido pelo fator scale."""
+        def build():
+            source = self.small(scale)
+            return cv2.cvtColor(source, cv2.COLOR_BGR2GRAY, dst=self._acquire(source.shape[:2]))
+        return self._view(("gray", scale), build)
+
+    def release(self):
+        """Devolve ao pool o frame (se for do pool) e as versões derivadas."""
+        with self._lock:
+            buffers, self._buffers = self._buffers, []
+            self._views.clear()
+        if self.pool is not None:
+            for buffer in buffers:
+                self.pool.release(buffer)
+
+
+if __name__ == "__main__":
+    print("Este é o módulo frame_context_module. Execute 'main.py' para iniciar a aplicação.")
@@ -0,0 +1,141 @@
+import math
+
+import cv2
+
+# Decisões possíveis para cada frame
+RUN_FULL = "full"        # Rostos, emoções e pose
+RUN_POSE_ONLY = "pose"   # Apenas pose/atividades
+SKIP = "skip"            # Nenhum modelo (reaproveita as últimas anotações, se configurado)
+
+
+class FixedFrameScheduler:
+    """Processa 1 a cada frame_skip frames, como o comportamento original do VideoProcessor."""
+
+    reuse_annotations = False
+
+    def __init__(self, frame_skip=2):
+        self.frame_skip = max(1, frame_skip)
+
+    def reset(self, fps=None):
+        pass
+
+    def decide(self, frame_number, frame):
+        """
+        :param frame_number: Índice global (base 1) do frame no vídeo.
+        :return: RUN_FULL, RUN_POSE_ONLY ou SKIP.
+        """
+        return RUN_FULL if frame_number % self.frame_skip == 0 else SKIP
+
+    def observe(self, decision, analysis):
+        pass
+
+
+class AdaptiveFrameScheduler:
+    """
+    Decide por frame entre processamento completo, apenas pose ou descarte, a partir de sinais baratos:
+    energia de movimento num frame reduzido, quantidade de rostos/poses ativos e o custo medido dos estágios
+    em relação a um orçamento de tempo por frame. No modo em pipeline, os sinais dos frames ainda em trânsito só
+    são observados depois da decisão, então as decisões podem diferir das do modo serial.
+    """
+
+    reuse_annotations = True
+
+    def __init__(self, target_fps=10.0, processing_fps=None, motion_threshold=0.01, high_motion_threshold=0.05,
+                 max_interval=30, analysis_width=64, cost_smoothing=0.2):
+        """
+        :param target_fps: Quantos frames por segundo de vídeo analisar por completo numa cena com movimento.
+        :param processing_fps: Vazão desejada (frames de entrada por segundo de processamento); o intervalo
+                               mínimo entre análises cresce quando os estágios não cabem nesse orçamento.
+        :param motion_threshold: Energia de movimento (0-1) abaixo da qual a cena é considerada estática.
+        :param high_motion_threshold: Energia de movimento acima da qual o frame é sempre analisado.
+        :param max_interval: Número máximo de frames entre duas análises completas, mesmo em cena estática.
+        :param analysis_width: Largura do frame reduzido usado na diferença entre frames.
+        :param cost_smoothing: Fator da média móvel exponencial dos custos dos estágios.
+        """
+        self.target_fps = target_fps
+        self.processing_fps = processing_fps
+        self.motion_threshold = motion_threshold
+        self.high_motion_threshold = high_motion_threshold
+        self.max_interval = max(1, max_interval)
+        self.analysis_width = analysis_width
+        self.cost_smoothing = cost_smoothing
+        self.reset()
+
+    def reset(self, fps=None):
+        self.base_interval = max(1, round((fps or 30.0) / self.target_fps))
+        self.motion = 0.0
+        self.full_cost = None
+        self.pose_cost = None
+        self.active_faces = None
+        self.active_poses = 0
+        self.frames_since_full = 0
+        self.frames_since_pose = 0
+        self._prev_small = None
+
+    def motion_energy(self, frame):
+        """Diferença média absoluta (0-1) entre versões reduzidas em tons de cinza de frames consecutivos."""
+        height, width = frame.shape[:2]
+        size = (self.analysis_width, max(1, round(height * self.analysis_width / width)))
+        small = cv2.cvtColor(cv2.resize(frame, size, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+        energy = 0.0
+        if self._prev_small is not None:
+            energy = float(cv2.absdiff(small, self._prev_small).mean()) / 255.0
+        self._prev_small = small
+        return energy
+
+    def _budget_interval(self, cost):
+        """Intervalo mínimo entre execuções de um estágio para caber no orçamento de processing_fps."""
+        if not self.processing_fps or cost is None:
+            return 1
+        return max(1, math.ceil(cost * self.processing_fps))
+
+    def decide(self, frame_number, frame):
+        self.motion = self.motion_energy(frame)
+        self.frames_since_full += 1
+        self.frames_since_pose += 1
+        decision = self._choose()
+        # Os contadores são zerados na decisão (e não no resultado) para funcionar também no modo em pipeline
+        if decision != SKIP:
+            self.frames_since_pose = 0
+        if decision == RUN_FULL:
+            self.frames_since_full = 0
+        return decision
+
+    def _choose(self):
+        pose_allowed = self.active_poses > 0 and self.motion >= self.motion_threshold and \
+            self.frames_since_pose >= self._budget_interval(self.pose_cost)
+
+        if self.frames_since_full < self._budget_interval(self.full_cost):
+            return RUN_POSE_ONLY if pose_allowed else SKIP
+        if self.active_faces is None or self.frames_since_full >= self.max_interval or \
+                self.motion >= self.high_motion_threshold:
+            return RUN_FULL
+        if self.motion < self.motion_threshold:
+            return SKIP
+
+        # Cena com movimento moderado: amostra mais quando há pessoas em cena
+        interval = self.base_interval if self.active_faces or self.active_poses else 2 * self.base_interval
+        if self.frames_since_full >= interval:
+            return RUN_FULL
+        return RUN_POSE_ONLY if pose_allowed else SKIP
+
+    def observe(self, decision, analysis):
+        """Atualiza os sinais com o resultado de um frame analisado (chamado na ordem dos frames)."""
+        elapsed = analysis.get("elapsed")
+        self.active_poses = len(analysis["activities_list"])
+        if decision == RUN_FULL:
+            self.active_faces = len(analysis["faces"])
+            self.full_cost = self._smooth(self.full_cost, elapsed)
+        else:
+            self.pose_cost = self._smooth(self.pose_cost, elapsed)
+
+    def _smooth(self, current, value):
+        if value is None:
+            return current
+        if current is None:
+            return value
+        return (1.0 - self.cost_smoothing) * current + self.cost_smoothing * value
+
+
+if __name__ == "__main__":
+    print("Este é o módulo frame_scheduler_module. Execute 'main.py' para iniciar a aplicação.")
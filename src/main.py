@@ -1,33 +1,276 @@
+import argparse
+import os
+import sys
+
 from video_processing import VideoProcessor
 from face_recognition_module import load_known_faces
-from report_module import generate_report
+from frame_scheduler_module import AdaptiveFrameScheduler
+from report_module import write_report
+from face_gallery_module import FaceGallery
+from activity_rules_module import PoseSequenceClassifier, anomaly_activities
+from render_module import MODES, MODE_PREVIEW, render_from_results
+from face_detection_module import DETECTOR_BACKENDS
+from model_registry_module import registry
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Análise de vídeo com reconhecimento facial, emoções e atividades.")
+    parser.add_argument("--video", default="data/videos/video_fornecido.mp4", help="Vídeo de entrada")
+    parser.add_argument("--output", default="data/videos/output_processado.mp4", help="Vídeo de saída processado")
+    parser.add_argument("--images", default="data/images", help="Pasta com imagens de rostos conhecidos")
+    parser.add_argument("--report", default="reports/report.json", help="Relatório final (JSON)")
+    parser.add_argument("--mode", choices=MODES, default=MODE_PREVIEW,
+                        help="analysis: só relatório (sem vídeo); annotate: grava o vídeo anotado; "
+                             "preview: grava e exibe a janela")
+    parser.add_argument("--results", default=None,
+                        help="Grava os resultados por frame (JSON Lines) para renderizar depois com --render-from")
+    parser.add_argument("--render-from", default=None, metavar="RESULTS",
+                        help="Gera o vídeo anotado a partir de um arquivo de resultados, sem executar os modelos")
+    parser.add_argument("--store", default=None,
+                        help="Pasta do armazenamento colunar por frame (caixas, encodings, emoções e landmarks)")
+    parser.add_argument("--report-from", default=None, metavar="STORE",
+                        help="Refaz o relatório a partir de um armazenamento gravado com --store, sem executar os modelos")
+    parser.add_argument("--recompute-activities", action="store_true",
+                        help="Com --report-from, recalcula atividades e anomalias a partir dos landmarks gravados")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="Com --report-from, reidentifica os rostos pelos encodings gravados com esta tolerância")
+    parser.add_argument("--multi-pose", action="store_true",
+                        help="Detecta a pose de várias pessoas por frame e associa cada rosto ao seu esqueleto")
+    parser.add_argument("--pose-model", default=None,
+                        help="Modelo .task do PoseLandmarker (MediaPipe Tasks) para o modo --multi-pose; sem ele, "
+                             "a pose é estimada em recortes do corpo a partir dos rostos")
+    parser.add_argument("--max-poses", type=int, default=4, help="Máximo de pessoas com pose por frame")
+    parser.add_argument("--face-detector", choices=list(DETECTOR_BACKENDS), default="hog",
+                        help="Detector de rostos: hog (dlib, o original), mediapipe, yunet (OpenCV DNN) ou cascade "
+                             "(detector rápido em todos os frames e HOG para confirmar rostos novos ou de baixa "
+                             "confiança e, periodicamente, no frame inteiro)")
+    parser.add_argument("--cascade-fast", choices=["mediapipe", "yunet"], default="mediapipe",
+                        help="Detector rápido do modo cascade")
+    parser.add_argument("--yunet-model", default=None, help="Modelo .onnx do YuNet (detectores yunet e cascade)")
+    parser.add_argument("--confirm-score", type=float, default=0.85,
+                        help="No modo cascade, confiança a partir da qual rostos já vistos não são confirmados")
+    parser.add_argument("--cascade-full-interval", type=int, default=10,
+                        help="No modo cascade, roda o HOG no frame inteiro a cada N detecções para recuperar rostos "
+                             "que o detector rápido perdeu (0 desativa: mais rápido, com risco de perder rostos)")
+    parser.add_argument("--warmup", action="store_true",
+                        help="Carrega os modelos em threads paralelas antes de ler o primeiro frame")
+    parser.add_argument("--metrics", default=None,
+                        help="Grava as latências por estágio (p50/p95/p99), FPS e rostos/frame em JSON Lines ou CSV")
+    parser.add_argument("--metrics-interval", type=int, default=100, help="Grava as métricas a cada N frames")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Expõe as métricas em http://127.0.0.1:PORTA/metrics (formato de texto do Prometheus)")
+    parser.add_argument("--profile", default=None,
+                        help="Grava o perfil (cProfile, .prof) de uma janela de frames definida por --profile-start "
+                             "e --profile-frames")
+    parser.add_argument("--profile-start", type=int, default=1, help="Primeiro frame da janela de perfilamento")
+    parser.add_argument("--profile-frames", type=int, default=100, help="Frames na janela de perfilamento")
+    parser.add_argument("--benchmark", default=None, metavar="RESULTS",
+                        help="Executa a suíte de benchmarks (imagens de --images e clipes sintéticos) e grava o JSON")
+    parser.add_argument("--benchmark-quick", action="store_true",
+                        help="Com --benchmark, usa apenas a menor carga de cada benchmark")
+    parser.add_argument("--benchmark-baseline", default=None,
+                        help="Com --benchmark, compara com um resultado anterior e falha se houver regressão")
+    parser.add_argument("--regression-threshold", type=float, default=0.2,
+                        help="Aumento relativo de tempo tolerado na comparação com o baseline (0.2 = 20%%)")
+    parser.add_argument("--frame-skip", type=int, default=2, help="Processa 1 a cada N frames")
+    parser.add_argument("--resize-factor", type=float, default=1.0, help="Fator de redimensionamento do vídeo")
+    parser.add_argument("--analysis-scale", type=float, default=1.0,
+                        help="Fator de redução do frame usado na detecção de rostos e na pose (saída mantém a resolução)")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="Processa em pipeline (decodificação, inferência e codificação concorrentes)")
+    parser.add_argument("--workers", type=int, default=2, help="Workers de inferência no modo em pipeline")
+    parser.add_argument("--queue-size", type=int, default=8, help="Profundidade das filas do pipeline")
+    parser.add_argument("--max-in-flight", type=int, default=16,
+                        help="Máximo de frames em trânsito no pipeline (backpressure)")
+    parser.add_argument("--segment-processes", type=int, default=0,
+                        help="Divide o vídeo em segmentos processados em N processos (0 desativa)")
+    parser.add_argument("--tracking", action="store_true",
+                        help="Rastreia os rostos e só reidentifica tracks novos ou desatualizados")
+    parser.add_argument("--track-refresh", type=int, default=15,
+                        help="Intervalo (em frames processados) para reidentificar um track")
+    parser.add_argument("--detection-interval", type=int, default=1,
+                        help="Detecta rostos 1 a cada N frames processados; nos demais usa fluxo óptico")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Substitui o frame-skip fixo por escalonamento adaptativo (movimento, pessoas, orçamento)")
+    parser.add_argument("--target-fps", type=float, default=10.0,
+                        help="Frames por segundo de vídeo analisados por completo em cenas com movimento")
+    parser.add_argument("--processing-fps", type=float, default=None,
+                        help="Vazão desejada do processamento (frames de entrada por segundo)")
+    parser.add_argument("--checkpoint-interval", type=int, default=0,
+                        help="Grava um snapshot parcial do relatório a cada N frames (0 desativa)")
+    parser.add_argument("--batch", action="append", default=[], metavar="PASTA_OU_GLOB",
+                        help="Processa em lote os vídeos de uma pasta ou padrão glob (pode ser repetido); ao executar "
+                             "de novo, pula os vídeos concluídos e retoma os interrompidos")
+    parser.add_argument("--batch-output", default="reports/batch",
+                        help="Pasta do lote: relatório e estado retomável por vídeo e resumo combinado por pessoa")
+    parser.add_argument("--batch-workers", type=int, default=0,
+                        help="Processos do lote (0: conforme as CPUs e a memória disponível)")
+    parser.add_argument("--worker-memory", type=float, default=2.0,
+                        help="Memória estimada por processo do lote (GB), limita o número de processos")
+    parser.add_argument("--source", action="append", default=[],
+                        help="Fonte ao vivo (índice de câmera, URL RTSP ou arquivo); pode ser repetido")
+    parser.add_argument("--replay", action="store_true",
+                        help="Reproduz as fontes em arquivo no ritmo do FPS, simulando câmeras ao vivo")
+    parser.add_argument("--window-seconds", type=float, default=60.0,
+                        help="Duração das janelas de relatório por fonte no modo ao vivo")
+    parser.add_argument("--stream-duration", type=float, default=None,
+                        help="Tempo máximo (segundos) de execução no modo ao vivo")
+    return parser.parse_args()
 
 
 def main():
-    video_path = "data/videos/video_fornecido.mp4"         # Vídeo de entrada
-    output_path = "data/videos/output_processado.mp4"         # Vídeo de saída processado
-    images_folder = "data/images"                             # Pasta com imagens de rostos conhecidos
-    report_path = "reports/report.json"                       # Relatório final (JSON)
+    args = parse_args()
+    report_path = args.report
+
+    # Renderização a partir de resultados gravados: não carrega rostos nem modelos
+    if args.render_from:
+        render_from_results(args.video, args.render_from, args.output, preview=args.mode == MODE_PREVIEW)
+        return
+
+    # Relatório a partir do armazenamento por frame: segundos, sem vídeo nem modelos
+    if args.report_from:
+        from result_store_module import ResultStore
+        store = ResultStore(args.report_from)
+        gallery = None
+        if args.tolerance is not None:
+            gallery = FaceGallery.from_folder(args.images, tolerance=args.tolerance)
+        classify_poses = PoseSequenceClassifier(store.metadata["fps"]) if args.recompute_activities else None
+        aggregator = store.to_aggregator(gallery, classify_poses, anomaly_activities())
+        write_report(aggregator.snapshot(), report_path)
+        print("Report saved to:", report_path)
+        return
+
+    # Benchmarks offline; o vídeo de --video entra no teste ponta a ponta se existir
+    if args.benchmark:
+        from benchmark_module import run_benchmarks, print_benchmark_results, load_benchmark_results, \
+            compare_with_baseline
+        videos = [args.video] if os.path.exists(args.video) else []
+        results = run_benchmarks(args.images, args.benchmark, quick=args.benchmark_quick, videos=videos,
+                                 yunet_model=args.yunet_model)
+        print_benchmark_results(results)
+        if args.benchmark_baseline:
+            regressions = compare_with_baseline(results, load_benchmark_results(args.benchmark_baseline),
+                                                args.regression_threshold)
+            if regressions:
+                print(f"{len(regressions)} benchmark(s) acima do limite de regressão.")
+                sys.exit(1)
+        return
+
+    # Os modelos são carregados no primeiro uso; --warmup antecipa a carga de todos em paralelo. Com
+    # --segment-processes e --batch os modelos rodam nos processos workers, que os carregam por conta própria
+    if args.warmup and (args.segment_processes > 0 or args.batch):
+        print("Aviso: --warmup é ignorado com --segment-processes e --batch (cada processo carrega seus modelos).")
+    elif args.warmup:
+        # O Pose é criado por processador; o warm-up antecipa a importação do MediaPipe
+        components = ["face_recognition", "emotion", "mediapipe"]
+        registry.warmup(components)
+        registry.report()
 
     # Carrega os rostos conhecidos
-    known_face_encodings, known_face_names = load_known_faces(images_folder)
+    known_face_encodings, known_face_names = load_known_faces(args.images)
 
-    # Cria a instância do processador de vídeo
-    processor = VideoProcessor(
-        video_path, output_path, known_face_encodings, known_face_names,
-        frame_skip=2,         # Processa 1 a cada 2 frames para performance
-        resize_factor=1.0
+    face_detector_options = {}
+    if args.face_detector == "yunet":
+        face_detector_options = {"model_path": args.yunet_model}
+    elif args.face_detector == "cascade":
+        face_detector_options = {"fast": args.cascade_fast, "confirm_score": args.confirm_score,
+                                 "full_interval": args.cascade_full_interval}
+        if args.cascade_fast == "yunet":
+            face_detector_options["fast_options"] = {"model_path": args.yunet_model}
+
+    processor_kwargs = dict(
+        frame_skip=args.frame_skip,
+        resize_factor=args.resize_factor,
+        analysis_scale=args.analysis_scale,
+        pipelined=args.pipelined,
+        mode=args.mode,
+        results_path=args.results,
+        store_path=args.store,
+        multi_pose=args.multi_pose,
+        pose_model_path=args.pose_model,
+        max_poses=args.max_poses,
+        face_detector=args.face_detector,
+        face_detector_options=face_detector_options,
+        num_workers=args.workers,
+        queue_size=args.queue_size,
+        max_in_flight=args.max_in_flight,
+        use_tracking=args.tracking,
+        tracker_options={"refresh_interval": args.track_refresh, "detection_interval": args.detection_interval},
+        scheduler=AdaptiveFrameScheduler(args.target_fps, args.processing_fps) if args.adaptive else None,
+        keep_records=False,   # O relatório é agregado em streaming, com memória constante
+        checkpoint_path=os.path.splitext(report_path)[0] + ".checkpoint.json" if args.checkpoint_interval else None,
+        checkpoint_interval=args.checkpoint_interval,
+        metrics_path=args.metrics,
+        metrics_interval=args.metrics_interval,
+        metrics_port=args.metrics_port,
+        profile_path=args.profile,
+        profile_start=args.profile_start,
+        profile_frames=args.profile_frames,
     )
 
-    # Processa o vídeo e coleta os dados:
-    # total_frames, anomaly_count, face_data, emotion_data, activity_data
-    total_frames, anomaly_count, face_data, emotion_data, activity_data = processor.process_video()
+    # Arquivo, endpoint e perfil de métricas valem para um único processador (vídeo inteiro num processo)
+    if args.source or args.segment_processes > 0 or args.batch:
+        if args.metrics or args.metrics_port is not None or args.profile:
+            print("Aviso: --metrics, --metrics-port e --profile são ignorados com --source, --segment-processes "
+                  "e --batch.")
+        for key in ("metrics_path", "metrics_port", "profile_path"):
+            processor_kwargs.pop(key)
+
+    # Modo em lote: cada vídeo num processo do pool, com relatório e estado retomável próprios
+    if args.batch:
+        from batch_processing import BatchProcessor
+        if args.results or args.store:
+            print("Aviso: --results e --store são ignorados com --batch.")
+        for key in ("results_path", "store_path", "checkpoint_path"):
+            processor_kwargs.pop(key)
+        batch = BatchProcessor(
+            args.batch, args.batch_output, known_face_encodings, known_face_names,
+            num_workers=args.batch_workers or None,
+            memory_per_worker_gb=args.worker_memory,
+            **processor_kwargs
+        )
+        batch.run()
+        print("Processing completed.")
+        return
+
+    # Modo ao vivo: várias fontes com workers de inferência compartilhados e relatórios por janela
+    if args.source:
+        from stream_processing import MultiSourceRunner
+        for key in ("pipelined", "mode", "results_path", "store_path", "checkpoint_path", "checkpoint_interval"):
+            processor_kwargs.pop(key)
+        runner = MultiSourceRunner(
+            args.source, known_face_encodings, known_face_names,
+            window_seconds=args.window_seconds,
+            report_dir=os.path.join(os.path.dirname(report_path), "streams"),
+            realtime=args.replay,
+            duration=args.stream_duration,
+            **processor_kwargs
+        )
+        runner.run()
+        print("Processing completed.")
+        registry.report()
+        return
+
+    # Cria a instância do processador de vídeo
+    if args.segment_processes > 0:
+        from segment_processing import SegmentedVideoProcessor
+        processor = SegmentedVideoProcessor(
+            args.video, args.output, known_face_encodings, known_face_names,
+            num_processes=args.segment_processes, **processor_kwargs
+        )
+    else:
+        processor = VideoProcessor(args.video, args.output, known_face_encodings, known_face_names,
+                                   **processor_kwargs)
+
+    # Processa o vídeo; as estatísticas por pessoa são agregadas frame a frame
+    processor.process_video()
 
     # Gera o relatório final com estatísticas agregadas por pessoa
-    generate_report(face_data, emotion_data, activity_data, total_frames, anomaly_count, report_path)
+    write_report(processor.aggregator.snapshot(), report_path)
 
     print("Processing completed.")
     print("Report saved to:", report_path)
+    registry.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,91 @@
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ModelRegistry:
+    """
+    Registro de modelos e bibliotecas pesadas (TensorFlow/DeepFace, MediaPipe, dlib): cada componente é
+    criado apenas no primeiro uso, uma única vez por processo, e o tempo de carregamento é medido.
+    Estágios desativados nunca carregam os seus modelos.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._instances = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+        self.load_times = {}
+
+    def register(self, name, factory):
+        """
+        :param name: Nome do componente (ex.: "pose", "emotion").
+        :param factory: Função sem argumentos que importa e cria o componente.
+        """
+        with self._registry_lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def get(self, name):
+        """Retorna o componente, carregando-o na primeira chamada (seguro entre threads)."""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        if name not in self._factories:
+            raise KeyError(f"Componente não registrado: {name}")
+        with self._locks[name]:
+            if name not in self._instances:
+                start_time = time.perf_counter()
+                self._instances[name] = self._factories[name]()
+                self.load_times[name] = time.perf_counter() - start_time
+        return self._instances[name]
+
+    def is_loaded(self, name):
+        return name in self._instances
+
+    @property
+    def names(self):
+        return list(self._factories)
+
+    def warmup(self, names=None, parallel=True):
+        """
+        Carrega os componentes antecipadamente, em threads paralelas (as importações de TensorFlow, MediaPipe
+        e dlib se sobrepõem), para que o primeiro frame não pague o custo de inicialização.
+        :param names: Componentes a carregar (padrão: todos os registrados).
+        :return: Dicionário {componente: segundos}.
+        """
+        names = self.names if names is None else list(names)
+        if parallel and len(names) > 1:
+            with ThreadPoolExecutor(max_workers=len(names), thread_name_prefix="warmup") as executor:
+                futures = {name: executor.submit(self.get, name) for name in names}
+                for name, future in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"Erro ao carregar o componente {name}: {e}")
+        else:
+            for name in names:
+                self.get(name)
+        return {name: self.load_times[name] for name in names if name in self.load_times}
+
+    def report(self):
+        """Imprime o tempo de carregamento de cada componente carregado."""
+        if not self.load_times:
+            return
+        print("Tempo de carregamento por componente:")
+        for name, seconds in sorted(self.load_times.items(), key=lambda item: -item[1]):
+            print(f"  {name}: {seconds:.2f}s")
+
+
+# Registro compartilhado pelos módulos de análise
+registry = ModelRegistry()
+
+# Bibliotecas usadas por mais de um módulo ficam registradas aqui, uma única vez, para que nenhum módulo dependa
+# da ordem de importação. O face_recognition carrega os modelos do dlib ao ser importado: fica para o primeiro uso
+registry.register("face_recognition", lambda: importlib.import_module("face_recognition"))
+registry.register("mediapipe", lambda: importlib.import_module("mediapipe"))
+
+
+if __name__ == "__main__":
+    print("Este é o módulo model_registry_module. Execute 'main.py' para iniciar a aplicação.")
@@ -0,0 +1,284 @@
+import cProfile
+import csv
+import json
+import os
+import pstats
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Estágios medidos, na ordem em que aparecem nos relatórios (as esperas em filas, "queue_wait_*", vêm depois)
+STAGES = ("decode", "resize", "face_detection", "face_encoding", "matching", "emotion", "pose", "drawing",
+          "encoding", "display")
+PERCENTILES = (50, 95, 99)
+
+# Erros capturados dentro dos estágios (ex.: análise de emoções), por estágio
+_error_counts = Counter()
+_error_lock = threading.Lock()
+
+
+def report_error(stage, error):
+    """Registra e imprime um erro que foi tratado dentro de um estágio (em vez de apenas imprimi-lo)."""
+    with _error_lock:
+        _error_counts[stage] += 1
+    print(f"Erro no estágio {stage}: {error}")
+
+
+def error_counts():
+    with _error_lock:
+        return dict(_error_counts)
+
+
+def timed(metrics, stage):
+    """Context manager que mede o estágio em metrics (ou não faz nada se metrics for None)."""
+    return metrics.stage(stage) if metrics is not None else nullcontext()
+
+
+class StageMetrics:
+    """
+    Latências por estágio (amostras recentes para os percentis), filas, frames e rostos por frame.
+    Seguro entre threads: os estágios do modo em pipeline registram em paralelo.
+    """
+
+    def __init__(self, max_samples=10000):
+        """
+        :param max_samples: Número de amostras mais recentes mantidas por estágio para os percentis.
+        """
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._counts = Counter()
+        self._totals = Counter()
+        self.frames = 0
+        self.faces = 0
+        self.start_time = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start_time)
+
+    def record(self, name, seconds):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.max_samples)
+            samples.append(seconds)
+            self._counts[name] += 1
+            self._totals[name] += seconds
+
+    def frame_done(self, face_count=0):
+        with self._lock:
+            self.frames += 1
+            self.faces += face_count
+
+    def summary(self):
+        """
+        :return: Dicionário com frames, fps, faces_per_frame, erros e, por estágio, count, mean_ms e p50/p95/p99 (ms).
+        """
+        with self._lock:
+            samples = {name: np.fromiter(values, dtype=np.float64) for name, values in self._samples.items()}
+            counts = dict(self._counts)
+            totals = dict(self._totals)
+            frames = self.frames
+            faces = self.faces
+        elapsed = time.perf_counter() - self.start_time
+
+        order = [name for name in STAGES if name in samples] + sorted(set(samples) - set(STAGES))
+        stages = {}
+        for name in order:
+            values = samples[name] * 1000.0
+            stats = {"count": counts[name], "mean_ms": totals[name] * 1000.0 / counts[name]}
+            for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                stats[f"p{percentile}_ms"] = float(value)
+            stages[name] = stats
+        return {
+            "timestamp": time.time(),
+            "elapsed_seconds": elapsed,
+            "frames": frames,
+            "fps": frames / elapsed if elapsed > 0 else 0.0,
+            "faces_per_frame": faces / frames if frames else 0.0,
+            "errors": error_counts(),
+            "stages": stages,
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"Desempenho: {summary['frames']} frames em {summary['elapsed_seconds']:.1f}s "
+              f"({summary['fps']:.1f} FPS, {summary['faces_per_frame']:.2f} rostos/frame)")
+        for name, stats in summary["stages"].items():
+            print(f"  {name:<22} n={stats['count']:<7} p50={stats['p50_ms']:8.2f}ms "
+                  f"p95={stats['p95_ms']:8.2f}ms p99={stats['p99_ms']:8.2f}ms")
+        for stage, count in summary["errors"].items():
+            print(f"  erros em {stage}: {count}")
+
+    def prometheus_text(self):
+        """Métricas no formato de exposição de texto do Prometheus."""
+        summary = self.summary()
+        lines = [
+            "# TYPE video_frames_total counter",
+            f"video_frames_total {summary['frames']}",
+            "# TYPE video_fps gauge",
+            f"video_fps {summary['fps']:.6f}",
+            "# TYPE video_faces_per_frame gauge",
+            f"video_faces_per_frame {summary['faces_per_frame']:.6f}",
+            "# TYPE video_stage_latency_seconds summary",
+        ]
+        for name, stats in summary["stages"].items():
+            for percentile in PERCENTILES:
+                quantile = percentile / 100.0
+                lines.append(f'video_stage_latency_seconds{{stage="{name}",quantile="{quantile}"}} '
+                             f'{stats[f"p{percentile}_ms"] / 1000.0:.6f}')
+            lines.append(f'video_stage_latency_seconds_count{{stage="{name}"}} {stats["count"]}')
+            lines.append(f'video_stage_latency_seconds_sum{{stage="{name}"}} '
+                         f'{stats["mean_ms"] * stats["count"] / 1000.0:.6f}')
+        lines.append("# TYPE video_stage_errors_total counter")
+        for stage, count in summary["errors"].items():
+            lines.append(f'video_stage_errors_total{{stage="{stage}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+class MetricsWriter:
+    """Grava snapshots periódicos de StageMetrics em JSON Lines (.jsonl) ou CSV (.csv), pela extensão do arquivo."""
+
+    def __init__(self, metrics_path, interval_frames=100):
+        directory = os.path.dirname(metrics_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.metrics_path = metrics_path
+        self.interval_frames = max(1, interval_frames)
+        self.csv = metrics_path.lower().endswith(".csv")
+        self._file = open(metrics_path, "w", encoding="utf-8", newline="")
+        self._csv_writer = csv.writer(self._file) if self.csv else None
+        if self.csv:
+            self._csv_writer.writerow(["timestamp", "frames", "fps", "faces_per_frame", "stage", "count",
+                                       "mean_ms", *[f"p{p}_ms" for p in PERCENTILES]])
+
+    def maybe_write(self, metrics):
+        if metrics.frames and metrics.frames % self.interval_frames == 0:
+            self.write(metrics.summary())
+
+    def write(self, summary):
+        if self.csv:
+            for name, stats in summary["stages"].items():
+                self._csv_writer.writerow([summary["timestamp"], summary["frames"], summary["fps"],
+                                           summary["faces_per_frame"], name, stats["count"], stats["mean_ms"],
+                                           *[stats[f"p{p}_ms"] for p in PERCENTILES]])
+        else:
+            self._file.write(json.dumps(summary) + "\n")
+        self._file.flush()
+
+    def close(self, metrics=None):
+        if metrics is not None:
+            self.write(metrics.summary())
+        self._file.close()
+
+
+class MetricsServer:
+    """Endpoint HTTP em processo (/metrics) com as métricas no formato de texto do Prometheus."""
+
+    def __init__(self, metrics, port=9100, host="127.0.0.1"):
+        self.metrics = metrics
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = server.metrics.prometheus_text().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        host, port = self._server.server_address[:2]
+        print(f"Métricas disponíveis em http://{host}:{port}/metrics")
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class ProfileWindow:
+    """
+    Perfil com cProfile de uma janela de frames [start_frame, start_frame + num_frames). Cada thread que processa
+    frames da janela tem seu próprio perfilador; ao final, os perfis são somados num único arquivo .prof
+    (visualizável com snakeviz ou pstats). Fora da janela não há custo de perfilamento, o que também facilita
+    amostrar o processo com py-spy (as threads do pipeline têm nomes).
+    """
+
+    def __init__(self, profile_path, start_frame=0, num_frames=100):
+        self.profile_path = profile_path
+        self.start_frame = start_frame
+        self.end_frame = start_frame + num_frames
+        self._profilers = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def update(self, frame_number):
+        """Chamado pela thread antes de processar cada frame: liga ou desliga o perfilador desta thread."""
+        active = getattr(self._local, "active", False)
+        inside = self.start_frame <= frame_number < self.end_frame
+        if inside and not active and not getattr(self._local, "unavailable", False):
+            profiler = getattr(self._local, "profiler", None)
+            if profiler is None:
+                profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # A partir do Python 3.12 só um perfilador pode estar ativo no processo: as demais threads
+                # ficam de fora (use py-spy para amostrar todas)
+                self._local.unavailable = True
+                return
+            if getattr(self._local, "profiler", None) is None:
+                self._local.profiler = profiler
+                with self._lock:
+                    self._profilers[threading.get_ident()] = profiler
+            self._local.active = True
+        elif not inside and active:
+            self._local.profiler.disable()
+            self._local.active = False
+
+    def stop(self):
+        """Desliga o perfilador da thread atual (as demais threads já terminaram ou saíram da janela)."""
+        if getattr(self._local, "active", False):
+            self._local.profiler.disable()
+            self._local.active = False
+
+    def dump(self):
+        self.stop()
+        with self._lock:
+            profilers = list(self._profilers.values())
+        if not profilers:
+            print("Aviso: nenhum frame processado dentro da janela de perfilamento.")
+            return
+        directory = os.path.dirname(self.profile_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        stats = pstats.Stats(profilers[0])
+        for profiler in profilers[1:]:
+            stats.add(profiler)
+        stats.dump_stats(self.profile_path)
+        print(f"Perfil (frames {self.start_frame}-{self.end_frame - 1}) salvo em: {self.profile_path}")
+
+
+if __name__ == "__main__":
+    print("Este é o módulo profiling_module. Execute 'main.py' para iniciar a aplicação.")
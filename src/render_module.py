@@ -0,0 +1,277 @@
+import json
+import os
+import queue
+import threading
+
+import cv2
+from profiling_module import timed
+
+# Modos de execução do VideoProcessor
+MODE_ANALYSIS = "analysis"   # Apenas análise/relatório: sem VideoWriter, desenho ou janela
+MODE_ANNOTATE = "annotate"   # Grava o vídeo anotado, sem janela
+MODE_PREVIEW = "preview"     # Grava o vídeo anotado e exibe a janela de visualização
+MODES = (MODE_ANALYSIS, MODE_ANNOTATE, MODE_PREVIEW)
+
+# Conexões do esqueleto do MediaPipe Pose (equivalente a mp.solutions.pose.POSE_CONNECTIONS)
+POSE_CONNECTIONS = (
+    (0, 1), (1, 2), (2, 3), (3, 7), (0, 4), (4, 5), (5, 6), (6, 8), (9, 10),
+    (11, 12), (11, 13), (13, 15), (15, 17), (15, 19), (15, 21), (17, 19),
+    (12, 14), (14, 16), (16, 18), (16, 20), (16, 22), (18, 20),
+    (11, 23), (12, 24), (23, 24), (23, 25), (24, 26), (25, 27), (26, 28),
+    (27, 29), (28, 30), (29, 31), (30, 32), (27, 31), (28, 32),
+)
+LANDMARK_COLOR = (245, 117, 66)
+CONNECTION_COLOR = (245, 66, 230)
+VISIBILITY_THRESHOLD = 0.5
+
+
+def build_frame_record(frame_number, analysis, pose_landmarks, frame_size):
+    """
+    Converte a análise de um frame num registro serializável (JSON), usado para desenhar e para replay.
+    :param pose_landmarks: Lista (uma por pessoa) de 33 landmarks [x, y, z, visibility] normalizados.
+    :param frame_size: Tupla (largura, altura) do frame analisado.
+    """
+    emotions = analysis["emotions"]
+    faces = []
+    for i, face in enumerate(analysis["faces"]):
+        faces.append({
+            "face_id": face.get("face_id"),
+            "track_id": face.get("track_id"),
+            "name": face["name"],
+            "location": [int(v) for v in face["location"]],
+            "emotion": emotions[i] if i < len(emotions) else "Desconhecido",
+        })
+    return {
+        "frame": frame_number,
+        "width": frame_size[0],
+        "height": frame_size[1],
+        "decision": analysis.get("decision"),
+        "anomaly": bool(analysis.get("anomaly_detected", False)),
+        "faces": faces,
+        "activities": [ad["activities"] for ad in analysis.get("frame_activities", [])],
+        "pose_landmarks": pose_landmarks,
+    }
+
+
+def draw_pose(frame, pose_landmarks):
+    """Desenha os esqueletos a partir de landmarks normalizados [x, y, z, visibility]."""
+    height, width = frame.shape[:2]
+    for landmarks in pose_landmarks:
+        points = [
+            (int(x * width), int(y * height)) if visibility >= VISIBILITY_THRESHOLD else None
+            for x, y, _, visibility in landmarks
+        ]
+        for start, end in POSE_CONNECTIONS:
+            if points[start] is not None and points[end] is not None:
+                cv2.line(frame, points[start], points[end], CONNECTION_COLOR, 2)
+        for point in points:
+            if point is not None:
+                cv2.circle(frame, point, 4, LANDMARK_COLOR, 2)
+
+
+def draw_frame_record(frame, record):
+    """Desenha rostos (nome e emoção), atividades e esqueletos de um registro no frame."""
+    font = cv2.FONT_HERSHEY_DUPLEX
+    padding = 10
+    for face in record["faces"]:
+        top, right, bottom, left = face["location"]
+        top = max(0, top - padding)
+        right = min(frame.shape[1], right + padding)
+        bottom = min(frame.shape[0], bottom + padding)
+        left = max(0, left - padding)
+
+        cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
+        cv2.rectangle(frame, (left, bottom - 35), (right, bottom), (0, 255, 0), cv2.FILLED)
+        cv2.putText(frame, face["name"], (left + 6, bottom - 6), font, 0.8, (255, 255, 255), 1)
+        cv2.putText(frame, face["emotion"], (left + 6, top - 6), font, 0.8, (0, 0, 255), 1)
+
+    # Exibe as atividades no frame para os rostos processados
+    y_offset = 50
+    for activities in record["activities"]:
+        cv2.putText(frame, ", ".join(activities), (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
+        y_offset += 25
+
+    draw_pose(frame, record["pose_landmarks"])
+
+
+class FrameRenderer:
+    """
+    Consumidor de renderização numa thread própria: desenha os registros, codifica o vídeo de saída e,
+    no modo preview, exibe a janela. A análise apenas enfileira (frame, registro) e segue em frente.
+    """
+
+    def __init__(self, output_path, fps, frame_size, preview=False, queue_size=32, metrics=None):
+        """
+        :param metrics: StageMetrics opcional (estágios "drawing", "encoding", "display" e a espera na fila).
+        """
+        self.output_path = output_path
+        self.fps = fps
+        self.frame_size = frame_size
+        self.preview = preview
+        self.stopped = False
+        self.metrics = metrics
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._error = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._render_loop, name="renderer", daemon=True)
+        self._thread.start()
+        return self
+
+    def submit(self, frame, record, release=None):
+        """
+        Enfileira um frame para desenho/gravação (bloqueia se a fila estiver cheia).
+        :param release: Função chamada quando o frame não for mais usado pelo renderizador (ex.:
+                        FrameContext.release, que devolve o buffer ao pool).
+        """
+        if self.stopped:
+            if release is not None:
+                release()
+            return
+        with timed(self.metrics, "queue_wait_render"):
+            queued = self._put((frame, record, release))
+        if not queued and release is not None:
+            release()
+
+    def close(self):
+        """Aguarda a gravação dos frames pendentes e libera o vídeo e a janela."""
+        self._put(None)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _put(self, item, poll_interval=0.1):
+        """
+        Enfileira bloqueando enquanto a thread de renderização estiver viva: se ela morrer com a fila cheia,
+        ninguém mais consome a fila e um put sem timeout bloquearia para sempre.
+        :return: False se a thread já terminou e o item não foi enfileirado.
+        """
+        while True:
+            try:
+                self._queue.put(item, timeout=poll_interval)
+                return True
+            except queue.Full:
+                if not self._thread.is_alive():
+                    return False
+
+    def _render(self, out, frame, record):
+        if record is not None:
+            with timed(self.metrics, "drawing"):
+                draw_frame_record(frame, record)
+        with timed(self.metrics, "encoding"):
+            out.write(frame)
+        if self.preview:
+            with timed(self.metrics, "display"):
+                cv2.imshow('Processed Video', frame)
+                key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):
+                self.stopped = True
+
+    def _render_loop(self):
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(self.output_path, fourcc, self.fps, self.frame_size)
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                frame, record, release = item
+                try:
+                    if not self.stopped:
+                        self._render(out, frame, record)
+                except Exception as e:
+                    # Guarda o primeiro erro e continua consumindo a fila (liberando os frames) até close(),
+                    # para que submit e close nunca fiquem bloqueados numa fila cheia
+                    if self._error is None:
+                        self._error = e
+                    self.stopped = True
+                finally:
+                    if release is not None:
+                        release()
+        finally:
+            out.release()
+            if self.preview:
+                cv2.destroyAllWindows()
+
+
+class FrameResultWriter:
+    """Grava os registros por frame em JSON Lines, para renderizar depois sem repetir a inferência."""
+
+    def __init__(self, results_path):
+        directory = os.path.dirname(results_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.results_path = results_path
+        self._file = open(results_path, "w", encoding="utf-8")
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+def read_frame_results(results_path):
+    """Lê os registros por frame gravados por FrameResultWriter, em ordem."""
+    with open(results_path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def render_from_results(video_path, results_path, output_path, preview=False, hold_last=True):
+    """
+    Gera o vídeo anotado a partir do vídeo original e dos resultados gravados, sem executar os modelos.
+    :param hold_last: Se True, frames sem registro repetem as últimas anotações.
+    """
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Erro ao abrir o vídeo: {video_path}")
+    frame_size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+    renderer = FrameRenderer(output_path, cap.get(cv2.CAP_PROP_FPS), frame_size, preview).start()
+
+    records = read_frame_results(results_path)
+    next_record = next(records, None)
+    current = None
+    frame_number = 0
+    try:
+        while not renderer.stopped:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_number += 1
+            record = None
+            while next_record is not None and next_record["frame"] <= frame_number:
+                if next_record["frame"] == frame_number:
+                    record = next_record
+                next_record = next(records, None)
+            if record is not None:
+                current = record
+            elif hold_last:
+                record = current
+            if record is not None:
+                # Registros gravados em outra resolução (resize_factor) são redimensionados para o vídeo original
+                scale_x = frame_size[0] / record.get("width", frame_size[0])
+                scale_y = frame_size[1] / record.get("height", frame_size[1])
+                if scale_x != 1.0 or scale_y != 1.0:
+                    record = scale_frame_record(record, scale_x, scale_y)
+            renderer.submit(frame, record)
+    finally:
+        cap.release()
+        renderer.close()
+    print("Vídeo renderizado e salvo em:", output_path)
+
+
+def scale_frame_record(record, scale_x, scale_y):
+    """Retorna uma cópia do registro com as caixas dos rostos escaladas (landmarks já são normalizados)."""
+    faces = []
+    for face in record["faces"]:
+        top, right, bottom, left = face["location"]
+        faces.append({**face, "location": [int(top * scale_y), int(right * scale_x),
+                                           int(bottom * scale_y), int(left * scale_x)]})
+    return {**record, "faces": faces}
+
+
+if __name__ == "__main__":
+    print("Este é o módulo render_module. Execute 'main.py' para iniciar a aplicação.")
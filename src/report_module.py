@@ -1,69 +1,203 @@
 # src/report_module.py
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 import json
 
 
-def generate_report(face_data, emotion_data, activity_data, total_frames, anomaly_count, report_path):
+class ReportAggregator:
     """
-    Gera o relatório final agregando estatísticas por pessoa.
-    :param face_data: Lista de detecções faciais (cada item com "face_id", "name" e "location").
-    :param emotion_data: Lista de dicionários {"face_id", "label"}.
-    :param activity_data: Lista de dicionários {"face_id", "activities": [lista de atividades]}.
-    :param total_frames: Total de frames processados.
-    :param anomaly_count: Número total de anomalias detectadas.
-    :param report_path: Caminho para salvar o relatório (JSON).
+    Agregador incremental do relatório: contadores O(1) por pessoa, emoção e atividade, atualizados a cada
+    frame. A memória cresce com o número de pessoas (e tracks), não com o número de detecções.
     """
-    # Agrupando os dados por pessoa (usando o campo "name")
-    person_stats = {}
-    for face in face_data:
-        name = face.get("name", "Desconhecido")
-        if name not in person_stats:
-            person_stats[name] = {
+
+    def __init__(self):
+        self.total_frames = 0
+        self.anomaly_count = 0
+        self.total_face_detections = 0
+        self.person_stats = {}
+        self.person_tracks = {}
+
+    def _person(self, name):
+        stats = self.person_stats.get(name)
+        if stats is None:
+            stats = self.person_stats[name] = {
                 "face_detections": 0,
                 "emotions": {},
                 "activities": {}
             }
-        person_stats[name]["face_detections"] += 1
+        return stats
+
+    def add_detection(self, name, track_id=None):
+        self._person(name)["face_detections"] += 1
+        self.total_face_detections += 1
+        if track_id is not None:
+            self.person_tracks.setdefault(name, set()).add(track_id)
+
+    def add_emotion(self, name, emotion):
+        emotions = self._person(name)["emotions"]
+        emotions[emotion] = emotions.get(emotion, 0) + 1
+
+    def add_activities(self, name, activities):
+        activities = activities if isinstance(activities, list) else [activities]
+        counts = self._person(name)["activities"]
+        for act in activities:
+            counts[act] = counts.get(act, 0) + 1
+
+    def add_face(self, name, emotion=None, activities=None, track_id=None):
+        """Registra uma detecção facial com sua emoção e atividades."""
+        self.add_detection(name, track_id)
+        if emotion is not None:
+            self.add_emotion(name, emotion)
+        if activities is not None:
+            self.add_activities(name, activities)
+
+    def merge(self, other, track_offset=0):
+        """
+        Soma os contadores de outro agregador (ex.: de um segmento do vídeo).
+        :param track_offset: Deslocamento aplicado aos track_ids do outro agregador.
+        """
+        self.total_frames += other.total_frames
+        self.anomaly_count += other.anomaly_count
+        self.total_face_detections += other.total_face_detections
+        for name, stats in other.person_stats.items():
+            person = self._person(name)
+            person["face_detections"] += stats["face_detections"]
+            for key in ("emotions", "activities"):
+                for label, count in stats[key].items():
+                    person[key][label] = person[key].get(label, 0) + count
+        for name, tracks in other.person_tracks.items():
+            self.person_tracks.setdefault(name, set()).update(track + track_offset for track in tracks)
+
+    def snapshot(self):
+        """Retorna o relatório no formato de report.json com os dados agregados até o momento."""
+        person_stats = {}
+        for name, stats in self.person_stats.items():
+            person_stats[name] = {
+                "face_detections": stats["face_detections"],
+                "emotions": dict(stats["emotions"]),
+                "activities": dict(stats["activities"])
+            }
+            # Com rastreamento, cada track é uma pessoa distinta: conta pessoas além de detecções
+            if self.person_tracks:
+                person_stats[name]["track_count"] = len(self.person_tracks.get(name, ()))
+
+        report = {
+            "total_frames": self.total_frames,
+            "anomaly_count": self.anomaly_count,
+            "total_face_detections": self.total_face_detections,
+            "total_person_count": len(person_stats),
+            "identified_persons": list(person_stats.keys()),
+            "person_statistics": person_stats
+        }
+        if self.person_tracks:
+            report["total_tracked_persons"] = len({t for tracks in self.person_tracks.values() for t in tracks})
+        return report
+
+    def to_state(self):
+        """Estado completo do agregador serializável em JSON (para retomar a agregação com from_state)."""
+        return {
+            "total_frames": self.total_frames,
+            "anomaly_count": self.anomaly_count,
+            "total_face_detections": self.total_face_detections,
+            "person_stats": self.person_stats,
+            "person_tracks": {name: sorted(tracks) for name, tracks in self.person_tracks.items()},
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        aggregator = cls()
+        aggregator.total_frames = state["total_frames"]
+        aggregator.anomaly_count = state["anomaly_count"]
+        aggregator.total_face_detections = state["total_face_detections"]
+        aggregator.person_stats = {
+            name: {"face_detections": stats["face_detections"], "emotions": dict(stats["emotions"]),
+                   "activities": dict(stats["activities"])}
+            for name, stats in state["person_stats"].items()
+        }
+        aggregator.person_tracks = {name: set(tracks) for name, tracks in state["person_tracks"].items()}
+        return aggregator
+
+    def write_checkpoint(self, checkpoint_path):
+        """Grava um snapshot parcial do relatório de forma atômica (sem gerar gráficos)."""
+        write_json_atomic(self.snapshot(), checkpoint_path)
+
+
+def write_json_atomic(data, path):
+    """Grava o JSON num arquivo temporário e o renomeia, para que uma interrupção nunca deixe o arquivo truncado."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+def aggregate_records(face_data, emotion_data, activity_data, total_frames, anomaly_count):
+    """
+    Monta um ReportAggregator a partir das listas de registros retornadas por VideoProcessor.process_video.
+    :return: ReportAggregator preenchido.
+    """
+    aggregator = ReportAggregator()
+    aggregator.total_frames = total_frames
+    aggregator.anomaly_count = anomaly_count
+
+    # Agrupando os dados por pessoa (usando o campo "name"); o índice por face_id evita buscas lineares
+    names_by_face_id = {}
+    for face in face_data:
+        name = face.get("name", "Desconhecido")
+        names_by_face_id[face["face_id"]] = name
+        aggregator.add_detection(name, face.get("track_id"))
 
     # Agregando as emoções por pessoa, utilizando o face_id para relacionar
     for ed in emotion_data:
-        face_id = ed["face_id"]
-        face = next((f for f in face_data if f["face_id"] == face_id), None)
-        if face:
-            name = face.get("name", "Desconhecido")
-            emotion = ed["label"]
-            person_stats[name]["emotions"][emotion] = person_stats[name]["emotions"].get(emotion, 0) + 1
+        name = names_by_face_id.get(ed["face_id"])
+        if name is not None:
+            aggregator.add_emotion(name, ed["label"])
 
     # Agregando as atividades por pessoa
     for ad in activity_data:
-        face_id = ad["face_id"]
-        activities = ad["activities"] if isinstance(ad["activities"], list) else [ad["activities"]]
-        face = next((f for f in face_data if f["face_id"] == face_id), None)
-        if face:
-            name = face.get("name", "Desconhecido")
-            for act in activities:
-                person_stats[name]["activities"][act] = person_stats[name]["activities"].get(act, 0) + 1
-
-    report = {
-        "total_frames": total_frames,
-        "anomaly_count": anomaly_count,
-        "total_face_detections": len(face_data),
-        "total_person_count": len(person_stats),
-        "identified_persons": list(person_stats.keys()),
-        "person_statistics": person_stats
-    }
+        name = names_by_face_id.get(ad["face_id"])
+        if name is not None:
+            aggregator.add_activities(name, ad["activities"])
+    return aggregator
+
 
+def write_report(report, report_path, plot=True):
+    """
+    Salva o relatório (JSON) e, opcionalmente, os gráficos na mesma pasta.
+    :param report: Dicionário retornado por ReportAggregator.snapshot.
+    :param report_path: Caminho para salvar o relatório (JSON).
+    """
     os.makedirs(os.path.dirname(report_path), exist_ok=True)
     with open(report_path, "w", encoding="utf-8") as f:
         json.dump(report, f, indent=4, ensure_ascii=False)
     print(f"Relatório salvo em: {report_path}")
 
-    plot_statistics(person_stats, os.path.dirname(report_path))
+    if plot:
+        plot_statistics(report["person_statistics"], os.path.dirname(report_path))
+
+
+def generate_report(face_data, emotion_data, activity_data, total_frames, anomaly_count, report_path, plot=True):
+    """
+    Gera o relatório final agregando estatísticas por pessoa.
+    :param face_data: Lista de detecções faciais (cada item com "face_id", "name", "location" e, com
+                      rastreamento, "track_id").
+    :param emotion_data: Lista de dicionários {"face_id", "label"}.
+    :param activity_data: Lista de dicionários {"face_id", "activities": [lista de atividades]}.
+    :param total_frames: Total de frames processados.
+    :param anomaly_count: Número total de anomalias detectadas.
+    :param report_path: Caminho para salvar o relatório (JSON).
+    :param plot: Se True, gera também os gráficos.
+    """
+    aggregator = aggregate_records(face_data, emotion_data, activity_data, total_frames, anomaly_count)
+    write_report(aggregator.snapshot(), report_path, plot)
 
 
 def plot_statistics(person_stats, output_dir):
+    # matplotlib/seaborn só são importados quando os gráficos são gerados
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
     # Agregando estatísticas gerais de emoções e atividades
     overall_emotions = {}
     overall_activities = {}
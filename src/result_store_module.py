@@ -0,0 +1,441 @@
+import bisect
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+from report_module import ReportAggregator
+from frame_scheduler_module import RUN_POSE_ONLY
+
+STORE_VERSION = 1
+METADATA_FILENAME = "store.json"
+ENCODING_SIZE = 128
+NUM_LANDMARKS = 33
+NUM_EMOTIONS = 7        # Mesma ordem de emotion_analysis_module.EMOTION_LABELS
+MAX_ACTIVITIES = 64     # As atividades de cada rosto/pose são guardadas como bitmask uint64
+
+# Colunas de cada chunk: nome -> (dtype, shape de cada linha)
+FRAME_COLUMNS = {
+    "frame_number": (np.int64, ()),
+    "decision": (np.int8, ()),
+    "anomaly": (np.bool_, ()),
+    "face_offset": (np.int64, ()),   # Primeira linha de faces/* deste frame (dentro do chunk)
+    "face_count": (np.int32, ()),
+    "pose_offset": (np.int64, ()),   # Primeira linha de poses/* deste frame (dentro do chunk)
+    "pose_count": (np.int32, ()),
+}
+FACE_COLUMNS = {
+    "frame_number": (np.int64, ()),
+    "face_id": (np.int64, ()),
+    "track_id": (np.int64, ()),      # -1 sem rastreamento
+    "name": (np.int32, ()),          # Índice em metadata["names"]
+    "box": (np.int32, (4,)),         # (top, right, bottom, left)
+    "encoding": (np.float32, (ENCODING_SIZE,)),     # NaN quando o encoding não foi calculado
+    "emotion": (np.int16, ()),       # Índice em metadata["emotions"]
+    "emotion_probabilities": (np.float32, (NUM_EMOTIONS,)),  # NaN quando não disponíveis
+    "activities": (np.uint64, ()),   # Bitmask sobre metadata["activities"]
+    "pose_index": (np.int32, ()),    # Pose (dentro do frame) associada ao rosto; -1 se nenhuma
+}
+POSE_COLUMNS = {
+    "frame_number": (np.int64, ()),
+    "landmarks": (np.float32, (NUM_LANDMARKS, 4)),  # (x, y, z, visibility) normalizados
+    "activities": (np.uint64, ()),
+}
+TABLES = {"frames": FRAME_COLUMNS, "faces": FACE_COLUMNS, "poses": POSE_COLUMNS}
+CHUNK_PATTERN = re.compile(r"chunk_\d{5}")
+COLUMN_FILENAMES = {f"{table}_{column}.npy" for table, columns in TABLES.items() for column in columns}
+
+
+def is_result_store(store_path):
+    """Indica se a pasta é um armazenamento gravado por ResultStoreWriter (store.json e apenas chunks de colunas)."""
+    entries = os.listdir(store_path)
+    if METADATA_FILENAME not in entries:
+        return False
+    for entry in entries:
+        path = os.path.join(store_path, entry)
+        if entry in (METADATA_FILENAME, METADATA_FILENAME + ".tmp"):
+            continue
+        if not (CHUNK_PATTERN.fullmatch(entry) and os.path.isdir(path)
+                and set(os.listdir(path)) <= COLUMN_FILENAMES):
+            return False
+    return True
+
+
+class _Vocabulary:
+    """Mapeia rótulos (nomes, emoções, atividades, decisões) para códigos inteiros estáveis."""
+
+    def __init__(self, labels=()):
+        self.labels = list(labels)
+        self._codes = {label: i for i, label in enumerate(self.labels)}
+
+    def code(self, label):
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+    def bitmask(self, labels):
+        mask = 0
+        for label in labels:
+            code = self.code(label)
+            if code >= MAX_ACTIVITIES:
+                raise ValueError(f"Mais de {MAX_ACTIVITIES} atividades distintas no armazenamento.")
+            mask |= 1 << code
+        return mask
+
+
+class ResultStoreWriter:
+    """
+    Grava os resultados por frame em formato colunar: cada chunk é uma pasta com um arquivo .npy por coluna
+    (frames/*, faces/*, poses/*), e store.json guarda os vocabulários e o índice de frames por chunk.
+    """
+
+    def __init__(self, store_path, chunk_frames=1000, video_path=None, fps=None):
+        """
+        :param store_path: Pasta do armazenamento. Um armazenamento anterior na mesma pasta é substituído; uma
+                           pasta não vazia com outros arquivos é recusada (ValueError), nunca apagada.
+        :param chunk_frames: Número de frames analisados por chunk.
+        """
+        if os.path.isdir(store_path) and os.listdir(store_path):
+            if not is_result_store(store_path):
+                raise ValueError(f"A pasta {store_path} não está vazia e não é um armazenamento de resultados: "
+                                 "escolha uma pasta nova ou vazia para o armazenamento.")
+            shutil.rmtree(store_path)
+        os.makedirs(store_path, exist_ok=True)
+        self.store_path = store_path
+        self.chunk_frames = max(1, chunk_frames)
+        self.metadata = {
+            "version": STORE_VERSION,
+            "video_path": video_path,
+            "fps": fps,
+            "total_frames": 0,
+            "chunks": [],
+        }
+        self.names = _Vocabulary()
+        self.emotions = _Vocabulary()
+        self.activities = _Vocabulary()
+        self.decisions = _Vocabulary()
+        self._rows = {table: {column: [] for column in columns} for table, columns in TABLES.items()}
+
+    def add_frame(self, frame_number, analysis, pose_landmarks):
+        """
+        Adiciona um frame analisado.
+        :param analysis: Análise do frame (após VideoProcessor._collect_results).
+        :param pose_landmarks: Array float32 (pessoas, 33, 4) com os landmarks da pose.
+        """
+        frames = self._rows["frames"]
+        faces = self._rows["faces"]
+        poses = self._rows["poses"]
+
+        # Num frame só de pose, os rostos exibidos são os do último frame completo: não são novas detecções
+        frame_faces = analysis["faces"] if analysis["decision"] != RUN_POSE_ONLY else []
+        emotions = analysis["emotions"]
+        probabilities = analysis.get("emotion_probabilities")
+        frame_activities = analysis.get("frame_activities", [])
+        pose_assignment = analysis.get("pose_assignment", [])
+
+        frames["frame_number"].append(frame_number)
+        frames["decision"].append(self.decisions.code(analysis["decision"]))
+        frames["anomaly"].append(bool(analysis["anomaly_detected"]))
+        frames["face_offset"].append(len(faces["frame_number"]))
+        frames["face_count"].append(len(frame_faces))
+        frames["pose_offset"].append(len(poses["frame_number"]))
+        frames["pose_count"].append(len(pose_landmarks))
+
+        for i, face in enumerate(frame_faces):
+            encoding = face.get("encoding")
+            faces["frame_number"].append(frame_number)
+            faces["face_id"].append(face["face_id"])
+            faces["track_id"].append(-1 if face.get("track_id") is None else face["track_id"])
+            faces["name"].append(self.names.code(face["name"]))
+            faces["box"].append(face["location"])
+            faces["encoding"].append(np.full(ENCODING_SIZE, np.nan, np.float32) if encoding is None else encoding)
+            faces["emotion"].append(self.emotions.code(emotions[i] if i < len(emotions) else "Desconhecido"))
+            faces["emotion_probabilities"].append(
+                probabilities[i] if probabilities is not None and i < len(probabilities)
+                else np.full(NUM_EMOTIONS, np.nan, np.float32))
+            faces["activities"].append(self.activities.bitmask(frame_activities[i]["activities"]))
+            assigned = pose_assignment[i] if i < len(pose_assignment) else None
+            faces["pose_index"].append(-1 if assigned is None else assigned)
+
+        activities_list = analysis["activities_list"]
+        for i, landmarks in enumerate(pose_landmarks):
+            poses["frame_number"].append(frame_number)
+            poses["landmarks"].append(landmarks)
+            poses["activities"].append(self.activities.bitmask(activities_list[i] if i < len(activities_list) else []))
+
+        if len(frames["frame_number"]) >= self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        """Grava o chunk pendente e atualiza store.json."""
+        frame_numbers = self._rows["frames"]["frame_number"]
+        if frame_numbers:
+            index = len(self.metadata["chunks"])
+            chunk_name = f"chunk_{index:05d}"
+            rows = {table: len(columns["frame_number"]) for table, columns in self._rows.items()}
+            write_chunk(os.path.join(self.store_path, chunk_name), self._rows)
+            self.metadata["chunks"].append({
+                "name": chunk_name,
+                "first_frame": int(frame_numbers[0]),
+                "last_frame": int(frame_numbers[-1]),
+                **rows,
+            })
+            self._rows = {table: {column: [] for column in columns} for table, columns in TABLES.items()}
+        self._write_metadata()
+
+    def close(self, total_frames=None):
+        """
+        :param total_frames: Total de frames lidos (inclusive os descartados pelo escalonador).
+        """
+        if total_frames is not None:
+            self.metadata["total_frames"] = total_frames
+        self.flush()
+
+    def _write_metadata(self):
+        self.metadata.update(names=self.names.labels, emotions=self.emotions.labels,
+                             activities=self.activities.labels, decisions=self.decisions.labels)
+        write_metadata(self.store_path, self.metadata)
+
+
+def write_chunk(chunk_path, rows):
+    """Grava as colunas de um chunk (listas de linhas ou arrays) como arquivos .npy."""
+    os.makedirs(chunk_path, exist_ok=True)
+    for table, columns in TABLES.items():
+        for column, (dtype, shape) in columns.items():
+            values = rows[table][column]
+            array = np.asarray(values, dtype=dtype).reshape((len(values), *shape))
+            np.save(os.path.join(chunk_path, f"{table}_{column}.npy"), array)
+
+
+def write_metadata(store_path, metadata):
+    temp_path = os.path.join(store_path, METADATA_FILENAME + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=4, ensure_ascii=False)
+    os.replace(temp_path, os.path.join(store_path, METADATA_FILENAME))
+
+
+class ResultStore:
+    """
+    Leitura do armazenamento colunar. As colunas são abertas com mmap (np.load(mmap_mode="r")), então
+    consultas e relatórios percorrem os chunks sem carregar o armazenamento inteiro na memória.
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+        with open(os.path.join(store_path, METADATA_FILENAME), encoding="utf-8") as f:
+            self.metadata = json.load(f)
+        if self.metadata.get("version") != STORE_VERSION:
+            raise ValueError(f"Versão de armazenamento não suportada: {self.metadata.get('version')}")
+        self.names = self.metadata["names"]
+        self.emotions = self.metadata["emotions"]
+        self.activities = self.metadata["activities"]
+        self.decisions = self.metadata["decisions"]
+        self.chunks = self.metadata["chunks"]
+        self._first_frames = [chunk["first_frame"] for chunk in self.chunks]
+        self._loaded = {}
+
+    def __len__(self):
+        """Número de frames analisados no armazenamento."""
+        return sum(chunk["frames"] for chunk in self.chunks)
+
+    @property
+    def total_frames(self):
+        return self.metadata["total_frames"]
+
+    def chunk(self, index):
+        """Colunas de um chunk como arrays mapeados em memória: {"frames": {...}, "faces": {...}, "poses": {...}}."""
+        columns = self._loaded.get(index)
+        if columns is None:
+            chunk_path = os.path.join(self.store_path, self.chunks[index]["name"])
+            columns = {
+                table: {column: np.load(os.path.join(chunk_path, f"{table}_{column}.npy"), mmap_mode="r")
+                        for column in table_columns}
+                for table, table_columns in TABLES.items()
+            }
+            self._loaded[index] = columns
+        return columns
+
+    def iter_chunks(self):
+        for index in range(len(self.chunks)):
+            yield self.chunk(index)
+
+    def frame(self, frame_number):
+        """
+        Resultados de um frame analisado (busca binária no índice de chunks e na coluna frame_number).
+        :return: Dicionário com "decision", "anomaly", "faces" e "pose_landmarks", ou None se o frame não foi analisado.
+        """
+        index = bisect.bisect_right(self._first_frames, frame_number) - 1
+        if index < 0 or frame_number > self.chunks[index]["last_frame"]:
+            return None
+        columns = self.chunk(index)
+        frames = columns["frames"]
+        row = int(np.searchsorted(frames["frame_number"], frame_number))
+        if row >= len(frames["frame_number"]) or frames["frame_number"][row] != frame_number:
+            return None
+
+        faces = columns["faces"]
+        face_rows = range(frames["face_offset"][row], frames["face_offset"][row] + frames["face_count"][row])
+        pose_rows = slice(frames["pose_offset"][row], frames["pose_offset"][row] + frames["pose_count"][row])
+        return {
+            "frame": frame_number,
+            "decision": self.decisions[frames["decision"][row]],
+            "anomaly": bool(frames["anomaly"][row]),
+            "faces": [{
+                "face_id": int(faces["face_id"][i]),
+                "track_id": None if faces["track_id"][i] < 0 else int(faces["track_id"][i]),
+                "name": self.names[faces["name"][i]],
+                "location": tuple(int(v) for v in faces["box"][i]),
+                "encoding": np.array(faces["encoding"][i]),
+                "emotion": self.emotions[faces["emotion"][i]],
+                "emotion_probabilities": np.array(faces["emotion_probabilities"][i]),
+                "activities": self.activity_labels(faces["activities"][i]),
+            } for i in face_rows],
+            "pose_landmarks": np.array(columns["poses"]["landmarks"][pose_rows]),
+        }
+
+    def activity_labels(self, mask):
+        return [label for i, label in enumerate(self.activities) if int(mask) >> i & 1]
+
+    def to_aggregator(self, gallery=None, classify_poses=None, anomaly_activities=()):
+        """
+        Recalcula o relatório a partir dos dados gravados, sem executar os modelos.
+        :param gallery: FaceGallery opcional; se informada, os rostos são reidentificados pelos encodings gravados
+                        (ex.: com outra tolerância). Rostos sem encoding mantêm o nome gravado.
+        :param classify_poses: Função opcional (landmarks (poses, 33, 4), poses por frame, números dos frames) ->
+                               lista de atividades por pose (ex.: PoseSequenceClassifier); se informada, as
+                               atividades e anomalias são recalculadas a partir dos landmarks, em ordem.
+        :param anomaly_activities: Atividades que caracterizam uma anomalia quando classify_poses é usado.
+        :return: ReportAggregator preenchido.
+        """
+        aggregator = ReportAggregator()
+        aggregator.total_frames = self.total_frames
+        activity_labels = list(self.activities)
+
+        for columns in self.iter_chunks():
+            frames = columns["frames"]
+            faces = columns["faces"]
+            poses = columns["poses"]
+
+            names = np.asarray(faces["name"])
+            name_labels = list(self.names)
+            if gallery is not None and len(names):
+                encodings = np.asarray(faces["encoding"])
+                has_encoding = ~np.isnan(encodings).any(axis=1)
+                if has_encoding.any():
+                    names = names.copy()
+                    for row, (name, _) in zip(np.flatnonzero(has_encoding), gallery.match(encodings[has_encoding])):
+                        if name not in name_labels:
+                            name_labels.append(name)
+                        names[row] = name_labels.index(name)
+
+            face_activities = np.asarray(faces["activities"])
+            if classify_poses is None:
+                aggregator.anomaly_count += int(np.count_nonzero(frames["anomaly"]))
+            else:
+                # Atividades por pose recalculadas; cada rosto herda as da pose associada ("Indefinido" se nenhuma)
+                vocabulary = _Vocabulary(activity_labels)
+                pose_activities = classify_poses(np.asarray(poses["landmarks"]), np.asarray(frames["pose_count"]),
+                                                 np.asarray(frames["frame_number"]))
+                pose_masks = np.array([vocabulary.bitmask(acts) for acts in pose_activities], dtype=np.uint64).reshape(-1)
+                anomaly_mask = np.uint64(vocabulary.bitmask([a for a in anomaly_activities if a in vocabulary.labels]))
+                indefinido = np.uint64(vocabulary.bitmask(["Indefinido"]))
+                activity_labels = vocabulary.labels
+
+                pose_frame_start = np.repeat(np.asarray(frames["pose_offset"]), np.asarray(frames["face_count"]))
+                pose_index = np.asarray(faces["pose_index"])
+                assigned = pose_index >= 0
+                face_activities = np.full(len(names), indefinido, dtype=np.uint64)
+                face_activities[assigned] = pose_masks[pose_frame_start[assigned] + pose_index[assigned]]
+
+                pose_frames = np.repeat(np.arange(len(frames["frame_number"])), np.asarray(frames["pose_count"]))
+                aggregator.anomaly_count += len(np.unique(pose_frames[(pose_masks & anomaly_mask) != 0]))
+
+            aggregator.merge(_aggregate_faces(names, name_labels, np.asarray(faces["emotion"]), self.emotions,
+                                              face_activities, activity_labels, np.asarray(faces["track_id"])))
+        return aggregator
+
+
+def _first_occurrence_order(values):
+    """Valores distintos na ordem da primeira ocorrência (preserva a ordem de inserção do relatório)."""
+    unique, first = np.unique(values, return_index=True)
+    return unique[np.argsort(first)]
+
+
+def _aggregate_faces(names, name_labels, emotions, emotion_labels, activities, activity_labels, track_ids):
+    """Conta detecções, emoções, atividades e tracks por pessoa com operações vetorizadas sobre as colunas."""
+    aggregator = ReportAggregator()
+    aggregator.total_face_detections = len(names)
+    for name_code in _first_occurrence_order(names):
+        rows = names == name_code
+        stats = aggregator._person(name_labels[name_code])
+        stats["face_detections"] = int(np.count_nonzero(rows))
+
+        person_emotions = emotions[rows]
+        for emotion_code in _first_occurrence_order(person_emotions):
+            stats["emotions"][emotion_labels[emotion_code]] = int(np.count_nonzero(person_emotions == emotion_code))
+
+        person_activities = activities[rows]
+        for bit, label in enumerate(activity_labels):
+            count = int(np.count_nonzero(person_activities & np.uint64(1 << bit)))
+            if count:
+                stats["activities"][label] = count
+
+        tracks = track_ids[rows]
+        tracks = tracks[tracks >= 0]
+        if len(tracks):
+            aggregator.person_tracks[name_labels[name_code]] = set(int(t) for t in np.unique(tracks))
+    return aggregator
+
+
+def merge_result_stores(store_paths, output_path, track_offsets=None):
+    """
+    Junta armazenamentos gravados por segmentos (em ordem) num único armazenamento, recodificando os
+    vocabulários e deslocando face_ids (e track_ids) para que sejam únicos no vídeo inteiro.
+    :param track_offsets: Deslocamento de track_id de cada armazenamento.
+    """
+    writer = ResultStoreWriter(output_path)
+    face_offset = 0
+    total_frames = 0
+    for i, store_path in enumerate(store_paths):
+        if not os.path.exists(os.path.join(store_path, METADATA_FILENAME)):
+            continue
+        store = ResultStore(store_path)
+        if writer.metadata["fps"] is None:
+            writer.metadata.update(video_path=store.metadata["video_path"], fps=store.metadata["fps"])
+        total_frames += store.total_frames
+        track_offset = track_offsets[i] if track_offsets else 0
+
+        names = np.array([writer.names.code(label) for label in store.names], dtype=np.int32)
+        emotions = np.array([writer.emotions.code(label) for label in store.emotions], dtype=np.int16)
+        decisions = np.array([writer.decisions.code(label) for label in store.decisions], dtype=np.int8)
+        activity_bits = [np.uint64(1 << writer.activities.code(label)) for label in store.activities]
+
+        for index, columns in enumerate(store.iter_chunks()):
+            rows = {table: {column: np.array(values) for column, values in table_columns.items()}
+                    for table, table_columns in columns.items()}
+            rows["frames"]["decision"] = decisions[rows["frames"]["decision"]]
+            rows["faces"]["name"] = names[rows["faces"]["name"]]
+            rows["faces"]["emotion"] = emotions[rows["faces"]["emotion"]]
+            rows["faces"]["face_id"] += face_offset
+            rows["faces"]["track_id"] = np.where(rows["faces"]["track_id"] >= 0,
+                                                 rows["faces"]["track_id"] + track_offset, -1)
+            for table in ("faces", "poses"):
+                masks = rows[table]["activities"]
+                recoded = np.zeros_like(masks)
+                for bit, new_bit in enumerate(activity_bits):
+                    recoded[(masks & np.uint64(1 << bit)) != 0] |= new_bit
+                rows[table]["activities"] = recoded
+
+            chunk = store.chunks[index]
+            chunk_name = f"chunk_{len(writer.metadata['chunks']):05d}"
+            write_chunk(os.path.join(output_path, chunk_name), rows)
+            writer.metadata["chunks"].append({**chunk, "name": chunk_name})
+        face_offset += sum(chunk["faces"] for chunk in store.chunks)
+    writer.close(total_frames)
+
+
+if __name__ == "__main__":
+    print("Este é o módulo result_store_module. Execute 'main.py' para iniciar a aplicação.")
@@ -0,0 +1,262 @@
+import multiprocessing
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+from video_processing import VideoProcessor
+from report_module import ReportAggregator
+from render_module import MODE_ANALYSIS, MODE_ANNOTATE, MODE_PREVIEW
+from result_store_module import merge_result_stores
+
+# Estado de cada processo worker (carregado uma única vez pelo initializer do pool)
+_worker_state = {}
+
+
+def find_keyframes(video_path, fps):
+    """
+    Lista os índices dos keyframes do vídeo usando o ffmpeg distribuído pelo imageio-ffmpeg.
+    :return: Lista ordenada de índices de frame; vazia se o ffmpeg não estiver disponível.
+    """
+    try:
+        import imageio_ffmpeg
+        ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception as e:
+        print(f"Aviso: ffmpeg indisponível, segmentos não serão alinhados a keyframes: {e}")
+        return []
+
+    command = [ffmpeg, "-hide_banner", "-skip_frame", "nokey", "-i", video_path,
+               "-vf", "showinfo", "-f", "null", "-"]
+    try:
+        completed = subprocess.run(command, capture_output=True, text=True, check=False)
+    except OSError as e:
+        print(f"Aviso: falha ao listar keyframes: {e}")
+        return []
+
+    keyframes = set()
+    for match in re.finditer(r"pts_time:\s*([0-9.]+)", completed.stderr):
+        keyframes.add(int(round(float(match.group(1)) * fps)))
+    return sorted(keyframes)
+
+
+def plan_segments(total_frames, num_segments, keyframes=None):
+    """
+    Divide o vídeo em segmentos contíguos de tamanho aproximadamente igual.
+    Quando há keyframes, cada fronteira é movida para o keyframe mais próximo.
+    :return: Lista de tuplas (start_frame, end_frame) com end_frame exclusivo (None no último segmento).
+    """
+    num_segments = max(1, min(num_segments, total_frames or 1))
+    boundaries = [0]
+    for i in range(1, num_segments):
+        target = round(total_frames * i / num_segments)
+        if keyframes:
+            target = min(keyframes, key=lambda k: abs(k - target))
+        if boundaries[-1] < target < total_frames:
+            boundaries.append(target)
+    ends = boundaries[1:] + [None]
+    return list(zip(boundaries, ends))
+
+
+def concatenate_videos(chunk_paths, output_path):
+    """Concatena os trechos de vídeo (mesmo codec) sem recodificar; recorre ao OpenCV se o ffmpeg falhar."""
+    chunk_paths = [path for path in chunk_paths if os.path.exists(path)]
+    if not chunk_paths:
+        return
+
+    try:
+        import imageio_ffmpeg
+        ffmpeg = imageio_ffmpeg.get_ffmpeg_exe()
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as list_file:
+            for path in chunk_paths:
+                list_file.write(f"file '{os.path.abspath(path)}'\n")
+        try:
+            subprocess.run([ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-f", "concat", "-safe", "0",
+                            "-i", list_file.name, "-c", "copy", output_path], check=True)
+            return
+        finally:
+            os.remove(list_file.name)
+    except Exception as e:
+        print(f"Aviso: concatenação via ffmpeg falhou, usando OpenCV: {e}")
+
+    out = None
+    for path in chunk_paths:
+        cap = cv2.VideoCapture(path)
+        if out is None:
+            size = (int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)))
+            out = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*'mp4v'), cap.get(cv2.CAP_PROP_FPS), size)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            out.write(frame)
+        cap.release()
+    out.release()
+
+
+def concatenate_results(results_paths, output_path):
+    """Junta os arquivos de resultados por frame (JSON Lines) dos segmentos, em ordem."""
+    with open(output_path, "w", encoding="utf-8") as out:
+        for path in results_paths:
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    shutil.copyfileobj(f, out)
+
+
+def merge_segment_aggregators(segment_results):
+    """Soma os agregadores de relatório dos segmentos, deslocando os track_ids de cada um."""
+    aggregator = ReportAggregator()
+    track_offset = 0
+    for result in sorted(segment_results, key=lambda r: r["index"]):
+        aggregator.merge(result["aggregator"], track_offset)
+        track_offset += result.get("track_count", 0)
+    return aggregator
+
+
+def merge_segment_results(segment_results):
+    """
+    Junta os resultados parciais dos segmentos (em ordem) no formato retornado por VideoProcessor.process_video,
+    deslocando os face_ids (e track_ids) para que sejam únicos no vídeo inteiro.
+    :return: Tuple (total_frames, anomaly_count, face_data, emotion_data, activity_data).
+    """
+    total_frames = 0
+    anomaly_count = 0
+    face_data = []
+    emotion_data = []
+    activity_data = []
+
+    track_offset = 0
+    for result in sorted(segment_results, key=lambda r: r["index"]):
+        offset = len(face_data)
+        total_frames += result["total_frames"]
+        anomaly_count += result["anomaly_count"]
+        for face in result["face_data"]:
+            face["face_id"] += offset
+            if face.get("track_id") is not None:
+                face["track_id"] += track_offset
+            face_data.append(face)
+        track_offset += result.get("track_count", 0)
+        for ed in result["emotion_data"]:
+            emotion_data.append({**ed, "face_id": ed["face_id"] + offset})
+        for ad in result["activity_data"]:
+            activity_data.append({**ad, "face_id": ad["face_id"] + offset})
+
+    return total_frames, anomaly_count, face_data, emotion_data, activity_data
+
+
+def _init_worker(known_face_encodings, known_face_names, processor_kwargs):
+    _worker_state["known_face_encodings"] = known_face_encodings
+    _worker_state["known_face_names"] = known_face_names
+    _worker_state["processor_kwargs"] = processor_kwargs
+
+
+def _process_segment(index, video_path, chunk_path, results_path, store_path, start_frame, end_frame):
+    """Processa um segmento num processo worker (cada processo tem seu próprio Pose e modelo do DeepFace)."""
+    kwargs = dict(_worker_state["processor_kwargs"])
+    # Os workers nunca abrem janela: no modo preview, cada segmento apenas grava o seu trecho anotado
+    if kwargs.get("mode", MODE_PREVIEW) == MODE_PREVIEW:
+        kwargs["mode"] = MODE_ANNOTATE
+    kwargs["results_path"] = results_path
+    kwargs["store_path"] = store_path
+    processor = VideoProcessor(
+        video_path, chunk_path,
+        _worker_state["known_face_encodings"], _worker_state["known_face_names"],
+        start_frame=start_frame, end_frame=end_frame, **kwargs
+    )
+    total_frames, anomaly_count, face_data, emotion_data, activity_data = processor.process_video()
+    return {
+        "index": index,
+        "total_frames": total_frames,
+        "anomaly_count": anomaly_count,
+        "face_data": face_data,
+        "emotion_data": emotion_data,
+        "activity_data": activity_data,
+        "chunk_path": chunk_path,
+        "results_path": results_path,
+        "store_path": store_path,
+        "aggregator": processor.aggregator,
+        "track_count": processor.tracker.next_track_id if processor.tracker is not None else 0,
+    }
+
+
+class SegmentedVideoProcessor:
+    """
+    Processa um vídeo dividido em segmentos alinhados a keyframes, cada um em um processo separado,
+    e junta os resultados no mesmo formato de VideoProcessor.process_video.
+    """
+
+    def __init__(self, video_path, output_path, known_face_encodings, known_face_names, num_processes=None,
+                 align_to_keyframes=True, **processor_kwargs):
+        """
+        :param num_processes: Número de processos (padrão: número de CPUs).
+        :param align_to_keyframes: Se True, as fronteiras dos segmentos são movidas para keyframes.
+        :param processor_kwargs: Parâmetros repassados a cada VideoProcessor (frame_skip, resize_factor, ...).
+        """
+        self.video_path = video_path
+        self.output_path = output_path
+        self.known_face_encodings = known_face_encodings
+        self.known_face_names = known_face_names
+        self.num_processes = num_processes or os.cpu_count() or 1
+        self.align_to_keyframes = align_to_keyframes
+        self.results_path = processor_kwargs.pop("results_path", None)
+        self.store_path = processor_kwargs.pop("store_path", None)
+        # Cada worker só conhece os contadores do seu segmento: um snapshot parcial gravado por ele mostraria um
+        # segmento como se fosse o vídeo inteiro (e os workers sobrescreveriam o mesmo arquivo)
+        if processor_kwargs.pop("checkpoint_path", None):
+            print("Aviso: snapshots parciais do relatório (--checkpoint-interval) não são gravados no modo por "
+                  "segmentos.")
+        processor_kwargs.pop("checkpoint_interval", None)
+        self.processor_kwargs = processor_kwargs
+        self.aggregator = ReportAggregator()
+
+    def process_video(self):
+        cap = cv2.VideoCapture(self.video_path)
+        if not cap.isOpened():
+            raise ValueError(f"Erro ao abrir o vídeo: {self.video_path}")
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+
+        keyframes = find_keyframes(self.video_path, fps) if self.align_to_keyframes else []
+        segments = plan_segments(total_frames, self.num_processes, keyframes)
+        print(f"Processando {len(segments)} segmentos em {self.num_processes} processos...")
+
+        chunk_dir = tempfile.mkdtemp(prefix="segments_")
+        try:
+            # "spawn" evita herdar estado do TensorFlow/MediaPipe do processo principal
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(
+                max_workers=min(self.num_processes, len(segments)),
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.known_face_encodings, self.known_face_names, self.processor_kwargs),
+            ) as executor:
+                futures = [
+                    executor.submit(_process_segment, index, self.video_path,
+                                    os.path.join(chunk_dir, f"segment_{index:04d}.mp4"),
+                                    os.path.join(chunk_dir, f"segment_{index:04d}.jsonl") if self.results_path else None,
+                                    os.path.join(chunk_dir, f"segment_{index:04d}.store") if self.store_path else None,
+                                    start, end)
+                    for index, (start, end) in enumerate(segments)
+                ]
+                segment_results = [future.result() for future in futures]
+
+            if self.processor_kwargs.get("mode") != MODE_ANALYSIS:
+                concatenate_videos([r["chunk_path"] for r in segment_results], self.output_path)
+                print("Vídeo processado e salvo em:", self.output_path)
+            if self.results_path:
+                concatenate_results([r["results_path"] for r in segment_results], self.results_path)
+            if self.store_path:
+                track_offsets = [sum(r["track_count"] for r in segment_results[:i]) for i in range(len(segment_results))]
+                merge_result_stores([r["store_path"] for r in segment_results], self.store_path, track_offsets)
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+
+        self.aggregator = merge_segment_aggregators(segment_results)
+        return merge_segment_results(segment_results)
+
+
+if __name__ == "__main__":
+    print("Este é o módulo segment_processing. Execute 'main.py' para iniciar a aplicação.")
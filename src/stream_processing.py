@@ -0,0 +1,254 @@
+import copy
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+from video_processing import VideoProcessor
+from report_module import ReportAggregator, write_report
+from render_module import MODE_ANALYSIS
+
+
+def open_capture(source):
+    """Abre uma fonte de vídeo: índice de câmera USB ("0", "1", ...), URL RTSP/HTTP ou arquivo."""
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    return cv2.VideoCapture(source)
+
+
+class FrameSource:
+    """
+    Captura frames de uma fonte numa thread própria, guardando apenas os mais recentes num buffer com
+    descarte do mais antigo: um modelo lento nunca provoca atraso acumulado em relação à fonte ao vivo.
+    Cada frame é guardado com o instante da captura (relógio de parede), já que os descartes tornam o número
+    do frame inútil para medir o tempo.
+    """
+
+    def __init__(self, source, name=None, buffer_size=1, realtime=False, loop=False, reconnect_delay=2.0,
+                 max_reconnects=5, frame_ready=None):
+        """
+        :param source: Índice de câmera, URL RTSP ou caminho de arquivo.
+        :param buffer_size: Quantidade máxima de frames aguardando processamento.
+        :param realtime: Se True, lê arquivos no ritmo do FPS (simula uma câmera ao vivo).
+        :param loop: Se True, reinicia arquivos ao chegar ao fim (útil com realtime).
+        :param reconnect_delay: Espera (segundos) antes de reabrir uma fonte ao vivo que falhou.
+        :param max_reconnects: Número máximo de tentativas consecutivas de reconexão.
+        :param frame_ready: threading.Event sinalizado a cada frame capturado.
+        """
+        self.source = source
+        self.name = name or os.path.splitext(os.path.basename(str(source)))[0] or str(source)
+        self.buffer = deque(maxlen=max(1, buffer_size))
+        self.realtime = realtime
+        self.loop = loop
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnects = max_reconnects
+        self.frame_ready = frame_ready or threading.Event()
+        self.fps = None
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.finished = False
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_file(self):
+        return isinstance(self.source, str) and os.path.isfile(self.source)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._capture_loop, name=f"capture-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def read(self):
+        """Retorna o frame mais antigo ainda no buffer como (frame, instante da captura), ou None se estiver vazio."""
+        with self._lock:
+            return self.buffer.popleft() if self.buffer else None
+
+    def has_frame(self):
+        with self._lock:
+            return bool(self.buffer)
+
+    def _push(self, frame):
+        captured_at = time.time()
+        with self._lock:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.frames_dropped += 1
+            self.buffer.append((frame, captured_at))
+            self.frames_captured += 1
+        self.frame_ready.set()
+
+    def _capture_loop(self):
+        reconnects = 0
+        cap = open_capture(self.source)
+        try:
+            while not self._stop_event.is_set():
+                if not cap.isOpened():
+                    if self.is_file or reconnects >= self.max_reconnects:
+                        print(f"Erro ao abrir a fonte: {self.source}")
+                        break
+                    reconnects += 1
+                    self._stop_event.wait(self.reconnect_delay)
+                    cap = open_capture(self.source)
+                    continue
+
+                self.fps = cap.get(cv2.CAP_PROP_FPS) or self.fps or 30.0
+                frame_interval = 1.0 / self.fps
+                next_frame_time = time.perf_counter()
+
+                while not self._stop_event.is_set():
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    reconnects = 0
+                    self._push(frame)
+                    if self.realtime:
+                        # Simula uma câmera: entrega os frames do arquivo no ritmo do FPS original
+                        next_frame_time += frame_interval
+                        delay = next_frame_time - time.perf_counter()
+                        if delay > 0:
+                            self._stop_event.wait(delay)
+
+                if self.is_file and not self.loop:
+                    break
+                cap.release()
+                cap = open_capture(self.source)
+        finally:
+            cap.release()
+            self.finished = True
+            self.frame_ready.set()
+
+
+class MultiSourceRunner:
+    """
+    Processa várias fontes ao mesmo tempo. Cada fonte tem sua thread de captura e seu próprio VideoProcessor
+    (rastreamento, escalonamento e agregação independentes); a inferência é feita por um pool compartilhado
+    de workers, com no máximo um frame por fonte em processamento. Os relatórios de cada fonte são gravados
+    em janelas de window_seconds, delimitadas pelo instante de captura dos frames.
+    """
+
+    def __init__(self, sources, known_face_encodings, known_face_names, num_workers=4, window_seconds=60.0,
+                 report_dir="reports/streams", buffer_size=1, realtime=False, loop=False, duration=None,
+                 **processor_kwargs):
+        """
+        :param sources: Lista de fontes (índices de câmera, URLs RTSP ou arquivos).
+        :param num_workers: Tamanho do pool de inferência compartilhado.
+        :param window_seconds: Duração de cada janela de relatório por fonte.
+        :param report_dir: Pasta onde os relatórios de cada fonte são gravados.
+        :param realtime: Reproduz arquivos no ritmo do FPS (harness de teste que simula câmeras).
+        :param duration: Tempo máximo de execução em segundos (None: até todas as fontes terminarem).
+        :param processor_kwargs: Parâmetros repassados a cada VideoProcessor.
+        """
+        self.frame_ready = threading.Event()
+        self.sources = []
+        for source in sources:
+            frame_source = FrameSource(source, buffer_size=buffer_size, realtime=realtime, loop=loop,
+                                       frame_ready=self.frame_ready)
+            # Garante nomes únicos (usados nas pastas de relatório)
+            if any(existing.name == frame_source.name for existing in self.sources):
+                frame_source.name = f"{frame_source.name}_{len(self.sources)}"
+            self.sources.append(frame_source)
+        self.known_face_encodings = known_face_encodings
+        self.known_face_names = known_face_names
+        self.num_workers = max(1, num_workers)
+        self.window_seconds = window_seconds
+        self.report_dir = report_dir
+        self.duration = duration
+        self.processor_kwargs = processor_kwargs
+        self._stop_event = threading.Event()
+
+    def _create_processor(self, source):
+        kwargs = copy.deepcopy(self.processor_kwargs)
+        kwargs.update(mode=MODE_ANALYSIS, results_path=None, keep_records=False)
+        processor = VideoProcessor(source.source, None, self.known_face_encodings, self.known_face_names, **kwargs)
+        processor.start_stream(source.fps)
+        return processor
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        """Executa até todas as fontes terminarem, duration expirar ou stop() ser chamado."""
+        for source in self.sources:
+            source.start()
+
+        states = [{"source": source, "processor": None, "busy": False, "stream_start": None, "window_start": None,
+                   "last_capture": None, "dropped_at_window_start": 0} for source in self.sources]
+        start_time = time.perf_counter()
+        executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="inference")
+        try:
+            while not self._stop_event.is_set():
+                if self.duration is not None and time.perf_counter() - start_time >= self.duration:
+                    break
+                self.frame_ready.clear()
+                active = False
+                for state in states:
+                    source = state["source"]
+                    if state["busy"]:
+                        active = True
+                        continue
+                    captured = source.read()
+                    if captured is None:
+                        active = active or not source.finished
+                        continue
+                    active = True
+                    state["busy"] = True
+                    future = executor.submit(self._process, state, *captured)
+                    future.add_done_callback(self._on_done(state))
+                if not active:
+                    break
+                self.frame_ready.wait(timeout=0.05)
+        finally:
+            for source in self.sources:
+                source.stop()
+            executor.shutdown(wait=True)
+            for state in states:
+                if state["processor"] is not None:
+                    self._write_window(state, state["last_capture"])
+                    # Fecha os detectores (MediaPipe, YuNet) e as métricas de cada fonte
+                    state["processor"]._release()
+
+    def _on_done(self, state):
+        def callback(future):
+            state["busy"] = False
+            if future.exception() is not None:
+                print(f"Erro ao processar a fonte {state['source'].name}: {future.exception()}")
+            self.frame_ready.set()
+        return callback
+
+    def _process(self, state, frame, captured_at):
+        if state["processor"] is None:
+            state["processor"] = self._create_processor(state["source"])
+            state["stream_start"] = state["window_start"] = captured_at
+        elif captured_at - state["window_start"] >= self.window_seconds:
+            # O frame capturado depois do fim da janela já pertence à próxima
+            self._write_window(state, captured_at)
+        state["last_capture"] = captured_at
+        state["processor"].process_frame(frame, captured_at - state["stream_start"])
+
+    def _write_window(self, state, window_end):
+        """Grava o relatório da janela atual da fonte, encerrada no instante de captura window_end, e inicia outra."""
+        processor = state["processor"]
+        source = state["source"]
+        report = processor.aggregator.snapshot()
+        report["source"] = str(source.source)
+        report["window_start"] = state["window_start"]
+        report["window_end"] = window_end
+        report["frames_dropped"] = source.frames_dropped - state["dropped_at_window_start"]
+        state["dropped_at_window_start"] = source.frames_dropped
+
+        timestamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(state["window_start"]))
+        write_report(report, os.path.join(self.report_dir, source.name, f"report_{timestamp}.json"), plot=False)
+        processor.aggregator = ReportAggregator()
+        state["window_start"] = window_end
+
+
+if __name__ == "__main__":
+    print("Este é o módulo stream_processing. Execute 'main.py' para iniciar a aplicação.")
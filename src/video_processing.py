@@ -1,119 +1,713 @@
+import json
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
-from face_recognition_module import recognize_faces
+from face_recognition_module import recognize_faces, detect_faces, identify_faces
+from face_detection_module import create_face_detector
 from emotion_analysis_module import analyze_emotions
-from activity_detection_module import detect_activities, draw_landmarks
+from activity_detection_module import detect_activities, associate_faces_to_poses, MultiPoseDetector, \
+    SinglePoseDetector
+from activity_rules_module import PoseHistory
+from face_tracking_module import FaceTracker
+from face_gallery_module import FaceGallery
+from frame_scheduler_module import FixedFrameScheduler, RUN_FULL, RUN_POSE_ONLY, SKIP
+from report_module import ReportAggregator, write_json_atomic
+from render_module import MODE_ANALYSIS, MODE_PREVIEW, FrameRenderer, FrameResultWriter, build_frame_record
+from result_store_module import ResultStoreWriter
+from frame_context_module import FrameContext, FramePool
+from profiling_module import StageMetrics, MetricsWriter, MetricsServer, ProfileWindow, timed
+
+
+class OrderedTurns:
+    """Faz um estágio com estado (pose, rastreamento) ser executado na ordem dos frames entre vários workers."""
+
+    def __init__(self, stop_event):
+        self._condition = threading.Condition()
+        self._next = 0
+        self._stop_event = stop_event
+
+    @contextmanager
+    def turn(self, sequence):
+        with self._condition:
+            while self._next != sequence and not self._stop_event.is_set():
+                self._condition.wait(timeout=0.1)
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._next = sequence + 1
+                self._condition.notify_all()
+
+
+def load_resume_state(resume_path):
+    """
+    Lê o estado retomável gravado por VideoProcessor.write_resume_state.
+    :return: Dicionário com next_frame, track_count, completed e aggregator; None se não houver estado válido.
+    """
+    if not resume_path or not os.path.exists(resume_path):
+        return None
+    try:
+        with open(resume_path, encoding="utf-8") as f:
+            state = json.load(f)
+        ReportAggregator.from_state(state["aggregator"])
+        int(state["next_frame"])
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Aviso: estado inválido em {resume_path}, o vídeo será processado desde o início: {e}")
+        return None
+    return state
 
 
 class VideoProcessor:
-    def __init__(self, video_path, output_path, known_face_encodings, known_face_names, frame_skip=2, resize_factor=1.0):
+    def __init__(self, video_path, output_path, known_face_encodings, known_face_names, frame_skip=2, resize_factor=1.0,
+                 pipelined=False, num_workers=2, queue_size=8, max_in_flight=16,
+                 start_frame=0, end_frame=None, mode=MODE_PREVIEW, results_path=None, use_tracking=False, tracker_options=None,
+                 scheduler=None, analysis_scale=1.0, keep_records=True, checkpoint_path=None, checkpoint_interval=0,
+                 store_path=None, store_chunk_frames=1000, multi_pose=False, pose_model_path=None, max_poses=4,
+                 metrics_path=None, metrics_interval=100, metrics_port=None, profile_path=None, profile_start=1,
+                 profile_frames=100, face_detector="hog", face_detector_options=None, resume_path=None):
+        """
+        :param pipelined: Se True, usa o modo em pipeline (decodificação, inferência e codificação em threads).
+        :param num_workers: Número de workers de inferência no modo em pipeline.
+        :param queue_size: Profundidade máxima das filas entre os estágios do pipeline.
+        :param max_in_flight: Número máximo de frames em trânsito (backpressure sobre o decodificador).
+        :param start_frame: Índice (base 0) do primeiro frame a processar.
+        :param end_frame: Índice (exclusivo) do último frame a processar; None lê até o fim do vídeo.
+        :param mode: MODE_ANALYSIS (apenas análise/relatório, sem vídeo de saída), MODE_ANNOTATE (grava o vídeo
+                     anotado, sem janela) ou MODE_PREVIEW (grava e exibe a janela).
+        :param results_path: Arquivo JSON Lines onde os resultados por frame são gravados (opcional), para
+                             renderizar o vídeo depois com render_module.render_from_results.
+        :param use_tracking: Se True, rastreia os rostos e só reidentifica/reanalisa tracks novos ou desatualizados.
+        :param tracker_options: Parâmetros repassados ao FaceTracker.
+        :param scheduler: Escalonador que decide, por frame, quais estágios executar
+                          (padrão: FixedFrameScheduler com frame_skip).
+        :param analysis_scale: Fator de redução do frame usado na detecção de rostos e na pose; as caixas são
+                               convertidas para a resolução de saída, e encodings/emoções usam o frame original.
+        :param keep_records: Se False, não guarda as listas face_data/emotion_data/activity_data (memória
+                             constante); o relatório fica disponível apenas em self.aggregator.
+        :param checkpoint_path: Caminho onde snapshots parciais do relatório (JSON) são gravados.
+        :param checkpoint_interval: Grava um snapshot a cada N frames lidos (0 desativa).
+        :param store_path: Pasta do armazenamento colunar por frame (caixas, encodings, probabilidades de emoção e
+                           landmarks), usado para refazer relatórios sem executar os modelos (opcional).
+        :param store_chunk_frames: Frames analisados por chunk do armazenamento.
+        :param multi_pose: Se True, detecta a pose de várias pessoas por frame (MultiPoseDetector).
+        :param pose_model_path: Modelo .task do PoseLandmarker (uma passada para todas as pessoas); sem ele, a
+                                pose de cada pessoa é feita num recorte do corpo derivado da caixa do rosto.
+        :param max_poses: Número máximo de pessoas com pose por frame no modo multi_pose.
+        :param metrics_path: Arquivo (.jsonl ou .csv) onde as latências por estágio são gravadas periodicamente.
+        :param metrics_interval: Grava as métricas a cada N frames.
+        :param metrics_port: Porta de um endpoint HTTP /metrics (formato de texto do Prometheus), opcional.
+        :param profile_path: Arquivo .prof com o perfil (cProfile) de uma janela de frames, opcional.
+        :param profile_start: Primeiro frame (base 1, relativo ao segmento) da janela de perfilamento.
+        :param profile_frames: Número de frames da janela de perfilamento.
+        :param face_detector: Backend de detecção de rostos ("hog", "mediapipe", "yunet" ou "cascade").
+        :param face_detector_options: Parâmetros repassados ao backend (ex.: {"model_path": ...} no YuNet).
+        :param resume_path: Arquivo de estado retomável (próximo frame e agregados parciais), gravado a cada
+                            checkpoint_interval frames; se já existir, o processamento continua do frame salvo.
+        """
         self.video_path = video_path
         self.output_path = output_path
         self.known_face_encodings = known_face_encodings
         self.known_face_names = known_face_names
+        self.gallery = FaceGallery(known_face_encodings, known_face_names)
         self.frame_skip = frame_skip
         self.resize_factor = resize_factor
+        self.pipelined = pipelined
+        self.num_workers = max(1, num_workers)
+        self.queue_size = max(1, queue_size)
+        self.max_in_flight = max(self.num_workers, max_in_flight)
+        self.start_frame = start_frame
+        self.first_frame = start_frame
+        self.end_frame = end_frame
+        self.mode = mode
+        self.results_path = results_path
+        self.renderer = None
+        self.results_writer = None
+        self.use_tracking = use_tracking
+        self.tracker_options = tracker_options or {}
+        self.tracker = None
+        self.scheduler = scheduler or FixedFrameScheduler(frame_skip)
+        self.analysis_scale = analysis_scale
+        self.keep_records = keep_records
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self.store_path = store_path
+        self.store_chunk_frames = store_chunk_frames
+        self.result_store = None
+        self.multi_pose = multi_pose
+        self.pose_model_path = pose_model_path
+        self.max_poses = max_poses
+        self.pose_detector = None
+        self.face_detector_backend = face_detector
+        self.face_detector_options = face_detector_options or {}
+        self.face_detector = None
+        self.frame_pool = None
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.metrics_port = metrics_port
+        self.profile_path = profile_path
+        self.profile_start = profile_start
+        self.profile_frames = profile_frames
+        self.metrics = StageMetrics()
+        self.metrics_writer = None
+        self.metrics_server = None
+        self.profile_window = None
+        self.resume_path = resume_path
+        self._resume_state = None
+        self.aggregator = ReportAggregator()
 
     def process_video(self):
+        self._load_resume_state()
+        if self.pipelined:
+            return self._process_video_pipelined()
+
+        cap, frame_size = self._open_video()
+        self._reset_results()
+
+        try:
+            while self.renderer is None or not self.renderer.stopped:
+                self._profile_frame(self.total_frames + 1)
+                frame = self._read_frame(cap, self.total_frames)
+                if frame is None:
+                    break
+                self.process_frame(FrameContext(self._resize_frame(frame, frame_size), self.frame_pool, owned=True))
+        finally:
+            self._release(cap)
+        return self.total_frames, self.anomaly_count, self.face_data, self.emotion_data, self.activity_data
+
+    def start_stream(self, fps=None):
+        """Prepara o processador para receber frames avulsos via process_frame (ex.: fontes ao vivo)."""
+        self.fps = fps
+        self.metrics = StageMetrics()
+        self.frame_pool = FramePool()
+        self._reset_results()
+
+    def process_frame(self, frame, timestamp=None):
+        """
+        Processa o próximo frame da sequência: escalona, executa os modelos, agrega os resultados e, fora do
+        modo de análise, envia o frame ao renderizador.
+        :param frame: Frame BGR ou FrameContext (as versões derivadas são liberadas ao fim do frame).
+        :param timestamp: Instante de captura do frame (segundos). Fontes ao vivo descartam frames, então o
+                          instante calculado pelo número do frame e o FPS não serve para as regras temporais.
+        :return: Análise correspondente ao frame ou None se o frame foi descartado sem anotações.
+        """
+        context = frame if isinstance(frame, FrameContext) else FrameContext(frame, self.frame_pool)
+        self.total_frames += 1
+
+        # O escalonador decide se o frame é analisado por completo, só pela pose ou descartado
+        decision = self._schedule(self.total_frames, context.frame)
+        analysis = None
+        if decision != SKIP:
+            analysis = self._analyze_frame(context, decision, self.total_frames, timestamp=timestamp)
+        return self._complete_frame(context, analysis)
+
+    def _load_resume_state(self):
+        """Se houver estado salvo em resume_path, continua do primeiro frame ainda não agregado."""
+        self.start_frame = self.first_frame
+        self._resume_state = load_resume_state(self.resume_path)
+        if self._resume_state is not None:
+            self.start_frame = int(self._resume_state["next_frame"])
+            print(f"Retomando {self.video_path} a partir do frame {self.start_frame}.")
+
+    def write_resume_state(self, completed=False):
+        """Grava de forma atômica o próximo frame a processar, os agregados parciais e o número de tracks."""
+        write_json_atomic({
+            "video_path": self.video_path,
+            "next_frame": self.start_frame + self.total_frames,
+            "track_count": self.tracker.next_track_id if self.tracker is not None else 0,
+            "completed": completed,
+            "aggregator": self.aggregator.to_state(),
+        }, self.resume_path)
+
+    def _open_video(self):
         cap = cv2.VideoCapture(self.video_path)
         if not cap.isOpened():
             raise ValueError(f"Erro ao abrir o vídeo: {self.video_path}")
+        if self.start_frame:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
 
         frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) * self.resize_factor)
         frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) * self.resize_factor)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        out = cv2.VideoWriter(self.output_path, fourcc, fps, (frame_width, frame_height))
-
-        total_frames = 0
-        anomaly_count = 0
-        face_data = []      # Lista de detecções faciais: {"face_id", "name", "location"}
-        emotion_data = []   # Lista: {"face_id", "label"}
-        activity_data = []  # Lista: {"face_id", "activities": [lista de atividades]}
-        face_id_counter = 0
-
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            total_frames += 1
-            if self.resize_factor != 1.0:
-                frame = cv2.resize(frame, (frame_width, frame_height))
-
-            # Processa somente 1 a cada frame_skip
-            if total_frames % self.frame_skip != 0:
-                out.write(frame)
-                cv2.imshow('Processed Video', frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
-                continue
+        self.fps = cap.get(cv2.CAP_PROP_FPS)
+        self._start_metrics()
+
+        # Os frames são lidos, redimensionados e convertidos em buffers reaproveitados entre os frames
+        self.frame_pool = FramePool()
+        self._source_shape = (int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)), int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), 3)
+
+        # Desenho, codificação e janela ficam numa thread própria; no modo de análise nada disso é criado
+        self.renderer = None
+        if self.mode != MODE_ANALYSIS:
+            self.renderer = FrameRenderer(self.output_path, self.fps, (frame_width, frame_height),
+                                          preview=self.mode == MODE_PREVIEW, metrics=self.metrics).start()
+        self.results_writer = FrameResultWriter(self.results_path) if self.results_path else None
+        self.result_store = None
+        if self.store_path:
+            self.result_store = ResultStoreWriter(self.store_path, self.store_chunk_frames, self.video_path, self.fps)
+        return cap, (frame_width, frame_height)
+
+    def _release(self, cap=None):
+        """Fecha a captura (se houver), os destinos dos resultados, os detectores e o renderizador."""
+        if cap is not None:
+            cap.release()
+        if self.results_writer is not None:
+            self.results_writer.close()
+        if self.result_store is not None:
+            self.result_store.close(self.total_frames)
+        if self.pose_detector is not None:
+            self.pose_detector.close()
+            self.pose_detector = None
+        if self.face_detector is not None:
+            self.face_detector.close()
+            self.face_detector = None
+        if self.renderer is not None:
+            self.renderer.close()
+            print("Vídeo processado e salvo em:", self.output_path)
+        self._stop_metrics()
+
+    def _start_metrics(self):
+        """Reinicia as métricas e abre os destinos configurados (arquivo, endpoint e janela de perfilamento)."""
+        self.metrics = StageMetrics()
+        self.metrics_writer = MetricsWriter(self.metrics_path, self.metrics_interval) if self.metrics_path else None
+        self.metrics_server = None
+        if self.metrics_port is not None:
+            self.metrics_server = MetricsServer(self.metrics, self.metrics_port).start()
+        self.profile_window = None
+        if self.profile_path:
+            self.profile_window = ProfileWindow(self.profile_path, self.profile_start, self.profile_frames)
+
+    def _stop_metrics(self):
+        if self.profile_window is not None:
+            self.profile_window.dump()
+        if self.metrics_writer is not None:
+            self.metrics_writer.close(self.metrics)
+            print("Métricas salvas em:", self.metrics_path)
+        if self.metrics_server is not None:
+            self.metrics_server.close()
+        self.metrics.print_summary()
+
+    def _profile_frame(self, frame_number):
+        """Liga/desliga o perfilador da thread atual conforme o frame esteja na janela de perfilamento."""
+        if self.profile_window is not None:
+            self.profile_window.update(frame_number)
+
+    def _reset_results(self):
+        self.total_frames = 0
+        self.anomaly_count = 0
+        self.face_data = []      # Lista de detecções faciais: {"face_id", "name", "location"}
+        self.emotion_data = []   # Lista: {"face_id", "label"}
+        self.activity_data = []  # Lista: {"face_id", "activities": [lista de atividades]}
+        self.face_id_counter = 0
+        self.aggregator = ReportAggregator()
+        self.tracker = FaceTracker(**self.tracker_options) if self.use_tracking else None
+        self.scheduler.reset(getattr(self, "fps", None))
+        self.pose_history = PoseHistory(default_fps=getattr(self, "fps", None) or 30.0)
+        if self.pose_detector is not None:
+            self.pose_detector.close()
+        # Cada processador (vídeo, segmento ou fonte ao vivo) tem o seu Pose: o modo de rastreamento guarda estado
+        if self.multi_pose:
+            self.pose_detector = MultiPoseDetector(self.pose_model_path, self.max_poses)
+        else:
+            self.pose_detector = SinglePoseDetector()
+        if self.face_detector is not None:
+            self.face_detector.close()
+        self.face_detector = create_face_detector(self.face_detector_backend, **self.face_detector_options)
+        self._pose_regions = []
+        self._last_analysis = None
+        self._last_record = None
+
+        # Retomada: os contadores continuam dos agregados salvos e os novos tracks não reutilizam ids antigos
+        if self._resume_state is not None:
+            self.aggregator = ReportAggregator.from_state(self._resume_state["aggregator"])
+            if self.tracker is not None:
+                self.tracker.next_track_id = self._resume_state.get("track_count", 0)
 
-            # Reconhecimento facial
-            faces = recognize_faces(frame, self.known_face_encodings, self.known_face_names)
+    def _read_frame(self, cap, frames_read):
+        """
+        Lê o próximo frame do segmento direto num buffer do pool; retorna None ao fim do vídeo ou de end_frame.
+        """
+        if self.end_frame is not None and self.start_frame + frames_read >= self.end_frame:
+            return None
+        buffer = self.frame_pool.acquire(self._source_shape)
+        with self.metrics.stage("decode"):
+            ret, frame = cap.read(buffer)
+        if not ret or frame is not buffer:
+            # Fim do vídeo ou frame com outro tamanho (o OpenCV alocou um novo)
+            self.frame_pool.release(buffer)
+        return frame if ret else None
+
+    def _resize_frame(self, frame, frame_size):
+        """Redimensiona para o tamanho de saída num buffer do pool e devolve o frame original ao pool."""
+        if self.resize_factor != 1.0:
+            with self.metrics.stage("resize"):
+                resized = cv2.resize(frame, frame_size, dst=self.frame_pool.acquire((frame_size[1], frame_size[0], 3)))
+            self.frame_pool.release(frame)
+            frame = resized
+        return frame
+
+    def _schedule(self, frame_number, frame):
+        # Usa o índice global do frame para manter o mesmo padrão de amostragem em segmentos
+        return self.scheduler.decide(self.start_frame + frame_number, frame)
+
+    def _analyze_frame(self, context, decision=RUN_FULL, frame_number=None, executor=None, pose_turn=None,
+                       face_turn=None, timestamp=None):
+        """
+        Executa os modelos sobre um frame.
+        :param context: FrameContext do frame (versões RGB e reduzidas compartilhadas entre os estágios).
+        :param decision: RUN_FULL (rostos, emoções e pose) ou RUN_POSE_ONLY.
+        :param frame_number: Índice (base 1) do frame no segmento, usado no instante do frame das regras temporais.
+        :param executor: Executor opcional; quando informado, a pose roda em paralelo ao reconhecimento facial.
+        :param pose_turn: Context manager opcional que bloqueia até ser a vez deste frame executar a pose.
+        :param face_turn: Context manager opcional que bloqueia até ser a vez deste frame atualizar o rastreamento.
+        :param timestamp: Instante do frame (segundos); padrão: calculado por frame_number e o FPS.
+        :return: Dicionário com "faces", "emotions", "emotion_probabilities", "activities_list", "anomaly_detected",
+                 "pose_landmarks", "pose_assignment" (pose de cada rosto), "decision" e "elapsed" (segundos).
+        """
+        start_time = time.perf_counter()
+        frame = context.frame
+        if timestamp is None and frame_number is not None and self.fps:
+            timestamp = (self.start_frame + frame_number) / self.fps
+
+        # No modo de recortes, a pose depende das caixas dos rostos e roda depois do reconhecimento facial
+        crops = self.pose_detector.needs_faces
+
+        def run_pose(face_locations=None):
+            with pose_turn or nullcontext():
+                if crops:
+                    # Frames só de pose reaproveitam as regiões do último frame com rostos (na ordem dos frames)
+                    if face_locations is None:
+                        face_locations = self._pose_regions
+                    self._pose_regions = face_locations
+                with self.metrics.stage("pose"):
+                    return detect_activities(frame, self.analysis_scale, self.pose_history, timestamp,
+                                             self.pose_detector, face_locations, context)
+
+        pose_future = executor.submit(run_pose) if executor is not None and not crops else None
+
+        if decision == RUN_POSE_ONLY:
+            faces, emotions, emotion_probabilities = [], [], None
+            if face_turn is not None:
+                # Libera a vez do rastreamento para os frames seguintes
+                with face_turn:
+                    pass
+        elif self.tracker is None:
+            # Reconhecimento facial (com os encodings, se forem gravados no armazenamento)
+            faces = recognize_faces(frame, self.known_face_encodings, self.known_face_names, self.gallery,
+                                    self.analysis_scale, include_encodings=self.store_path is not None,
+                                    metrics=self.metrics, detector=self.face_detector, context=context)
             face_locations = [face["location"] for face in faces]
             # Análise de emoções para os rostos detectados
-            emotions = analyze_emotions(frame, face_locations)
-
-            # Atribui um face_id a cada face e armazena os dados
-            for i, face in enumerate(faces):
-                face["face_id"] = face_id_counter
-                face_data.append(face)
-                emotion_label = emotions[i] if i < len(emotions) else "Desconhecido"
-                emotion_data.append({"face_id": face_id_counter, "label": emotion_label})
-                face_id_counter += 1
-
-            # Detecção de atividades (usando MediaPipe Pose)
-            activities_list, anomaly_detected, pose_results = detect_activities(frame)
-            if anomaly_detected:
-                anomaly_count += 1
-
-            # Associação: se o número de rostos igualar o de poses detectadas, vincula cada face à sua atividade;
-            # caso contrário, atribui "Indefinido"
-            if len(faces) == len(activities_list):
-                for i, face in enumerate(faces):
-                    activity_data.append({"face_id": face["face_id"], "activities": activities_list[i]})
-            else:
-                for face in faces:
-                    activity_data.append({"face_id": face["face_id"], "activities": ["Indefinido"]})
-
-            # Desenha retângulos, nomes e emoções para cada rosto
-            for i, face in enumerate(faces):
-                top, right, bottom, left = face["location"]
-                name = face["name"]
-                emotion_text = emotions[i] if i < len(emotions) else "Desconhecido"
-
-                padding = 10
-                top = max(0, top - padding)
-                right = min(frame.shape[1], right + padding)
-                bottom = min(frame.shape[0], bottom + padding)
-                left = max(0, left - padding)
-
-                cv2.rectangle(frame, (left, top), (right, bottom), (0, 255, 0), 2)
-                cv2.rectangle(frame, (left, bottom - 35), (right, bottom), (0, 255, 0), cv2.FILLED)
-                font = cv2.FONT_HERSHEY_DUPLEX
-                cv2.putText(frame, name, (left + 6, bottom - 6), font, 0.8, (255, 255, 255), 1)
-                cv2.putText(frame, emotion_text, (left + 6, top - 6), font, 0.8, (0, 0, 255), 1)
-
-            # Exibe as atividades no frame para os rostos processados (apenas as deste ciclo)
-            y_offset = 50
-            for ad in activity_data[-len(faces):]:
-                activities_str = ", ".join(ad["activities"])
-                cv2.putText(frame, activities_str, (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-                y_offset += 25
-
-            # Desenha os landmarks dos esqueleto (pose) na imagem
-            draw_landmarks(frame, pose_results)
-
-            out.write(frame)
-            cv2.imshow('Processed Video', frame)
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-
-        cap.release()
-        out.release()
-        cv2.destroyAllWindows()
-        print("Vídeo processado e salvo em:", self.output_path)
-        return total_frames, anomaly_count, face_data, emotion_data, activity_data
+            with self.metrics.stage("emotion"):
+                emotions, emotion_probabilities = analyze_emotions(frame, face_locations, return_probabilities=True)
+        else:
+            with face_turn or nullcontext():
+                faces, emotions, emotion_probabilities = self._track_faces(context)
+
+        # Detecção de atividades (usando MediaPipe Pose)
+        face_locations = [face["location"] for face in faces]
+        if pose_future is not None:
+            activities_list, anomaly_detected, pose_landmarks = pose_future.result()
+        else:
+            activities_list, anomaly_detected, pose_landmarks = run_pose(
+                face_locations if decision != RUN_POSE_ONLY else None)
+
+        return {
+            "faces": faces,
+            "emotions": emotions,
+            "emotion_probabilities": emotion_probabilities,
+            "activities_list": activities_list,
+            "anomaly_detected": anomaly_detected,
+            "pose_landmarks": pose_landmarks,
+            "pose_assignment": associate_faces_to_poses(face_locations, pose_landmarks, frame.shape),
+            "decision": decision,
+            "elapsed": time.perf_counter() - start_time,
+        }
+
+    def _track_faces(self, context):
+        """Atualiza os tracks e executa identificação e emoção apenas nos tracks que precisam de atualização."""
+        frame = context.frame
+        if self.tracker.should_detect():
+            tracks = self.tracker.update(frame, detect_faces(frame, self.analysis_scale, self.metrics,
+                                                                self.face_detector, context))
+        else:
+            tracks = self.tracker.propagate(frame)
+
+        stale = [track for track in tracks if self.tracker.needs_refresh(track)]
+        if stale:
+            stale_locations = [track.location for track in stale]
+            identified = identify_faces(frame, stale_locations, self.known_face_encodings, self.known_face_names,
+                                        self.gallery, self.metrics, context)
+            with self.metrics.stage("emotion"):
+                emotions, probabilities = analyze_emotions(frame, stale_locations, return_probabilities=True)
+            for track, face, emotion, emotion_probabilities in zip(stale, identified, emotions, probabilities):
+                self.tracker.set_identity(track, face["name"], face["distance"], face["encoding"], emotion,
+                                          emotion_probabilities)
+
+        faces = [{"name": track.name or "Desconhecido", "location": track.location, "track_id": track.track_id}
+                 for track in tracks]
+        if self.store_path is not None:
+            for face, track in zip(faces, tracks):
+                face["encoding"] = track.encoding
+        emotions = [track.emotion for track in tracks]
+        return faces, emotions, [track.emotion_probabilities for track in tracks]
+
+    def _collect_results(self, analysis):
+        """
+        Atribui face_ids e acumula os dados do frame (deve ser chamado em ordem de frame).
+        :return: Análise a ser desenhada no frame (num frame só de pose, reaproveita os últimos rostos).
+        """
+        self.scheduler.observe(analysis["decision"], analysis)
+        if analysis["anomaly_detected"]:
+            self.anomaly_count += 1
+            self.aggregator.anomaly_count += 1
+
+        if analysis["decision"] == RUN_POSE_ONLY:
+            previous = self._last_analysis or {"faces": [], "emotions": [], "frame_activities": []}
+            self._last_analysis = {**previous, "pose_landmarks": analysis["pose_landmarks"],
+                                   "activities_list": analysis["activities_list"],
+                                   "anomaly_detected": analysis["anomaly_detected"],
+                                   "decision": RUN_POSE_ONLY}
+            return self._last_analysis
+
+        faces = analysis["faces"]
+        emotions = analysis["emotions"]
+        activities_list = analysis["activities_list"]
+
+        # Atribui um face_id a cada face
+        for face in faces:
+            face["face_id"] = self.face_id_counter
+            face.setdefault("track_id", None)
+            self.face_id_counter += 1
+
+        # Associação espacial: cada face recebe as atividades do esqueleto atribuído a ela; sem esqueleto
+        # correspondente, atribui "Indefinido"
+        frame_activities = []
+        for face, pose_index in zip(faces, analysis["pose_assignment"]):
+            activities = activities_list[pose_index] if pose_index is not None else ["Indefinido"]
+            frame_activities.append({"face_id": face["face_id"], "activities": activities})
+
+        # Atualiza o agregador do relatório e, se configurado, guarda os registros completos
+        for i, face in enumerate(faces):
+            emotion_label = emotions[i] if i < len(emotions) else "Desconhecido"
+            self.aggregator.add_face(face["name"], emotion_label, frame_activities[i]["activities"], face["track_id"])
+            if self.keep_records:
+                self.face_data.append(face)
+                self.emotion_data.append({"face_id": face["face_id"], "label": emotion_label})
+        if self.keep_records:
+            self.activity_data.extend(frame_activities)
+        analysis["frame_activities"] = frame_activities
+        self._last_analysis = analysis
+        return analysis
+
+    def _complete_frame(self, context, analysis):
+        """
+        Agrega a análise de um frame (None se ele foi descartado), grava o registro do frame e o envia ao
+        renderizador, que libera os buffers do frame depois de gravá-lo. Deve ser chamado na ordem dos frames.
+        :return: Análise correspondente ao frame (a última, se reaproveitada) ou None.
+        """
+        frame = context.frame
+        display = None
+        record = None
+        if analysis is not None:
+            display = self._collect_results(analysis)
+            frame_number = self.start_frame + self.total_frames
+            if self.result_store is not None:
+                self.result_store.add_frame(frame_number, display, display["pose_landmarks"])
+            if self.renderer is not None or self.results_writer is not None:
+                record = build_frame_record(frame_number, display, display["pose_landmarks"].tolist(),
+                                            (frame.shape[1], frame.shape[0]))
+                if self.results_writer is not None:
+                    self.results_writer.write(record)
+            self._last_record = record
+        elif self.scheduler.reuse_annotations:
+            display = self._last_analysis
+            record = self._last_record
+
+        if self.renderer is not None:
+            self.renderer.submit(frame, record, context.release)
+        else:
+            context.release()
+        self._finish_frame(len(analysis["faces"]) if analysis is not None else 0)
+        return display
+
+    def _finish_frame(self, face_count=0):
+        """Conta o frame no agregador e nas métricas e grava os snapshots periódicos do relatório e das métricas."""
+        self.aggregator.total_frames += 1
+        self.metrics.frame_done(face_count)
+        if self.metrics_writer is not None:
+            self.metrics_writer.maybe_write(self.metrics)
+        if self.checkpoint_interval and self.total_frames % self.checkpoint_interval == 0:
+            if self.checkpoint_path:
+                self.aggregator.write_checkpoint(self.checkpoint_path)
+            if self.resume_path:
+                self.write_resume_state()
+
+    # ------------------------------------------------------------------
+    # Modo em pipeline: decodificador -> workers de inferência -> codificador
+    # ------------------------------------------------------------------
+
+    def _process_video_pipelined(self):
+        """
+        Processa o vídeo em estágios concorrentes ligados por filas limitadas:
+        uma thread decodifica, um pool de workers executa os modelos (face/emoção e pose em paralelo
+        sobre o mesmo frame) e a thread chamadora reordena os resultados por índice e os entrega ao renderizador.
+        Os dados retornados seguem a ordem dos frames e são idênticos aos do modo serial com o escalonador fixo;
+        com o AdaptiveFrameScheduler, o decodificador decide antes de observar os frames ainda em trânsito, então
+        as decisões podem diferir das do modo serial.
+        """
+        cap, frame_size = self._open_video()
+        self._reset_results()
+
+        decode_queue = queue.Queue(maxsize=self.queue_size)
+        result_queue = queue.Queue(maxsize=self.queue_size)
+        in_flight = threading.Semaphore(self.max_in_flight)
+        stop_event = threading.Event()
+        self._pipeline_error = None
+
+        # A pose (MediaPipe em modo de rastreamento) e o rastreamento facial têm estado e dependem da ordem
+        # dos frames: cada frame processado recebe um número de sequência e aguarda sua vez nesses estágios.
+        pose_turns = OrderedTurns(stop_event)
+        face_turns = OrderedTurns(stop_event) if self.tracker is not None else None
+
+        decoder = threading.Thread(
+            target=self._decode_loop,
+            args=(cap, frame_size, decode_queue, in_flight, stop_event),
+            name="decoder", daemon=True,
+        )
+        stage_executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="stage")
+        workers = [
+            threading.Thread(
+                target=self._inference_loop,
+                args=(decode_queue, result_queue, stage_executor, pose_turns, face_turns, stop_event),
+                name=f"inference-{i}", daemon=True,
+            )
+            for i in range(self.num_workers)
+        ]
+        decoder.start()
+        for worker in workers:
+            worker.start()
+
+        try:
+            self._encode_loop(result_queue, in_flight, stop_event)
+        finally:
+            stop_event.set()
+            decoder.join()
+            for worker in workers:
+                worker.join()
+            stage_executor.shutdown(wait=True)
+            self._release(cap)
+
+        if self._pipeline_error is not None:
+            raise self._pipeline_error
+        return self.total_frames, self.anomaly_count, self.face_data, self.emotion_data, self.activity_data
+
+    def _put(self, q, item, stop_event, stage=None):
+        """
+        Insere na fila bloqueando (backpressure) até haver espaço ou o pipeline ser interrompido.
+        :param stage: Nome do estágio em que a espera é medida (ex.: "queue_wait_decode_put").
+        """
+        with timed(self.metrics if stage else None, stage):
+            while not stop_event.is_set():
+                try:
+                    q.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+        return False
+
+    def _get(self, q, stop_event, stage=None):
+        with timed(self.metrics if stage else None, stage):
+            while not stop_event.is_set():
+                try:
+                    return q.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+        return None
+
+    def _decode_loop(self, cap, frame_size, decode_queue, in_flight, stop_event):
+        frame_number = 0
+        sequence = 0
+        try:
+            while not stop_event.is_set():
+                self._profile_frame(frame_number + 1)
+                frame = self._read_frame(cap, frame_number)
+                if frame is None:
+                    break
+                frame_number += 1
+                context = FrameContext(self._resize_frame(frame, frame_size), self.frame_pool, owned=True)
+
+                # Limita o número de frames em trânsito (e, portanto, o buffer de reordenação)
+                with self.metrics.stage("queue_wait_in_flight"):
+                    while not in_flight.acquire(timeout=0.1):
+                        if stop_event.is_set():
+                            return
+
+                decision = self._schedule(frame_number, context.frame)
+                item = (frame_number, context, decision, sequence if decision != SKIP else None)
+                if decision != SKIP:
+                    sequence += 1
+                if not self._put(decode_queue, item, stop_event, "queue_wait_decode_put"):
+                    return
+        except Exception as e:
+            self._pipeline_error = e
+            stop_event.set()
+        finally:
+            for _ in range(self.num_workers):
+                self._put(decode_queue, None, stop_event)
+
+    def _inference_loop(self, decode_queue, result_queue, stage_executor, pose_turns, face_turns, stop_event):
+        try:
+            while True:
+                item = self._get(decode_queue, stop_event, "queue_wait_decode_get")
+                if item is None:
+                    break
+                frame_number, context, decision, sequence = item
+                self._profile_frame(frame_number)
+                analysis = None
+                if sequence is not None:
+                    face_turn = face_turns.turn(sequence) if face_turns is not None else None
+                    analysis = self._analyze_frame(context, decision, frame_number, stage_executor,
+                                                   pose_turns.turn(sequence), face_turn)
+                item = (frame_number, context, analysis)
+                if not self._put(result_queue, item, stop_event, "queue_wait_result_put"):
+                    break
+        except Exception as e:
+            self._pipeline_error = e
+            stop_event.set()
+        finally:
+            self._put(result_queue, None, stop_event)
+
+    def _encode_loop(self, result_queue, in_flight, stop_event):
+        pending = {}
+        next_frame = 1
+        finished_workers = 0
+
+        while finished_workers < self.num_workers:
+            item = self._get(result_queue, stop_event, "queue_wait_result_get")
+            if item is None:
+                if stop_event.is_set():
+                    return
+                finished_workers += 1
+                continue
+
+            frame_number, context, analysis = item
+            pending[frame_number] = (context, analysis)
+
+            # Emite os frames na ordem original assim que o próximo estiver disponível
+            while next_frame in pending:
+                context, analysis = pending.pop(next_frame)
+                self._profile_frame(next_frame)
+                self.total_frames = next_frame
+                self._complete_frame(context, analysis)
+                in_flight.release()
+                next_frame += 1
+                if self.renderer is not None and self.renderer.stopped:
+                    stop_event.set()
+                    return
 
 
 if __name__ == "__main__":
@@ -0,0 +1,128 @@
+import numpy as np
+import pytest
+
+import activity_rules_module
+from activity_detection_module import HEAD_LANDMARKS, associate_faces_to_poses
+from activity_rules_module import ActivityRule, PoseHistory, anomaly_activities, classify_poses, register_activity
+from activity_rules_module import (LEFT_ANKLE, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, LEFT_WRIST, RIGHT_ANKLE, RIGHT_HIP,
+                                   RIGHT_KNEE, RIGHT_SHOULDER, RIGHT_WRIST)
+
+
+def make_pose(x=0.5, knee_offset=0.0, raised_arm=False, visibility=1.0):
+    """Landmarks (33, 4) de uma pessoa de frente; knee_offset desloca os joelhos para a frente (sentada)."""
+    pose = np.zeros((33, 4), dtype=np.float32)
+    pose[:, :2] = (x, 0.15)
+    pose[:, 3] = visibility
+    points = {
+        LEFT_SHOULDER: (x - 0.05, 0.3), RIGHT_SHOULDER: (x + 0.05, 0.3),
+        LEFT_WRIST: (x - 0.06, 0.1 if raised_arm else 0.45), RIGHT_WRIST: (x + 0.06, 0.45),
+        LEFT_HIP: (x - 0.04, 0.5), RIGHT_HIP: (x + 0.04, 0.5),
+        LEFT_KNEE: (x - 0.04 + knee_offset, 0.7 - 2 * knee_offset),
+        RIGHT_KNEE: (x + 0.04 + knee_offset, 0.7 - 2 * knee_offset),
+        LEFT_ANKLE: (x - 0.04 + knee_offset, 0.9 - 2 * knee_offset),
+        RIGHT_ANKLE: (x + 0.04 + knee_offset, 0.9 - 2 * knee_offset),
+    }
+    for index, point in points.items():
+        pose[index, :2] = point
+    return pose
+
+
+def test_static_rules():
+    landmarks = np.stack([make_pose(), make_pose(knee_offset=0.1), make_pose(raised_arm=True)])
+    assert classify_poses(landmarks) == [["Pessoa Em Pe"], ["Pessoa Sentada"], ["Braco Levantado", "Pessoa Em Pe"]]
+    assert classify_poses(np.empty((0, 33, 4), dtype=np.float32)) == []
+
+
+def test_temporal_rules_need_history():
+    history = PoseHistory(window=4)
+    assert classify_poses(make_pose(x=0.4), history, timestamp=0.0) == [["Pessoa Em Pe"]]
+    # O quadril anda 0,2 (uma vez o tronco) em 0,2 s: 5 troncos por segundo
+    assert classify_poses(make_pose(x=0.6), history, timestamp=0.2) == [["Pessoa Em Pe", "Pessoa Andando"]]
+    # Sem histórico, as regras temporais não são avaliadas
+    assert classify_poses(make_pose(x=0.6)) == [["Pessoa Em Pe"]]
+
+
+def test_falling_rule():
+    history = PoseHistory(window=4)
+    classify_poses(make_pose(), history, timestamp=0.0)
+    # Tronco deitado (ombros na altura do quadril) e quadril descendo rápido
+    fallen = make_pose()
+    fallen[[LEFT_SHOULDER, RIGHT_SHOULDER], :2] = [(0.2, 0.8), (0.2, 0.85)]
+    fallen[[LEFT_HIP, RIGHT_HIP], 1] = 0.8
+    activities = classify_poses(fallen, history, timestamp=0.1)[0]
+    assert "Queda" in activities
+    assert "Queda" in anomaly_activities()
+
+
+def test_history_follows_people_when_order_changes():
+    history = PoseHistory(window=4)
+    standing, lying = make_pose(x=0.25), make_pose(x=0.75)
+    lying[[LEFT_SHOULDER, RIGHT_SHOULDER], :2] = [(0.45, 0.8), (0.45, 0.85)]
+    lying[[LEFT_HIP, RIGHT_HIP], 1] = 0.8
+    classify_poses(np.stack([standing, lying]), history, timestamp=0.0)
+    # As mesmas duas pessoas, paradas, em outra ordem: nenhuma se moveu
+    activities = classify_poses(np.stack([lying, standing]), history, timestamp=0.1)
+    assert not any("Queda" in person or "Pessoa Andando" in person for person in activities)
+    assert activities[1] == ["Pessoa Em Pe"]
+
+
+def test_new_person_has_no_velocity():
+    history = PoseHistory(window=4)
+    classify_poses(make_pose(x=0.2), history, timestamp=0.0)
+    # Outra pessoa entra em cena longe da primeira, que sai: não há deslocamento a medir
+    assert classify_poses(make_pose(x=0.8), history, timestamp=0.1) == [["Pessoa Em Pe"]]
+    assert classify_poses(make_pose(x=0.9), history, timestamp=0.2) == [["Pessoa Em Pe", "Pessoa Andando"]]
+
+
+def test_registered_rule_is_used(monkeypatch):
+    monkeypatch.setattr(activity_rules_module, "ACTIVITY_RULES", list(activity_rules_module.ACTIVITY_RULES))
+
+    @register_activity("Maos Para Cima", anomaly=True)
+    def both_arms(landmarks, history):
+        return (landmarks[:, LEFT_WRIST, 1] < landmarks[:, LEFT_SHOULDER, 1]) & \
+            (landmarks[:, RIGHT_WRIST, 1] < landmarks[:, RIGHT_SHOULDER, 1])
+
+    pose = make_pose(raised_arm=True)
+    pose[RIGHT_WRIST, 1] = 0.1
+    assert classify_poses(pose)[0][-1] == "Maos Para Cima"
+    assert "Maos Para Cima" in anomaly_activities()
+    assert "Maos Para Cima" not in anomaly_activities(activity_rules_module.ACTIVITY_RULES[:-1])
+
+
+def test_explicit_rules():
+    rules = [ActivityRule("Sempre", lambda landmarks, history: np.ones(len(landmarks), dtype=bool))]
+    assert classify_poses(np.stack([make_pose(), make_pose()]), rules=rules) == [["Sempre"], ["Sempre"]]
+
+
+@pytest.fixture
+def two_poses():
+    # Frame 200x100 (largura x altura): cabeças em x=50 e x=150, y=20
+    poses = np.stack([make_pose(x=0.25), make_pose(x=0.75)])
+    poses[:, HEAD_LANDMARKS, 1] = 0.2
+    return poses
+
+
+def test_faces_follow_their_poses(two_poses):
+    faces = [(10, 160, 30, 140), (10, 60, 30, 40)]
+    assert associate_faces_to_poses(faces, two_poses, (100, 200, 3)) == [1, 0]
+
+
+def test_face_outside_every_pose(two_poses):
+    faces = [(10, 60, 30, 40), (70, 110, 90, 90)]
+    assert associate_faces_to_poses(faces, two_poses, (100, 200, 3)) == [0, None]
+
+
+def test_each_pose_is_assigned_once(two_poses):
+    # Dois rostos sobre a mesma pessoa: apenas o mais próximo da cabeça recebe a pose
+    faces = [(12, 62, 32, 42), (10, 60, 30, 40)]
+    assert associate_faces_to_poses(faces, two_poses[:1], (100, 200, 3)) == [None, 0]
+
+
+def test_invisible_pose_is_ignored(two_poses):
+    two_poses[0, :, 3] = 0.0
+    assert associate_faces_to_poses([(10, 60, 30, 40)], two_poses, (100, 200, 3)) == [None]
+
+
+def test_no_faces_or_poses(two_poses):
+    assert associate_faces_to_poses([], two_poses, (100, 200, 3)) == []
+    assert associate_faces_to_poses([(10, 60, 30, 40)], np.empty((0, 33, 4), np.float32), (100, 200, 3)) == [None]
@@ -0,0 +1,116 @@
+import json
+import os
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import batch_processing
+import report_module
+from batch_processing import BatchProcessor, find_videos, job_name, plan_workers, summarize_by_person
+from report_module import ReportAggregator
+
+
+def touch(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, "wb").close()
+    return path
+
+
+def test_find_videos(tmp_path):
+    root = str(tmp_path)
+    b = touch(os.path.join(root, "b.mp4"))
+    a = touch(os.path.join(root, "a.AVI"))
+    touch(os.path.join(root, "notas.txt"))
+    nested = touch(os.path.join(root, "sub", "c.mkv"))
+
+    # Pastas listam só o primeiro nível; vídeos repetidos entre as entradas aparecem uma única vez
+    assert find_videos([root]) == [a, b]
+    assert find_videos([root, b, os.path.join(root, "**", "*.mkv")]) == [a, b, nested]
+    assert find_videos([os.path.join(root, "inexistente")]) == []
+
+
+def test_job_name_distinguishes_homonyms(tmp_path):
+    first = job_name(str(tmp_path / "camera1" / "video.mp4"))
+    second = job_name(str(tmp_path / "camera2" / "video.mp4"))
+    assert first.startswith("video_") and second.startswith("video_")
+    assert first != second
+    assert job_name(str(tmp_path / "camera1" / "video.mp4")) == first
+
+
+def test_plan_workers(monkeypatch):
+    monkeypatch.setattr(batch_processing, "available_memory", lambda: 5 * 1024 ** 3)
+    assert plan_workers(10, max_workers=8, memory_per_worker_gb=2.0) == 2
+    assert plan_workers(1, max_workers=8, memory_per_worker_gb=2.0) == 1
+    monkeypatch.setattr(batch_processing, "available_memory", lambda: None)
+    assert plan_workers(10, max_workers=3) == 3
+    monkeypatch.setattr(batch_processing, "available_memory", lambda: 0)
+    assert plan_workers(10, max_workers=3) == 1
+
+
+def test_summarize_by_person():
+    first = ReportAggregator()
+    first.total_frames = 100
+    first.anomaly_count = 2
+    first.add_face("Ana", "feliz", ["Pessoa Em Pe"], track_id=0)
+    first.add_face("Bruno", "neutro", ["Pessoa Sentada"], track_id=1)
+    second = ReportAggregator()
+    second.total_frames = 50
+    second.add_face("Ana", "triste", ["Pessoa Em Pe"], track_id=0)
+
+    summary = summarize_by_person([
+        {"video_path": "a.mp4", "report_path": "a/report.json", "aggregator": first, "track_count": 2},
+        {"video_path": "b.mp4", "report_path": "b/report.json", "aggregator": second, "track_count": 1},
+    ])
+    assert summary["total_videos"] == 2
+    assert summary["total_frames"] == 150
+    assert summary["anomaly_count"] == 2
+    assert summary["total_face_detections"] == 3
+    # O track 0 do segundo vídeo é outra pessoa: os tracks são deslocados por vídeo
+    assert summary["total_tracked_persons"] == 3
+    ana = summary["person_statistics"]["Ana"]
+    assert ana["emotions"] == {"feliz": 1, "triste": 1}
+    assert ana["activities"] == {"Pessoa Em Pe": 2}
+    assert ana["track_count"] == 2
+    assert ana["videos"] == ["a.mp4", "b.mp4"] and ana["video_count"] == 2
+    assert summary["person_statistics"]["Bruno"]["videos"] == ["a.mp4"]
+    assert [video["total_frames"] for video in summary["videos"]] == [100, 50]
+
+
+class BrokenPool:
+    """Substitui o ProcessPoolExecutor: o vídeo "quebra.mp4" derruba o pool, os demais terminam."""
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, func, video_path, job_dir):
+        future = Future()
+        if os.path.basename(video_path) == "quebra.mp4":
+            future.set_exception(BrokenProcessPool("worker encerrado"))
+        else:
+            aggregator = ReportAggregator()
+            aggregator.total_frames = 10
+            future.set_result({"video_path": video_path, "report_path": os.path.join(job_dir, "report.json"),
+                               "aggregator": aggregator, "track_count": 0})
+        return future
+
+
+def test_broken_pool_still_writes_summary(tmp_path, monkeypatch):
+    monkeypatch.setattr(batch_processing, "ProcessPoolExecutor", BrokenPool)
+    monkeypatch.setattr(report_module, "plot_statistics", lambda person_stats, output_dir: None)
+    ok = touch(str(tmp_path / "videos" / "ok.mp4"))
+    broken = touch(str(tmp_path / "videos" / "quebra.mp4"))
+    output_dir = str(tmp_path / "lote")
+
+    summary = BatchProcessor([str(tmp_path / "videos")], output_dir, [], [], num_workers=2).run()
+    assert [video["video_path"] for video in summary["videos"]] == [ok]
+    [failure] = summary["failed_videos"]
+    assert failure["video_path"] == broken
+    # A pasta do vídeo com erro é onde fica o estado parcial para a próxima execução
+    assert failure["job_dir"] == os.path.join(output_dir, job_name(broken))
+    with open(os.path.join(output_dir, "summary.json"), encoding="utf-8") as f:
+        assert json.load(f)["failed_videos"] == summary["failed_videos"]
@@ -0,0 +1,78 @@
+import cv2
+import numpy as np
+import pytest
+
+from benchmark_module import (compare_with_baseline, load_benchmark_results, measure, measure_peak_rss,
+                              synthetic_frame, write_benchmark_results, write_synthetic_clip)
+
+
+@pytest.fixture
+def crops():
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (40, 30, 3), dtype=np.uint8), rng.integers(0, 255, (30, 30, 3), dtype=np.uint8)]
+
+
+def stats(seconds, rss=100.0):
+    return {"seconds_median": seconds, "seconds_min": seconds, "throughput": 1.0 / seconds, "unit": "frames/s",
+            "peak_memory_mb": 1.0, "peak_rss_mb": rss, "repeats": 5}
+
+
+def test_synthetic_frame_is_reproducible(crops):
+    frame, locations = synthetic_frame(crops, 4, (160, 120), frame_index=3)
+    again, same_locations = synthetic_frame(crops, 4, (160, 120), frame_index=3)
+    np.testing.assert_array_equal(frame, again)
+    assert locations == same_locations
+    assert frame.shape == (120, 160, 3)
+    assert len(locations) == 4
+    for top, right, bottom, left in locations:
+        assert 0 <= top < bottom <= 120 and 0 <= left < right <= 160
+
+
+def test_synthetic_clip(crops, tmp_path):
+    clip_path = write_synthetic_clip(str(tmp_path / "clip.avi"), crops, 2, (160, 120), num_frames=12)
+    cap = cv2.VideoCapture(clip_path)
+    try:
+        assert int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) == 12
+    finally:
+        cap.release()
+
+
+def test_measure_runs_warmup_repeats_and_memory_pass():
+    calls = []
+    result = measure(lambda: calls.append(1), items=4, repeats=3, warmup=2, unit="rostos")
+    # 2 de aquecimento, 3 cronometradas e 1 separada para a memória
+    assert len(calls) == 6
+    assert result["repeats"] == 3
+    assert result["unit"] == "rostos/s"
+    assert result["seconds_min"] <= result["seconds_median"]
+    assert set(result) >= {"throughput", "peak_memory_mb", "peak_rss_mb"}
+
+
+def test_peak_rss_sees_native_allocations():
+    def allocate():
+        buffer = np.ones(64 * 1024 * 1024, dtype=np.uint8)   # 64 MB fora do heap do Python
+        buffer.sum()
+
+    peak_rss, growth = measure_peak_rss(allocate)
+    if peak_rss is None:
+        pytest.skip("RSS indisponível nesta plataforma")
+    assert growth >= 32
+    assert peak_rss >= growth
+
+
+def test_compare_with_baseline():
+    baseline = {"benchmarks": {"a": stats(0.100), "b": stats(0.100), "removido": stats(0.100)}}
+    results = {"benchmarks": {"a": stats(0.110), "b": stats(0.150, rss=None), "novo": stats(0.5)}}
+    regressions = compare_with_baseline(results, baseline, threshold=0.2)
+    assert [name for name, *_ in regressions] == ["b"]
+    name, previous, current, change = regressions[0]
+    assert (previous, current) == (0.100, 0.150)
+    assert change == pytest.approx(0.5)
+    assert compare_with_baseline(results, baseline, threshold=0.6) == []
+
+
+def test_results_round_trip(tmp_path):
+    results = {"created": "agora", "quick": True, "benchmarks": {"a": stats(0.1)}}
+    path = str(tmp_path / "bench" / "results.json")
+    write_benchmark_results(results, path)
+    assert load_benchmark_results(path) == results
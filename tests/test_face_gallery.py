@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from face_gallery_module import FaceGallery
+
+
+def brute_force_match(encodings, names, faces, tolerance):
+    """Referência: face_recognition.face_distance (norma euclidiana) contra cada imagem, mínimo por pessoa."""
+    results = []
+    for face in faces:
+        distances = np.linalg.norm(np.asarray(encodings, dtype=np.float64) - face, axis=1)
+        best = {}
+        for name, distance in zip(names, distances):
+            best[name] = min(best.get(name, np.inf), distance)
+        name, distance = min(best.items(), key=lambda item: item[1])
+        results.append((name if distance <= tolerance else "Desconhecido", distance))
+    return results
+
+
+@pytest.fixture
+def gallery_data():
+    rng = np.random.default_rng(0)
+    names = ["Ana", "Bruno", "Ana", "Carla", "Bruno", "Ana"]
+    encodings = rng.normal(scale=0.1, size=(len(names), 128)).astype(np.float32)
+    return encodings, names
+
+
+def test_match_equals_brute_force(gallery_data):
+    encodings, names = gallery_data
+    rng = np.random.default_rng(1)
+    # Rostos próximos de imagens da galeria (conhecidos) e rostos aleatórios (desconhecidos)
+    faces = np.concatenate([encodings[[1, 3, 5]] + rng.normal(scale=0.01, size=(3, 128)),
+                            rng.normal(scale=0.1, size=(2, 128))]).astype(np.float32)
+    gallery = FaceGallery(encodings, names, tolerance=0.6)
+
+    expected = brute_force_match(encodings, names, faces, 0.6)
+    result = gallery.match(faces)
+
+    assert [name for name, _ in result] == [name for name, _ in expected]
+    np.testing.assert_allclose([d for _, d in result], [d for _, d in expected], rtol=1e-4, atol=1e-5)
+    assert [name for name, _ in result[:3]] == ["Bruno", "Carla", "Ana"]
+
+
+def test_match_respects_tolerance(gallery_data):
+    encodings, names = gallery_data
+    gallery = FaceGallery(encodings, names, tolerance=0.0)
+    shifted = encodings[:1] + 0.05
+    assert gallery.match(shifted)[0][0] == "Desconhecido"
+    assert gallery.match(encodings[:1])[0][0] == "Ana"
+
+
+def test_mean_aggregate(gallery_data):
+    encodings, names = gallery_data
+    gallery = FaceGallery(encodings, names)
+    face = encodings[0]
+    distances = gallery.identity_distances(face[np.newaxis], aggregate="mean")[0]
+    ana = np.linalg.norm(encodings[[0, 2, 5]] - face, axis=1).mean()
+    np.testing.assert_allclose(distances[gallery.identities.index("Ana")], ana, rtol=1e-4, atol=1e-5)
+
+
+def test_top_k_is_sorted(gallery_data):
+    encodings, names = gallery_data
+    gallery = FaceGallery(encodings, names)
+    top = gallery.top_k(encodings[3:4], k=2)[0]
+    assert len(top) == 2
+    assert top[0][0] == "Carla"
+    assert top[0][1] <= top[1][1]
+
+
+def test_empty_gallery_and_no_faces(gallery_data):
+    encodings, names = gallery_data
+    assert FaceGallery().match(encodings[:2]) == [("Desconhecido", None)] * 2
+    assert FaceGallery(encodings, names).match(np.empty((0, 128), dtype=np.float32)) == []
+
+
+def test_mismatched_names():
+    with pytest.raises(ValueError):
+        FaceGallery(np.zeros((2, 128), dtype=np.float32), ["Ana"])
@@ -0,0 +1,71 @@
+import numpy as np
+
+from face_tracking_module import FaceTracker, box_iou
+
+FRAME = np.zeros((120, 160, 3), dtype=np.uint8)
+
+
+def track_ids(tracks):
+    return [track.track_id for track in tracks]
+
+
+def test_box_iou():
+    assert box_iou((0, 10, 10, 0), (0, 10, 10, 0)) == 1.0
+    assert box_iou((0, 10, 10, 0), (0, 30, 10, 20)) == 0.0
+    assert abs(box_iou((0, 10, 10, 0), (0, 15, 10, 5)) - 1 / 3) < 1e-9
+
+
+def test_tracks_follow_moving_faces():
+    tracker = FaceTracker()
+    first = tracker.update(FRAME, [(10, 40, 40, 10), (10, 120, 40, 90)])
+    assert track_ids(first) == [0, 1]
+
+    # Os rostos andam um pouco e chegam na ordem inversa: cada um mantém o seu track
+    second = tracker.update(FRAME, [(12, 125, 42, 95), (12, 45, 42, 15)])
+    assert track_ids(second) == [1, 0]
+    assert second[0].hits == 2
+    assert second[0].location == (12, 125, 42, 95)
+
+
+def test_centroid_fallback_without_overlap():
+    tracker = FaceTracker(max_centroid_distance=1.0)
+    tracker.update(FRAME, [(10, 30, 30, 10)])
+    # Sem interseção, mas o centro está a menos de uma largura de caixa
+    assert track_ids(tracker.update(FRAME, [(10, 48, 30, 28)])) == [0]
+
+
+def test_new_face_gets_new_track():
+    tracker = FaceTracker()
+    tracker.update(FRAME, [(10, 40, 40, 10)])
+    tracks = tracker.update(FRAME, [(10, 40, 40, 10), (60, 150, 90, 120)])
+    assert track_ids(tracks) == [0, 1]
+    assert tracks[1].created_at == 1
+
+
+def test_lost_track_is_dropped_after_max_missed():
+    tracker = FaceTracker(max_missed=2)
+    tracker.update(FRAME, [(10, 40, 40, 10)])
+    tracker.update(FRAME, [])
+    tracker.update(FRAME, [])
+    assert track_ids(tracker.tracks) == [0]
+    # A face volta antes do limite: o track é mantido
+    assert track_ids(tracker.update(FRAME, [(10, 40, 40, 10)])) == [0]
+
+    for _ in range(3):
+        tracker.update(FRAME, [])
+    assert tracker.tracks == []
+    assert track_ids(tracker.update(FRAME, [(10, 40, 40, 10)])) == [1]
+
+
+def test_refresh_intervals():
+    tracker = FaceTracker(refresh_interval=4, confident_distance=0.5, low_confidence_interval=2)
+    confident, doubtful = tracker.update(FRAME, [(10, 40, 40, 10), (10, 120, 40, 90)])
+    assert tracker.needs_refresh(confident) and tracker.needs_refresh(doubtful)
+    tracker.set_identity(confident, "Ana", 0.3, None, "feliz")
+    tracker.set_identity(doubtful, "Bruno", 0.55, None, "neutro")
+
+    refreshed = []
+    for _ in range(4):
+        tracker.update(FRAME, [confident.location, doubtful.location])
+        refreshed.append((tracker.needs_refresh(confident), tracker.needs_refresh(doubtful)))
+    assert refreshed == [(False, False), (False, True), (False, True), (True, True)]
@@ -0,0 +1,62 @@
+import numpy as np
+
+from frame_scheduler_module import RUN_FULL, RUN_POSE_ONLY, SKIP, AdaptiveFrameScheduler, FixedFrameScheduler
+
+BLACK = np.zeros((48, 64, 3), dtype=np.uint8)
+WHITE = np.full((48, 64, 3), 255, dtype=np.uint8)
+
+
+def run(scheduler, frames, faces=0, poses=0, elapsed=None):
+    """Executa o escalonador sobre os frames, alimentando-o com análises de `faces` rostos e `poses` poses."""
+    decisions = []
+    for frame_number, frame in enumerate(frames, 1):
+        decision = scheduler.decide(frame_number, frame)
+        if decision != SKIP:
+            scheduler.observe(decision, {"faces": [None] * faces, "activities_list": [[]] * poses,
+                                         "elapsed": elapsed})
+        decisions.append(decision)
+    return decisions
+
+
+def test_fixed_scheduler():
+    assert run(FixedFrameScheduler(frame_skip=3), [BLACK] * 7) == [SKIP, SKIP, RUN_FULL, SKIP, SKIP, RUN_FULL, SKIP]
+    assert run(FixedFrameScheduler(frame_skip=0), [BLACK] * 3) == [RUN_FULL] * 3
+
+
+def test_static_scene_waits_for_max_interval():
+    scheduler = AdaptiveFrameScheduler(max_interval=5)
+    assert run(scheduler, [BLACK] * 12) == [RUN_FULL] + [SKIP] * 4 + [RUN_FULL] + [SKIP] * 4 + [RUN_FULL, SKIP]
+
+
+def test_high_motion_runs_every_frame():
+    scheduler = AdaptiveFrameScheduler(max_interval=5)
+    assert run(scheduler, [BLACK, WHITE] * 3) == [RUN_FULL] * 6
+
+
+def test_moderate_motion_samples_by_people_in_scene():
+    frames = [np.full((48, 64, 3), 5 * i, dtype=np.uint8) for i in range(10)]   # ~2% de movimento por frame
+    empty = run(AdaptiveFrameScheduler(target_fps=10.0, max_interval=30), frames)
+    crowded = run(AdaptiveFrameScheduler(target_fps=10.0, max_interval=30), frames, faces=2)
+    # A 30 fps, o intervalo base é 3 frames com pessoas em cena e o dobro sem ninguém
+    assert empty == [RUN_FULL] + ([SKIP] * 5 + [RUN_FULL]) + [SKIP] * 3
+    assert crowded == [RUN_FULL] + ([SKIP] * 2 + [RUN_FULL]) * 3
+
+
+def test_pose_only_between_full_analyses():
+    frames = [np.full((48, 64, 3), 5 * i, dtype=np.uint8) for i in range(7)]
+    decisions = run(AdaptiveFrameScheduler(target_fps=10.0), frames, faces=1, poses=1)
+    assert decisions == [RUN_FULL, RUN_POSE_ONLY, RUN_POSE_ONLY, RUN_FULL, RUN_POSE_ONLY, RUN_POSE_ONLY, RUN_FULL]
+
+
+def test_budget_limits_full_analyses():
+    # Cada análise completa custa 0,5 s e o orçamento é de 4 frames por segundo: no máximo 1 a cada 2 frames
+    scheduler = AdaptiveFrameScheduler(processing_fps=4.0, max_interval=5)
+    assert run(scheduler, [BLACK, WHITE] * 3, elapsed=0.5) == [RUN_FULL, SKIP] * 3
+
+
+def test_reset_restarts_from_full_analysis():
+    scheduler = AdaptiveFrameScheduler(max_interval=5)
+    run(scheduler, [BLACK] * 3)
+    scheduler.reset(fps=60.0)
+    assert scheduler.base_interval == 6
+    assert scheduler.decide(1, BLACK) == RUN_FULL
@@ -0,0 +1,140 @@
+import json
+
+import pytest
+
+import report_module
+from report_module import ReportAggregator, aggregate_records, generate_report
+
+
+def baseline_report(face_data, emotion_data, activity_data, total_frames, anomaly_count):
+    """Referência: a agregação original de generate_report (busca linear por face_id)."""
+    person_stats = {}
+    for face in face_data:
+        name = face.get("name", "Desconhecido")
+        person_stats.setdefault(name, {"face_detections": 0, "emotions": {}, "activities": {}})
+        person_stats[name]["face_detections"] += 1
+    for ed in emotion_data:
+        face = next((f for f in face_data if f["face_id"] == ed["face_id"]), None)
+        if face:
+            emotions = person_stats[face.get("name", "Desconhecido")]["emotions"]
+            emotions[ed["label"]] = emotions.get(ed["label"], 0) + 1
+    for ad in activity_data:
+        activities = ad["activities"] if isinstance(ad["activities"], list) else [ad["activities"]]
+        face = next((f for f in face_data if f["face_id"] == ad["face_id"]), None)
+        if face:
+            counts = person_stats[face.get("name", "Desconhecido")]["activities"]
+            for act in activities:
+                counts[act] = counts.get(act, 0) + 1
+    return {
+        "total_frames": total_frames,
+        "anomaly_count": anomaly_count,
+        "total_face_detections": len(face_data),
+        "total_person_count": len(person_stats),
+        "identified_persons": list(person_stats.keys()),
+        "person_statistics": person_stats
+    }
+
+
+@pytest.fixture
+def records():
+    face_data = [
+        {"face_id": 0, "name": "Ana", "location": (0, 10, 10, 0)},
+        {"face_id": 1, "name": "Bruno", "location": (0, 30, 10, 20)},
+        {"face_id": 2, "name": "Ana", "location": (0, 10, 10, 0)},
+        {"face_id": 3, "location": (5, 15, 15, 5)},
+        {"face_id": 4, "name": "Bruno", "location": (0, 30, 10, 20)},
+    ]
+    emotion_data = [{"face_id": 0, "label": "feliz"}, {"face_id": 1, "label": "neutro"},
+                    {"face_id": 2, "label": "feliz"}, {"face_id": 3, "label": "triste"},
+                    {"face_id": 4, "label": "neutro"}, {"face_id": 99, "label": "raiva"}]
+    activity_data = [{"face_id": 0, "activities": ["Pessoa Em Pe"]},
+                     {"face_id": 1, "activities": ["Pessoa Sentada", "Braco Levantado"]},
+                     {"face_id": 2, "activities": "Pessoa Andando"},
+                     {"face_id": 3, "activities": ["Indefinido"]},
+                     {"face_id": 4, "activities": []}]
+    return face_data, emotion_data, activity_data, 12, 2
+
+
+def test_aggregate_records_matches_baseline(records):
+    assert aggregate_records(*records).snapshot() == baseline_report(*records)
+
+
+def test_generate_report_writes_baseline_json(records, tmp_path, monkeypatch):
+    monkeypatch.setattr(report_module, "plot_statistics", lambda person_stats, output_dir: None)
+    report_path = tmp_path / "reports" / "report.json"
+    generate_report(*records, str(report_path))
+    with open(report_path, encoding="utf-8") as f:
+        assert json.load(f) == baseline_report(*records)
+
+
+def test_incremental_aggregator_matches_records(records):
+    face_data, emotion_data, activity_data, total_frames, anomaly_count = records
+    emotions = {ed["face_id"]: ed["label"] for ed in emotion_data}
+    activities = {ad["face_id"]: ad["activities"] for ad in activity_data}
+
+    aggregator = ReportAggregator()
+    aggregator.total_frames = total_frames
+    aggregator.anomaly_count = anomaly_count
+    for face in face_data:
+        aggregator.add_face(face.get("name", "Desconhecido"), emotions[face["face_id"]], activities[face["face_id"]])
+    assert aggregator.snapshot() == baseline_report(*records)
+
+
+def test_tracks_are_counted_per_person():
+    aggregator = ReportAggregator()
+    aggregator.add_detection("Ana", track_id=0)
+    aggregator.add_detection("Ana", track_id=0)
+    aggregator.add_detection("Ana", track_id=2)
+    aggregator.add_detection("Bruno", track_id=1)
+    report = aggregator.snapshot()
+    assert report["person_statistics"]["Ana"]["track_count"] == 2
+    assert report["person_statistics"]["Bruno"]["track_count"] == 1
+    assert report["total_tracked_persons"] == 3
+
+
+def test_merge_equals_single_pass(records):
+    face_data, emotion_data, activity_data, total_frames, anomaly_count = records
+    whole = aggregate_records(face_data, emotion_data, activity_data, total_frames, anomaly_count)
+
+    # Divide os registros em dois segmentos e soma os agregadores
+    first = aggregate_records(face_data[:2], emotion_data, activity_data, 5, 1)
+    second = aggregate_records(face_data[2:], emotion_data, activity_data, total_frames - 5, anomaly_count - 1)
+    merged = ReportAggregator()
+    merged.merge(first)
+    merged.merge(second)
+    assert merged.snapshot() == whole.snapshot()
+
+
+def test_merge_offsets_track_ids():
+    first = ReportAggregator()
+    first.add_detection("Ana", track_id=0)
+    second = ReportAggregator()
+    second.add_detection("Ana", track_id=0)
+    second.add_detection("Bruno", track_id=1)
+
+    merged = ReportAggregator()
+    merged.merge(first)
+    merged.merge(second, track_offset=1)
+    assert merged.person_tracks == {"Ana": {0, 1}, "Bruno": {2}}
+
+
+def test_state_round_trip(records):
+    aggregator = aggregate_records(*records)
+    aggregator.add_detection("Ana", track_id=3)
+    state = json.loads(json.dumps(aggregator.to_state()))
+    restored = ReportAggregator.from_state(state)
+    assert restored.snapshot() == aggregator.snapshot()
+    assert restored.person_tracks == aggregator.person_tracks
+
+    # O agregador restaurado continua contando de forma independente do original
+    restored.add_emotion("Ana", "feliz")
+    assert restored.person_stats["Ana"]["emotions"]["feliz"] == aggregator.person_stats["Ana"]["emotions"]["feliz"] + 1
+
+
+def test_checkpoint_is_a_snapshot(records, tmp_path):
+    aggregator = aggregate_records(*records)
+    checkpoint_path = tmp_path / "parcial" / "report.json"
+    aggregator.write_checkpoint(str(checkpoint_path))
+    with open(checkpoint_path, encoding="utf-8") as f:
+        assert json.load(f) == aggregator.snapshot()
+    assert not (tmp_path / "parcial" / "report.json.tmp").exists()
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from frame_scheduler_module import RUN_FULL, RUN_POSE_ONLY
+from report_module import ReportAggregator
+from result_store_module import ResultStore, ResultStoreWriter, is_result_store, merge_result_stores
+
+NAMES = ["Ana", "Bruno", "Desconhecido"]
+EMOTIONS = ["feliz", "neutro", "triste"]
+ACTIVITIES = [["Pessoa Em Pe"], ["Pessoa Sentada", "Braco Levantado"], []]
+
+
+def make_analysis(frame_number, face_id, rng):
+    """Análise sintética no formato de VideoProcessor._collect_results (frames múltiplos de 5 são só de pose)."""
+    decision = RUN_POSE_ONLY if frame_number % 5 == 0 else RUN_FULL
+    num_poses = frame_number % 3
+    activities_list = [ACTIVITIES[(frame_number + i) % 3] for i in range(num_poses)]
+    faces, emotions, frame_activities, pose_assignment = [], [], [], []
+    if decision == RUN_FULL:
+        for i in range(frame_number % 3):
+            pose_index = i if i < num_poses else None
+            faces.append({
+                "face_id": face_id + i,
+                "track_id": (frame_number + i) % 4 if frame_number % 2 else None,
+                "name": NAMES[(frame_number + i) % 3],
+                "location": (10 * i, 10 * i + 20, 10 * i + 20, 10 * i),
+                "encoding": rng.normal(size=128).astype(np.float32),
+            })
+            emotions.append(EMOTIONS[(frame_number * 7 + i) % 3])
+            frame_activities.append({"face_id": face_id + i,
+                                     "activities": activities_list[pose_index] if pose_index is not None
+                                     else ["Indefinido"]})
+            pose_assignment.append(pose_index)
+    analysis = {
+        "decision": decision,
+        "faces": faces,
+        "emotions": emotions,
+        "emotion_probabilities": rng.random((len(faces), 7)).astype(np.float32),
+        "frame_activities": frame_activities,
+        "pose_assignment": pose_assignment,
+        "activities_list": activities_list,
+        "anomaly_detected": any("Braco Levantado" in acts for acts in activities_list),
+    }
+    landmarks = rng.random((num_poses, 33, 4)).astype(np.float32)
+    return analysis, landmarks
+
+
+def write_store(store_path, frame_numbers, chunk_frames=4, seed=0):
+    """Grava um armazenamento e monta em paralelo o agregador ao vivo, como o VideoProcessor faz."""
+    rng = np.random.default_rng(seed)
+    writer = ResultStoreWriter(str(store_path), video_path="video.mp4", fps=30.0, chunk_frames=chunk_frames)
+    aggregator = ReportAggregator()
+    face_id = 0
+    frames = {}
+    for frame_number in frame_numbers:
+        analysis, landmarks = make_analysis(frame_number, face_id, rng)
+        face_id += len(analysis["faces"])
+        if analysis["anomaly_detected"]:
+            aggregator.anomaly_count += 1
+        for face, emotion, activities in zip(analysis["faces"], analysis["emotions"], analysis["frame_activities"]):
+            aggregator.add_face(face["name"], emotion, activities["activities"], face["track_id"])
+        writer.add_frame(frame_number, analysis, landmarks)
+        frames[frame_number] = (analysis, landmarks)
+    aggregator.total_frames = len(frame_numbers)
+    writer.close(total_frames=len(frame_numbers))
+    return aggregator, frames
+
+
+def test_round_trip(tmp_path):
+    frame_numbers = list(range(1, 12))
+    _, frames = write_store(tmp_path / "store", frame_numbers)
+    store = ResultStore(str(tmp_path / "store"))
+
+    assert len(store) == len(frame_numbers)
+    assert store.total_frames == len(frame_numbers)
+    assert len(store.chunks) == 3
+    for frame_number, (analysis, landmarks) in frames.items():
+        result = store.frame(frame_number)
+        assert result["decision"] == analysis["decision"]
+        assert result["anomaly"] == analysis["anomaly_detected"]
+        np.testing.assert_array_equal(result["pose_landmarks"], landmarks)
+        assert len(result["faces"]) == len(analysis["faces"])
+        for face, expected, emotion in zip(result["faces"], analysis["faces"], analysis["emotions"]):
+            assert face["face_id"] == expected["face_id"]
+            assert face["track_id"] == expected["track_id"]
+            assert face["name"] == expected["name"]
+            assert face["location"] == expected["location"]
+            assert face["emotion"] == emotion
+            np.testing.assert_array_equal(face["encoding"], expected["encoding"])
+    assert store.frame(0) is None
+    assert store.frame(99) is None
+
+
+def test_to_aggregator_equals_live_aggregator(tmp_path):
+    aggregator, _ = write_store(tmp_path / "store", list(range(1, 30)))
+    store = ResultStore(str(tmp_path / "store"))
+    assert store.to_aggregator().snapshot() == aggregator.snapshot()
+
+
+def test_merge_result_stores(tmp_path):
+    first, _ = write_store(tmp_path / "seg0", list(range(1, 10)), seed=1)
+    second, second_frames = write_store(tmp_path / "seg1", list(range(10, 22)), seed=2)
+    merge_result_stores([str(tmp_path / "seg0"), str(tmp_path / "seg1")], str(tmp_path / "merged"),
+                        track_offsets=[0, 4])
+
+    expected = ReportAggregator()
+    expected.merge(first)
+    expected.merge(second, track_offset=4)
+    merged = ResultStore(str(tmp_path / "merged"))
+    assert merged.total_frames == 21
+    assert merged.to_aggregator().snapshot() == expected.snapshot()
+
+    # face_ids e track_ids do segundo armazenamento são deslocados para serem únicos no vídeo inteiro
+    face_offset = first.total_face_detections
+    analysis, _ = second_frames[11]
+    faces = merged.frame(11)["faces"]
+    assert [face["face_id"] for face in faces] == [face["face_id"] + face_offset for face in analysis["faces"]]
+    assert [face["track_id"] for face in faces] == [face["track_id"] + 4 for face in analysis["faces"]]
+    assert [face["name"] for face in faces] == [face["name"] for face in analysis["faces"]]
+
+
+def test_writer_refuses_foreign_directory(tmp_path):
+    folder = tmp_path / "dados"
+    folder.mkdir()
+    (folder / "importante.txt").write_text("não apagar")
+    assert not is_result_store(str(folder))
+    with pytest.raises(ValueError):
+        ResultStoreWriter(str(folder))
+    assert (folder / "importante.txt").exists()
+
+
+def test_writer_replaces_existing_store(tmp_path):
+    write_store(tmp_path / "store", list(range(1, 10)))
+    assert is_result_store(str(tmp_path / "store"))
+    write_store(tmp_path / "store", [1, 2])
+    assert len(ResultStore(str(tmp_path / "store"))) == 2
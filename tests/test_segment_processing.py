@@ -0,0 +1,30 @@
+from segment_processing import plan_segments
+
+
+def test_equal_segments():
+    assert plan_segments(100, 4) == [(0, 25), (25, 50), (50, 75), (75, None)]
+
+
+def test_segments_cover_every_frame():
+    segments = plan_segments(101, 3)
+    assert segments[0][0] == 0
+    assert segments[-1][1] is None
+    for (_, end), (start, _) in zip(segments, segments[1:]):
+        assert end == start
+
+
+def test_boundaries_move_to_nearest_keyframe():
+    assert plan_segments(100, 4, keyframes=[0, 20, 48, 70, 90]) == [(0, 20), (20, 48), (48, 70), (70, None)]
+
+
+def test_keyframes_never_create_empty_segments():
+    # Todas as fronteiras caem no mesmo keyframe: sobra um único corte
+    assert plan_segments(100, 4, keyframes=[0, 50]) == [(0, 50), (50, None)]
+
+
+def test_more_segments_than_frames():
+    assert plan_segments(3, 8) == [(0, 1), (1, 2), (2, None)]
+
+
+def test_unknown_length():
+    assert plan_segments(0, 4) == [(0, None)]
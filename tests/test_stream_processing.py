@@ -0,0 +1,73 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from report_module import ReportAggregator
+from stream_processing import MultiSourceRunner
+
+START = 1_700_000_000.0
+
+
+class ScriptedSource:
+    """Fonte com instantes de captura definidos (com lacunas, como após descartes no buffer)."""
+
+    def __init__(self, name, offsets):
+        self.name = name
+        self.source = name
+        self.fps = 30.0
+        self.frames_dropped = 0
+        self.finished = False
+        self._frames = [(np.zeros((4, 4, 3), np.uint8), START + offset) for offset in offsets]
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def read(self):
+        if not self._frames:
+            self.finished = True
+            return None
+        return self._frames.pop(0)
+
+
+class RecordingProcessor:
+    def __init__(self):
+        self.aggregator = ReportAggregator()
+        self.timestamps = []
+        self.released = False
+
+    def process_frame(self, frame, timestamp=None):
+        self.aggregator.total_frames += 1
+        self.timestamps.append(timestamp)
+
+    def _release(self, cap=None):
+        self.released = True
+
+
+def test_windows_follow_capture_time(tmp_path, monkeypatch):
+    processors = []
+
+    def create_processor(self, source):
+        processors.append(RecordingProcessor())
+        return processors[-1]
+
+    monkeypatch.setattr(MultiSourceRunner, "_create_processor", create_processor)
+    runner = MultiSourceRunner([], [], [], window_seconds=1.0, report_dir=str(tmp_path))
+    runner.sources = [ScriptedSource("camera", [0.0, 0.5, 1.2, 2.5])]
+    runner.run()
+
+    [processor] = processors
+    assert processor.timestamps == pytest.approx([0.0, 0.5, 1.2, 2.5])
+    assert processor.released
+
+    reports = []
+    for name in sorted(os.listdir(tmp_path / "camera")):
+        with open(tmp_path / "camera" / name, encoding="utf-8") as f:
+            reports.append(json.load(f))
+    assert [r["total_frames"] for r in reports] == [2, 1, 1]
+    assert [r["window_start"] - START for r in reports] == pytest.approx([0.0, 1.2, 2.5])
+    assert [r["window_end"] - START for r in reports] == pytest.approx([1.2, 2.5, 2.5])
@@ -0,0 +1,152 @@
+import cv2
+import numpy as np
+import pytest
+
+import video_processing
+from activity_rules_module import classify_poses
+from frame_scheduler_module import AdaptiveFrameScheduler
+from render_module import MODE_ANALYSIS
+from report_module import aggregate_records
+from result_store_module import ResultStore
+from video_processing import VideoProcessor
+
+NUM_FRAMES = 30
+FRAME_SIZE = (96, 64)   # (largura, altura)
+
+
+def frame_index(frame):
+    """Índice do frame sintético, codificado no nível de cinza do canto superior esquerdo."""
+    return int(round(frame[:8, :8].mean() / 8.0))
+
+
+def face_location(index):
+    # O rosto anda um pixel por frame (o rastreamento mantém o track)
+    return (10, 40 + index % 8, 30, 20 + index % 8)
+
+
+@pytest.fixture
+def synthetic_clip(tmp_path):
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30.0, FRAME_SIZE)
+    assert writer.isOpened()
+    for index in range(NUM_FRAMES):
+        frame = np.full((FRAME_SIZE[1], FRAME_SIZE[0], 3), 8 * index, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    """Substitui os modelos por funções determinísticas do conteúdo do frame (sem dlib, TensorFlow e MediaPipe)."""
+    def name_for(index):
+        return "Ana" if index % 6 < 3 else "Desconhecido"
+
+    def fake_recognize_faces(frame, *args, **kwargs):
+        index = frame_index(frame)
+        return [{"name": name_for(index), "location": face_location(index)}]
+
+    def fake_detect_faces(frame, *args, **kwargs):
+        return [face_location(frame_index(frame))]
+
+    def fake_identify_faces(frame, locations, *args, **kwargs):
+        index = frame_index(frame)
+        return [{"name": name_for(index), "distance": 0.3, "encoding": None} for _ in locations]
+
+    def fake_analyze_emotions(frame, face_locations, return_probabilities=False):
+        emotions = ["feliz" if frame_index(frame) % 2 else "neutro" for _ in face_locations]
+        return emotions, [np.zeros(7, dtype=np.float32) for _ in face_locations]
+
+    def fake_detect_activities(frame, analysis_scale=1.0, history=None, timestamp=None, detector=None,
+                               face_locations=None, context=None):
+        index = frame_index(frame)
+        top, right, bottom, left = face_location(index)
+        landmarks = np.ones((1, 33, 4), dtype=np.float32)
+        landmarks[0, :, 0] = (left + right) / 2.0 / FRAME_SIZE[0]
+        landmarks[0, :, 1] = (top + bottom) / 2.0 / FRAME_SIZE[1]
+        landmarks[0, :, 1] += np.linspace(0.0, 0.5, 33, dtype=np.float32) * (index % 3)
+        # As regras temporais dependem do histórico: resultados iguais exigem a pose na ordem dos frames
+        activities_list = classify_poses(landmarks, history, timestamp)
+        return activities_list, index % 4 == 0, landmarks
+
+    monkeypatch.setattr(video_processing, "recognize_faces", fake_recognize_faces)
+    monkeypatch.setattr(video_processing, "detect_faces", fake_detect_faces)
+    monkeypatch.setattr(video_processing, "identify_faces", fake_identify_faces)
+    monkeypatch.setattr(video_processing, "analyze_emotions", fake_analyze_emotions)
+    monkeypatch.setattr(video_processing, "detect_activities", fake_detect_activities)
+
+
+def process(video_path, tmp_path, **kwargs):
+    processor = VideoProcessor(video_path, str(tmp_path / "out.mp4"), [], [], mode=MODE_ANALYSIS, **kwargs)
+    total_frames, anomaly_count, face_data, emotion_data, activity_data = processor.process_video()
+    # O agregador incremental acompanha os registros completos
+    assert processor.aggregator.snapshot() == \
+        aggregate_records(face_data, emotion_data, activity_data, total_frames, anomaly_count).snapshot()
+    return {
+        "total_frames": total_frames,
+        "anomaly_count": anomaly_count,
+        "face_data": [(face["face_id"], face["name"], face["location"], face.get("track_id")) for face in face_data],
+        "emotion_data": emotion_data,
+        "activity_data": activity_data,
+    }
+
+
+@pytest.mark.parametrize("options", [
+    {"frame_skip": 1},
+    {"frame_skip": 3},
+    {"frame_skip": 1, "use_tracking": True},
+], ids=["every-frame", "frame-skip", "tracking"])
+def test_pipelined_matches_serial(synthetic_clip, tmp_path, fake_models, options):
+    serial = process(synthetic_clip, tmp_path, **options)
+    assert serial["total_frames"] == NUM_FRAMES
+    assert len(serial["face_data"]) == NUM_FRAMES // options["frame_skip"]
+    assert serial["anomaly_count"] > 0
+    for num_workers in (1, 3):
+        pipelined = process(synthetic_clip, tmp_path, pipelined=True, num_workers=num_workers, queue_size=2,
+                            max_in_flight=4, **options)
+        assert pipelined == serial
+
+
+def test_pipelined_adaptive_scheduler(synthetic_clip, tmp_path, fake_models):
+    # Com o escalonador adaptativo, as decisões dependem de quantos frames estão em trânsito: apenas a
+    # consistência interna do resultado é comparável
+    result = process(synthetic_clip, tmp_path, pipelined=True, num_workers=3,
+                     scheduler=AdaptiveFrameScheduler(max_interval=4))
+    face_ids = [face_id for face_id, _, _, _ in result["face_data"]]
+    assert result["total_frames"] == NUM_FRAMES
+    assert face_ids == list(range(len(face_ids)))
+    assert [ed["face_id"] for ed in result["emotion_data"]] == face_ids
+    assert [ad["face_id"] for ad in result["activity_data"]] == face_ids
+
+
+def test_segment_keeps_global_sampling(synthetic_clip, tmp_path, fake_models):
+    # Frames 0-based 2, 5, 8, ... no vídeo inteiro; o segmento [10, 20) deve analisar 11, 14 e 17
+    whole = process(synthetic_clip, tmp_path, frame_skip=3)
+    segment = process(synthetic_clip, tmp_path, frame_skip=3, start_frame=10, end_frame=20)
+    assert segment["total_frames"] == 10
+    assert [face[1:] for face in segment["face_data"]] == [face[1:] for face in whole["face_data"][3:6]]
+
+
+def test_tracking_keeps_one_track(synthetic_clip, tmp_path, fake_models):
+    result = process(synthetic_clip, tmp_path, frame_skip=1, use_tracking=True)
+    assert {track_id for _, _, _, track_id in result["face_data"]} == {0}
+
+
+def test_report_without_records(synthetic_clip, tmp_path, fake_models):
+    full = VideoProcessor(synthetic_clip, str(tmp_path / "out.mp4"), [], [], frame_skip=2, mode=MODE_ANALYSIS)
+    full.process_video()
+    streamed = VideoProcessor(synthetic_clip, str(tmp_path / "out.mp4"), [], [], frame_skip=2, mode=MODE_ANALYSIS,
+                              keep_records=False)
+    _, _, face_data, emotion_data, activity_data = streamed.process_video()
+    assert face_data == emotion_data == activity_data == []
+    assert streamed.aggregator.snapshot() == full.aggregator.snapshot()
+
+
+def test_store_replays_the_report(synthetic_clip, tmp_path, fake_models):
+    store_path = str(tmp_path / "store")
+    processor = VideoProcessor(synthetic_clip, str(tmp_path / "out.mp4"), [], [], frame_skip=2, mode=MODE_ANALYSIS,
+                               store_path=store_path, store_chunk_frames=4)
+    processor.process_video()
+    store = ResultStore(store_path)
+    assert len(store) == NUM_FRAMES // 2
+    assert store.to_aggregator().snapshot() == processor.aggregator.snapshot()